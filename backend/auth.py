@@ -1,48 +1,52 @@
 import os
+import hmac
 from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
 import crud
+import lazy_imports
 import models
 import schemas
-from database import SessionLocal, get_db
+import metrics
+import password_pool
+import token_cache
+from database import SessionLocal, get_db, run_db
 
-# hashing e senha com bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# python-jose (e o backend de criptografia) só no primeiro token emitido ou lido
+jwt = lazy_imports.sob_demanda("jose.jwt")
+
+# hashing e senha com bcrypt, fora dos workers da API (ver password_pool.py).
+# Podem levantar password_pool.PasswordPoolSaturated quando o pool está cheio.
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with metrics.medir("bcrypt_hash"):
+        return password_pool.hash_password(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    with metrics.medir("bcrypt_verify"):
+        return await password_pool.verify_password_async(plain_password, hashed_password)
 
 
 
-def authenticate_user(db: Session, matricula: str, password: str):
-    """verifica a matrícula e a senha no banco de dados. Função chamada pela rota de login.
-    """
-   
-    aluno = crud.get_aluno_by_matricula(db, matricula=matricula)
-    
+async def authenticate_user_async(db, matricula: str, password: str):
+    """verifica a matrícula e a senha no banco de dados. Função chamada pela rota de login."""
+
+    aluno = await run_db(db, crud.get_aluno_by_matricula, matricula=matricula)
+
     if not aluno:
-        return None 
-    
-   
-    if not verify_password(password, aluno.hashed_password):
         return None
-    
-   
+
+    if not await verify_password_async(password, aluno.hashed_password):
+        return None
+
     return aluno
 
 
 # Token JWT:
 
 SECRET_KEY = os.getenv("SECRET_KEY")
-if not SECRET_KEY:
-    raise RuntimeError("SECRET_KEY environment variable is not set")
 
 ALGORITHM = "HS256"
 
@@ -53,6 +57,12 @@ except ValueError as exc:
     raise RuntimeError("ACCESS_TOKEN_EXPIRE_MINUTES must be an integer") from exc
 
 
+def verificar_configuracao():
+    """Chamada na inicialização da aplicação (e não no import, que scripts e testes também fazem)."""
+    if not SECRET_KEY:
+        raise RuntimeError("SECRET_KEY environment variable is not set")
+
+
 # diz ao FastAPI que a rota de login é /login
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -72,21 +82,39 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 # dependência para rota protegidas:
 #a funcao abaixo eh uma dependencia para qualquer rota que necessite que o aluno esteja logado para acessar, como 'obter recomendacao'. Rotas desprotegidas como 'fazer login' nao levam ela, pois nao requerem um usuario pre-autenticado.
+#O FastAPI resolve a dependência uma vez por requisição, mesmo declarada no router e na rota.
+
+def password_stamp(hashed_password: str) -> str:
+    """
+    Carimbo da senha atual que vai no token (claim 'pwd'):
+    trocar a senha invalida os tokens emitidos antes da troca.
+    """
+    return hmac.new(SECRET_KEY.encode(), hashed_password.encode(), "sha256").hexdigest()[:16]
 
-async def get_current_aluno(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+
+async def get_current_aluno(db = Depends(get_db), token: str = Depends(oauth2_scheme)) -> schemas.Aluno:
     """
     Qualquer rota que precisar desta dependecia vai ter que:
     1. Exigir um Token no Header.
     2. Decodificar o Token.
-    3. Retornar o objeto 'Aluno' do banco.
+    3. Retornar a identidade do aluno (id, matrícula e nome).
+
+    Tokens já verificados ficam no token_cache por alguns segundos,
+    então a maioria das requisições não decodifica o JWT nem vai ao banco.
+    Rotas que precisam do objeto 'Aluno' do ORM devem buscá-lo.
     """
+    identidade = token_cache.cache.get(token)
+    if identidade is not None:
+        return identidade
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with metrics.medir("jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         
         # O "subject" do token é a matrícula
         matricula: str = payload.get("sub") 
@@ -98,12 +126,65 @@ async def get_current_aluno(db: Session = Depends(get_db), token: str = Depends(
         
         token_data = schemas.TokenData(matricula=matricula, aluno_id=aluno_id)
         
-    except JWTError:
+    except jwt.JWTError:
         raise credentials_exception
     
    
-    aluno = crud.get_aluno_by_id(db, aluno_id=token_data.aluno_id)
+    aluno = await run_db(db, crud.get_aluno_by_id, aluno_id=token_data.aluno_id)
     
     if aluno is None:   
         raise credentials_exception
-    return aluno
+
+    # tokens emitidos antes deste carimbo existir não têm 'pwd' e continuam valendo até expirar
+    pwd = payload.get("pwd")
+    if pwd is not None and not hmac.compare_digest(pwd, password_stamp(aluno.hashed_password)):
+        raise credentials_exception
+
+    identidade = schemas.Aluno.model_validate(aluno)
+    token_cache.cache.set(token, identidade, payload["exp"])
+    return identidade
+
+
+# revogação: aluno removido ou com senha trocada sai do token_cache depois do commit
+
+@event.listens_for(models.Aluno, "after_update")
+def _aluno_atualizado(mapper, connection, target):
+    if inspect(target).attrs.hashed_password.history.has_changes():
+        _marcar_revogado(target)
+
+@event.listens_for(models.Aluno, "after_delete")
+def _aluno_removido(mapper, connection, target):
+    _marcar_revogado(target)
+
+def _marcar_revogado(target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("alunos_revogados", set()).add(target.id_aluno)
+
+@event.listens_for(Session, "after_commit")
+def _revogar_tokens(session):
+    for aluno_id in session.info.pop("alunos_revogados", ()):
+        token_cache.cache.invalidate_aluno(aluno_id)
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_revogados(session):
+    session.info.pop("alunos_revogados", None)
+
+
+# dependência para rotas administrativas (/admin): chave fixa no header X-Admin-Key.
+# Sem ADMIN_API_KEY configurada, as rotas de admin ficam desabilitadas.
+
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+
+def get_admin(api_key: str | None = Depends(admin_key_header)):
+    admin_key = os.getenv("ADMIN_API_KEY")
+    if not admin_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Rotas de administração desabilitadas (ADMIN_API_KEY não configurada)",
+        )
+    if not api_key or not hmac.compare_digest(api_key, admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Chave de administração inválida",
+        )
@@ -0,0 +1,115 @@
+"""
+Carga em massa de linhas em uma tabela.
+
+No Postgres usa COPY ... FROM STDIN (psycopg2), em blocos de tamanho fixo
+para manter a memória constante; nos outros dialetos (SQLite em testes
+locais) cai para insert() com executemany.
+
+copy_rows_ignorando_conflitos faz a carga idempotente: COPY não tem
+ON CONFLICT, então as linhas passam por uma tabela temporária e seguem com
+INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+"""
+import csv
+import io
+from itertools import islice
+from sqlalchemy import Column, LargeBinary, MetaData, Table, insert, select, text, true
+from sqlalchemy.orm import Session
+from database import dialect_insert
+
+
+LINHAS_POR_BLOCO = 50_000
+
+
+def _blocos(linhas, tamanho: int):
+    iterador = iter(linhas)
+    while bloco := list(islice(iterador, tamanho)):
+        yield bloco
+
+
+def _bytea_csv(bloco: list[tuple], indices: list[int]) -> list[tuple]:
+    """Colunas binárias no formato de texto do bytea ('\\x' + hex), que o COPY csv espera."""
+    return [
+        tuple(
+            "\\x" + valor.hex() if i in indices and valor is not None else valor
+            for i, valor in enumerate(linha)
+        )
+        for linha in bloco
+    ]
+
+
+def copy_rows(db: Session, tabela, colunas: list[str], linhas, tamanho_bloco: int = LINHAS_POR_BLOCO) -> int:
+    """
+    Insere 'linhas' (iterável de tuplas na ordem de 'colunas') em 'tabela',
+    dentro da transação da sessão. Retorna quantas linhas foram enviadas.
+    """
+    total = 0
+
+    if db.get_bind().dialect.name == "postgresql":
+        comando = f"COPY {tabela.name} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)"
+        binarias = [i for i, coluna in enumerate(colunas) if isinstance(tabela.c[coluna].type, LargeBinary)]
+        cursor = db.connection().connection.cursor()
+        try:
+            for bloco in _blocos(linhas, tamanho_bloco):
+                if binarias:
+                    bloco = _bytea_csv(bloco, binarias)
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(bloco)
+                buffer.seek(0)
+                cursor.copy_expert(comando, buffer)
+                total += len(bloco)
+        finally:
+            cursor.close()
+        return total
+
+    for bloco in _blocos(linhas, tamanho_bloco):
+        db.execute(insert(tabela), [dict(zip(colunas, linha)) for linha in bloco])
+        total += len(bloco)
+    return total
+
+
+def copy_rows_ignorando_conflitos(
+    db: Session, tabela, colunas: list[str], linhas, conflito: list[str],
+    tamanho_bloco: int = LINHAS_POR_BLOCO,
+) -> int:
+    """
+    Como copy_rows, mas linhas que violam a unicidade de 'conflito' (colunas
+    de uma PK ou UNIQUE) são ignoradas. Retorna quantas linhas foram inseridas.
+    """
+    temporaria = Table(
+        f"tmp_{tabela.name}",
+        MetaData(),
+        *[Column(coluna, tabela.c[coluna].type) for coluna in colunas],
+        prefixes=["TEMPORARY"],
+    )
+    conexao = db.connection()
+    temporaria.drop(conexao, checkfirst=True)
+    temporaria.create(conexao)
+
+    inseridas = 0
+    for bloco in _blocos(linhas, tamanho_bloco):
+        copy_rows(db, temporaria, colunas, bloco, tamanho_bloco)
+        insert_stmt = dialect_insert(conexao)(tabela).from_select(
+            colunas,
+            # o SQLite exige um WHERE antes do ON CONFLICT em INSERT ... SELECT
+            select(*[temporaria.c[coluna] for coluna in colunas]).where(true()),
+        )
+        inseridas += db.execute(insert_stmt.on_conflict_do_nothing(index_elements=conflito)).rowcount
+        db.execute(temporaria.delete())
+
+    temporaria.drop(conexao)
+    return inseridas
+
+
+def sync_sequences(db: Session, tabelas):
+    """
+    Depois de inserir ids explícitos no Postgres, avança as sequences das
+    PKs serial para o maior id, senão o próximo INSERT do ORM colide.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for tabela in tabelas:
+        (pk,) = tabela.primary_key.columns
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabela.name}', '{pk.name}'), "
+            f"COALESCE((SELECT MAX({pk.name}) FROM {tabela.name}), 0) + 1, false)"
+        ))
@@ -0,0 +1,129 @@
+"""
+Snapshot em memória dos dados de referência (disciplinas, cursos e o
+catálogo de tipos/opções de preferência), que só mudam uma vez por semestre.
+
+As respostas ficam pré-serializadas em JSON, cada uma com um ETag igual ao
+hash do conteúdo: o mesmo catálogo gera o mesmo ETag em qualquer processo,
+então um If-None-Match continua valendo entre workers e reinícios.
+
+Escritas em Curso, Disciplina, TipoPreferencia ou OpcaoPreferencia pelo ORM
+descartam o snapshot depois do commit; em outros processos ele expira pelo
+CATALOG_TTL_SECONDS.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+import crud
+import models
+import schemas
+
+
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+# max-age enviado ao cliente: até lá o navegador nem revalida
+CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", "300"))
+
+MODELOS_CATALOGO = (models.Curso, models.Disciplina, models.TipoPreferencia, models.OpcaoPreferencia)
+
+
+@dataclass(frozen=True)
+class Resposta:
+    corpo: bytes
+    etag: str
+
+
+def _resposta(dados) -> Resposta:
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Resposta(corpo=corpo, etag=f'"{hashlib.sha256(corpo).hexdigest()[:32]}"')
+
+
+_lock = threading.Lock()
+_snapshot: dict[str, Resposta] | None = None
+_carregado_em = 0.0
+_versao = 0
+
+
+def snapshot_atual() -> dict[str, Resposta] | None:
+    """O snapshot em memória, ou None se não existe ou expirou."""
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _carregado_em < CATALOG_TTL_SECONDS:
+            return _snapshot
+    return None
+
+
+def carregar(db: Session) -> dict[str, Resposta]:
+    """Lê o catálogo do banco e monta as respostas ('disciplinas' e 'catalogo')."""
+    global _snapshot, _carregado_em
+    with _lock:
+        versao = _versao
+
+    disciplinas = [
+        schemas.DisciplinaCatalogo.model_validate(d).model_dump()
+        for d in sorted(crud.get_disciplinas(db), key=lambda d: d.id_disciplina)
+    ]
+    tipos = [schemas.TipoPreferenciaCatalogo.model_validate(t) for t in crud.get_tipos_preferencia(db)]
+    for tipo in tipos:
+        # ordem fixa: o ETag é o hash do conteúdo
+        tipo.opcoes.sort(key=lambda opcao: opcao.id_opcao)
+
+    catalogo = schemas.Catalogo(
+        cursos=[schemas.Curso.model_validate(c) for c in crud.get_cursos(db)],
+        disciplinas=disciplinas,
+        tipos_preferencia=tipos,
+    ).model_dump()
+
+    snapshot = {
+        # mesmo formato de antes em /aluno/disciplinas
+        "disciplinas": _resposta([
+            {"id_disciplina": d["id_disciplina"], "nome": d["nome"]} for d in disciplinas
+        ]),
+        "catalogo": _resposta(catalogo),
+    }
+
+    with _lock:
+        # uma escrita durante a leitura: serve este resultado, mas não guarda
+        if versao == _versao:
+            _snapshot = snapshot
+            _carregado_em = time.monotonic()
+    return snapshot
+
+
+def invalidate():
+    global _snapshot, _versao
+    with _lock:
+        _snapshot = None
+        _versao += 1
+
+
+def etag_confere(if_none_match: str | None, etag: str) -> bool:
+    """True se o If-None-Match do cliente inclui o ETag atual (resposta 304)."""
+    if not if_none_match:
+        return False
+    candidatos = [valor.strip() for valor in if_none_match.split(",")]
+    return "*" in candidatos or any(valor.removeprefix("W/") == etag for valor in candidatos)
+
+
+def _marcar_catalogo_alterado(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["catalogo_alterado"] = True
+
+
+for _modelo in MODELOS_CATALOGO:
+    for _evento in ("after_insert", "after_update", "after_delete"):
+        event.listen(_modelo, _evento, _marcar_catalogo_alterado)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_catalogo(session):
+    if session.info.pop("catalogo_alterado", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_catalogo_alterado(session):
+    session.info.pop("catalogo_alterado", None)
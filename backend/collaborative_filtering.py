@@ -0,0 +1,303 @@
+"""
+Motor de filtragem colaborativa sobre as avaliações (motor=colaborativo nas
+rotas de recomendação).
+
+As avaliações viram uma matriz esparsa (scipy.sparse) alunos x (turma,
+feature), com memória proporcional ao número de notas. Cada linha é centrada
+na média do aluno e normalizada: os vizinhos de um aluno são os de maior
+cosseno com ele, isto é, os que avaliaram as mesmas turmas de forma parecida.
+
+Na recomendação, o perfil de cada professor (as médias de sempre) é
+misturado com a média das notas que os vizinhos deram a ele na disciplina,
+ponderada pela similaridade:
+
+    perfil = (1 - a) * média geral + a * média dos vizinhos,   a = n / (n + CF_SHRINKAGE)
+
+onde n é a soma das similaridades das avaliações dos vizinhos. A nota sai de
+scoring.score_matrix, como no motor de conteúdo; aluno sem avaliações (ou sem
+vizinhos) recebe exatamente o ranking do motor de conteúdo.
+
+A matriz não é montada nas requisições. Com CF_REFRESH_SECONDS > 0 (desligado
+por padrão) o job de main.py chama atualizar() nesse intervalo: relê do banco
+só as avaliações das disciplinas marcadas (ver
+professor_profiles.ao_alterar_perfis), e tudo a cada CF_REBUILD_SECONDS
+(alterações feitas por outros processos); as matrizes são remontadas
+inteiras nos dois casos (a centragem e a norma de cada aluno dependem de
+todas as notas dele). Sem o job não há modelo e motor=colaborativo devolve
+o ranking de conteúdo. O scipy só é importado quando a matriz é montada
+pela primeira vez.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import lazy_imports
+import models
+import professor_profiles
+from constants.features import FEATURE_NAMES
+
+np = lazy_imports.sob_demanda("numpy")
+
+
+CF_REFRESH_SECONDS = float(os.getenv("CF_REFRESH_SECONDS", "0"))
+CF_REBUILD_SECONDS = float(os.getenv("CF_REBUILD_SECONDS", "3600"))
+CF_VIZINHOS = int(os.getenv("CF_VIZINHOS", "50"))
+CF_SHRINKAGE = float(os.getenv("CF_SHRINKAGE", "5"))
+
+LINHAS_POR_BLOCO = 50_000
+N_FEATURES = len(FEATURE_NAMES)
+
+
+def _sparse():
+    from scipy import sparse
+    return sparse
+
+
+@dataclass(frozen=True)
+class _Avaliacoes:
+    """As avaliações em arrays (uma posição por avaliação)."""
+    aluno_ids: np.ndarray
+    turma_ids: np.ndarray
+    professor_ids: np.ndarray
+    disciplina_ids: np.ndarray
+    notas: np.ndarray           # (N x 7) uint8, ordem de FEATURE_NAMES
+
+
+@dataclass(frozen=True)
+class _Modelo:
+    base: _Avaliacoes
+    alunos: np.ndarray          # aluno_ids ordenados (linha de cada aluno)
+    pares: np.ndarray           # chaves (professor, disciplina) ordenadas (coluna de cada par)
+    # scipy.sparse.csr_matrix:
+    por_aluno: object       # alunos x (turma, feature), centrada e normalizada
+    por_coluna: object      # a transposta, para achar quem avaliou cada turma
+    somas: object           # alunos x (par, feature): soma das notas
+    contagens: object       # alunos x par: número de avaliações
+
+
+def _chave_par(professor_ids, disciplina_ids) -> np.ndarray:
+    return (np.asarray(professor_ids, dtype=np.int64) << 32) | np.asarray(disciplina_ids, dtype=np.int64)
+
+
+def _posicoes(ordenados: np.ndarray, valores) -> tuple[np.ndarray, np.ndarray]:
+    """Posição de cada valor no array ordenado e se ele existe lá."""
+    valores = np.asarray(valores, dtype=ordenados.dtype)
+    posicoes = np.searchsorted(ordenados, valores)
+    existe = posicoes < len(ordenados)
+    existe[existe] = ordenados[posicoes[existe]] == valores[existe]
+    return np.where(existe, posicoes, 0), existe
+
+
+def _ler(db: Session, disciplina_ids=None) -> _Avaliacoes:
+    """Avaliações das disciplinas (todas, se None), em blocos."""
+    consulta = select(
+        models.Avaliacao.aluno_id,
+        models.Avaliacao.turma_id,
+        models.Turma.professor_id,
+        models.Turma.disciplina_id,
+        *[getattr(models.Avaliacao, feature) for feature in FEATURE_NAMES],
+    ).join(models.Turma, models.Turma.id_turma == models.Avaliacao.turma_id)
+    if disciplina_ids is not None:
+        consulta = consulta.where(models.Turma.disciplina_id.in_(disciplina_ids))
+
+    blocos = [
+        np.array(bloco, dtype=np.int64)
+        for bloco in db.execute(consulta).yield_per(LINHAS_POR_BLOCO).partitions()
+    ]
+    dados = np.concatenate(blocos) if blocos else np.zeros((0, 4 + N_FEATURES), dtype=np.int64)
+    return _Avaliacoes(
+        aluno_ids=dados[:, 0],
+        turma_ids=dados[:, 1],
+        professor_ids=dados[:, 2],
+        disciplina_ids=dados[:, 3],
+        notas=dados[:, 4:].astype(np.uint8),
+    )
+
+
+def _montar(base: _Avaliacoes) -> _Modelo:
+    sparse = _sparse()
+    alunos, linhas = np.unique(base.aluno_ids, return_inverse=True)
+    turmas, colunas_turma = np.unique(base.turma_ids, return_inverse=True)
+    pares, colunas_par = np.unique(_chave_par(base.professor_ids, base.disciplina_ids), return_inverse=True)
+
+    notas = base.notas.astype(np.float64)
+    linhas_notas = np.repeat(linhas, N_FEATURES)
+    features = np.tile(np.arange(N_FEATURES), len(linhas))
+
+    # centrada na média do aluno: quem dá notas altas em tudo não vira vizinho de todos
+    medias = (
+        np.bincount(linhas, weights=notas.sum(axis=1), minlength=len(alunos))
+        / np.maximum(np.bincount(linhas, minlength=len(alunos)) * N_FEATURES, 1)
+    )
+    centradas = sparse.csr_matrix(
+        ((notas - medias[linhas, None]).ravel(), (linhas_notas, np.repeat(colunas_turma, N_FEATURES) * N_FEATURES + features)),
+        shape=(len(alunos), len(turmas) * N_FEATURES),
+    )
+    centradas.eliminate_zeros()
+    normas = np.sqrt(np.asarray(centradas.multiply(centradas).sum(axis=1)).ravel())
+    inversas = np.divide(1.0, normas, out=np.zeros_like(normas), where=normas > 0)
+    por_aluno = sparse.csr_matrix(sparse.diags(inversas) @ centradas)
+
+    return _Modelo(
+        base=base,
+        alunos=alunos,
+        pares=pares,
+        por_aluno=por_aluno,
+        por_coluna=por_aluno.T.tocsr(),
+        somas=sparse.csr_matrix(
+            (notas.ravel(), (linhas_notas, np.repeat(colunas_par, N_FEATURES) * N_FEATURES + features)),
+            shape=(len(alunos), len(pares) * N_FEATURES),
+        ),
+        contagens=sparse.csr_matrix(
+            (np.ones(len(linhas)), (linhas, colunas_par)),
+            shape=(len(alunos), len(pares)),
+        ),
+    )
+
+
+def _vizinhos(modelo: _Modelo, aluno_id: int) -> tuple[np.ndarray, np.ndarray]:
+    """Linhas e similaridades (> 0) dos CF_VIZINHOS alunos mais parecidos."""
+    posicao, existe = _posicoes(modelo.alunos, [aluno_id])
+    if not existe[0]:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    # só percorre quem avaliou as mesmas turmas que o aluno
+    similaridades = (modelo.por_aluno[posicao[0]] @ modelo.por_coluna).tocsr()
+    linhas, valores = similaridades.indices, similaridades.data
+    manter = (linhas != posicao[0]) & (valores > 0)
+    linhas, valores = linhas[manter], valores[manter]
+
+    ordem = np.lexsort((linhas, -valores))[:CF_VIZINHOS]
+    return linhas[ordem], valores[ordem]
+
+
+class MotorColaborativo:
+
+    def __init__(self, rebuild_seconds: float):
+        self.rebuild_seconds = rebuild_seconds
+        self._modelo = None
+        self._construido_em = 0.0
+        self._sujas = set()
+        self._tudo_sujo = True
+        self._lock = threading.Lock()
+        # uma atualização por vez: duas montagens concorrentes a partir do mesmo
+        # modelo perderiam as disciplinas relidas pela que terminasse primeiro
+        self._construcao = threading.Lock()
+        self.reconstrucoes = 0
+        self.releituras_parciais = 0
+
+    def marcar(self, disciplina_ids):
+        """Disciplinas com avaliações alteradas (None = todas)."""
+        with self._lock:
+            if disciplina_ids is None:
+                self._tudo_sujo = True
+            else:
+                self._sujas.update(disciplina_ids)
+
+    def precisa_atualizar(self) -> bool:
+        with self._lock:
+            return (
+                self._modelo is None or self._tudo_sujo or bool(self._sujas)
+                or time.monotonic() - self._construido_em >= self.rebuild_seconds
+            )
+
+    def atualizar(self, db: Session):
+        """Relê todas as avaliações, ou só as das disciplinas marcadas, e remonta as matrizes."""
+        with self._construcao:
+            self._atualizar(db)
+
+    def _atualizar(self, db: Session):
+        with self._lock:
+            modelo = self._modelo
+            tudo = (
+                modelo is None or self._tudo_sujo
+                or time.monotonic() - self._construido_em >= self.rebuild_seconds
+            )
+            sujas = self._sujas
+            self._sujas = set()
+            self._tudo_sujo = False
+
+        if not tudo and not sujas:
+            return
+        try:
+            if tudo:
+                novo = _montar(_ler(db))
+            else:
+                base = modelo.base
+                manter = ~np.isin(base.disciplina_ids, list(sujas))
+                relidas = _ler(db, sujas)
+                novo = _montar(_Avaliacoes(
+                    aluno_ids=np.concatenate([base.aluno_ids[manter], relidas.aluno_ids]),
+                    turma_ids=np.concatenate([base.turma_ids[manter], relidas.turma_ids]),
+                    professor_ids=np.concatenate([base.professor_ids[manter], relidas.professor_ids]),
+                    disciplina_ids=np.concatenate([base.disciplina_ids[manter], relidas.disciplina_ids]),
+                    notas=np.concatenate([base.notas[manter], relidas.notas]),
+                ))
+        except BaseException:
+            # falhou: as marcadas voltam para a próxima tentativa
+            with self._lock:
+                self._sujas.update(sujas)
+                self._tudo_sujo = self._tudo_sujo or tudo
+            raise
+
+        with self._lock:
+            self._modelo = novo
+            if tudo:
+                self._construido_em = time.monotonic()
+                self.reconstrucoes += 1
+            else:
+                self.releituras_parciais += 1
+
+    def misturar(self, aluno_id: int, prof_ratings_list, prof_matrix: np.ndarray) -> np.ndarray:
+        """
+        prof_matrix (linhas de prof_ratings_list, com id_professor e
+        disciplina_id) com o perfil de cada professor misturado às notas dos
+        vizinhos do aluno. Sem modelo ou sem vizinhos, devolve prof_matrix.
+        """
+        modelo = self._modelo
+        if modelo is None or not len(prof_ratings_list):
+            return prof_matrix
+        linhas, pesos = _vizinhos(modelo, aluno_id)
+        if not len(linhas):
+            return prof_matrix
+
+        colunas, existe = _posicoes(modelo.pares, _chave_par(
+            [linha.id_professor for linha in prof_ratings_list],
+            [linha.disciplina_id for linha in prof_ratings_list],
+        ))
+        if not existe.any():
+            return prof_matrix
+
+        # somas ponderadas pelas similaridades, só nas linhas dos vizinhos e colunas pedidas
+        colunas = colunas[existe]
+        colunas_notas = (colunas[:, None] * N_FEATURES + np.arange(N_FEATURES)).ravel()
+        n = pesos @ modelo.contagens[linhas][:, colunas].toarray()
+        notas_vizinhos = (pesos @ modelo.somas[linhas][:, colunas_notas].toarray()).reshape(-1, N_FEATURES)
+
+        avaliados = n > 0
+        a = (n / (n + CF_SHRINKAGE))[:, None]
+        medias = np.divide(notas_vizinhos, n[:, None], out=np.zeros_like(notas_vizinhos), where=avaliados[:, None])
+
+        resultado = np.array(prof_matrix, dtype=np.float64)
+        alvo = np.flatnonzero(existe)[avaliados]
+        resultado[alvo] = (1 - a[avaliados]) * resultado[alvo] + a[avaliados] * medias[avaliados]
+        return resultado
+
+    def stats(self) -> dict:
+        with self._lock:
+            modelo = self._modelo
+            return {
+                "avaliacoes": 0 if modelo is None else len(modelo.base.aluno_ids),
+                "alunos": 0 if modelo is None else len(modelo.alunos),
+                "valores_nao_nulos": 0 if modelo is None else modelo.por_aluno.nnz + modelo.somas.nnz,
+                "disciplinas_pendentes": len(self._sujas),
+                "reconstrucoes": self.reconstrucoes,
+                "releituras_parciais": self.releituras_parciais,
+            }
+
+
+motor = MotorColaborativo(CF_REBUILD_SECONDS)
+professor_profiles.ao_alterar_perfis.append(motor.marcar)
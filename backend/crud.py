@@ -1,8 +1,13 @@
+import json
 from sqlalchemy.orm import Session, joinedload
 import models
 import schemas
-from sqlalchemy import func
+from sqlalchemy import cast, event, func, literal, select, update, Float
+from database import dialect_insert
 from constants.features import FEATURE_NAMES
+import recommendation_cache
+import scoring
+import professor_profiles  # registra a manutenção incremental de perfis_professores
 
 
 
@@ -14,12 +19,24 @@ def get_aluno_by_matricula(db: Session, matricula: str):
     #usada no login
     return db.query(models.Aluno).filter(models.Aluno.matricula == matricula).first()
 
+def aluno_tem_perfil(db: Session, aluno_id: int) -> bool:
+    #usada no login (has_profile), sem depender de lazy load
+    return db.query(
+        db.query(models.PerfilPreferencias)
+          .filter(models.PerfilPreferencias.aluno_id == aluno_id)
+          .exists()
+    ).scalar()
+
 #Funções das próximas rotas:
 
 # def get_disciplinas(db: Session): ...
 # def get_opcoes_preferencia(db: Session): ...
 # def get_professor_profile_vector(db: Session, professor_id: int, disciplina_id: int): ...
 # def get_aluno_preference_vector(db: Session, aluno_id: int): ...
+# mapa 'coluna_mapeada' -> 'id_opcao' em memória: as OpcaoPreferencia só mudam
+# quando o banco é populado de novo (ver invalidate_opcoes_cache)
+_opcoes_cache: dict[str, int] | None = None
+
 def get_opcoes_dict(db: Session) -> dict[str, int]:
     """
     Busca todas as OpcaoPreferencia e retorna um dicionário
@@ -27,35 +44,33 @@ def get_opcoes_dict(db: Session) -> dict[str, int]:
     
     Ex: {'slide': 1, 'quadro': 2, 'provas': 3, ...}
     """
-    opcoes = db.query(models.OpcaoPreferencia).all()
-    return {op.coluna_mapeada: op.id_opcao for op in opcoes}
+    global _opcoes_cache
+    if _opcoes_cache is not None:
+        return _opcoes_cache
 
+    opcoes = db.query(models.OpcaoPreferencia.coluna_mapeada, models.OpcaoPreferencia.id_opcao).all()
+    mapa = {coluna: id_opcao for coluna, id_opcao in opcoes}
+    if mapa:  # banco ainda não populado não fica em cache
+        _opcoes_cache = mapa
+    return mapa
 
+def invalidate_opcoes_cache():
+    global _opcoes_cache
+    _opcoes_cache = None
 
-def create_or_update_aluno_perfil(
-    db: Session, 
-    aluno: models.Aluno, 
-    perfil_data: schemas.PerfilFrontend, 
-    opcoes_map: dict[str, int]
-):
+
+@event.listens_for(models.OpcaoPreferencia, "after_insert")
+@event.listens_for(models.OpcaoPreferencia, "after_update")
+@event.listens_for(models.OpcaoPreferencia, "after_delete")
+def _opcao_alterada(mapper, connection, target):
+    invalidate_opcoes_cache()
+
+
+
+def montar_vetor_preferencias(perfil_data: schemas.PerfilFrontend) -> dict[str, int]:
     """
-    Recebe os dados do formulário (PerfilFrontend), 'traduz'
-    para o vetor de features e salva no banco de dados.
+    'Traduz' os dados do formulário (PerfilFrontend) para o vetor de features.
     """
-    
-    # 1. Garante que o Aluno tenha um PerfilPreferencias
-    if not aluno.perfil_preferencias:
-        perfil_db = models.PerfilPreferencias(aluno=aluno)
-        db.add(perfil_db)
-     
-        db.flush() # atribui o ID sem commitar
-    else:
-        perfil_db = aluno.perfil_preferencias
-        # limpa as preferências antigas para recriá-las
-        db.query(models.PreferenciaAluno)\
-          .filter_by(perfil_id=perfil_db.id_perfil).delete()
-
-    # 2. O VETOR "TRADUZIDO" 
     # Este dicionário conterá o vetor final (ex: {'slide': 1, 'quadro': 7, ...})
     vetor_final = {}
 
@@ -93,25 +108,89 @@ def create_or_update_aluno_perfil(
     imp = perfil_data.incentivoImportancia
 
     vetor_final["interacao"] = imp
-    # 3. SALVAR NO BANCO
-    preferencias = []
-    for nome, peso in vetor_final.items():
-        if nome in opcoes_map:
-            preferencias.append(
-                models.PreferenciaAluno(
-                    perfil_id=perfil_db.id_perfil,
-                    opcao_id=opcoes_map[nome],
-                    peso=peso
-                )
-            )
-
-    if preferencias:
-        db.add_all(preferencias)
+
+    return vetor_final
+
+
+def create_or_update_aluno_perfil(
+    db: Session, 
+    aluno_id: int, 
+    perfil_data: schemas.PerfilFrontend, 
+    opcoes_map: dict[str, int]
+):
+    """
+    Recebe os dados do formulário (PerfilFrontend), 'traduz'
+    para o vetor de features e salva no banco de dados.
+
+    Só os pesos que mudaram são gravados, com um único
+    INSERT ... ON CONFLICT (perfil_id, opcao_id) DO UPDATE; a cópia compacta
+    (PerfilPreferencias.vetor_pesos) é regravada na mesma transação.
+    Retorna o id do perfil.
+    """
+    
+    # 1. Perfil e pesos atuais numa consulta só
+    atuais = db.query(
+        models.PerfilPreferencias.id_perfil,
+        models.PerfilPreferencias.vetor_pesos,
+        models.PreferenciaAluno.opcao_id,
+        models.PreferenciaAluno.peso
+    ).outerjoin(
+        models.PreferenciaAluno,
+        models.PreferenciaAluno.perfil_id == models.PerfilPreferencias.id_perfil
+    ).filter(
+        models.PerfilPreferencias.aluno_id == aluno_id
+    ).all()
+
+    vetor_pesos_atual = None
+    if atuais:
+        perfil_id = atuais[0].id_perfil
+        vetor_pesos_atual = atuais[0].vetor_pesos
+    else:
+        perfil_db = models.PerfilPreferencias(aluno_id=aluno_id)
+        db.add(perfil_db)
+        db.flush() # atribui o ID sem commitar
+        perfil_id = perfil_db.id_perfil
+
+    pesos_atuais = {linha.opcao_id: linha.peso for linha in atuais if linha.opcao_id is not None}
+
+    # 2. O VETOR "TRADUZIDO" 
+    vetor_final = montar_vetor_preferencias(perfil_data)
+
+    # 3. SALVAR NO BANCO (só o que mudou)
+    alteradas = [
+        {"perfil_id": perfil_id, "opcao_id": opcoes_map[nome], "peso": peso}
+        for nome, peso in vetor_final.items()
+        if nome in opcoes_map and pesos_atuais.get(opcoes_map[nome]) != peso
+    ]
+
+    if alteradas:
+        insert_stmt = dialect_insert(db.get_bind())(models.PreferenciaAluno.__table__).values(alteradas)
+        db.execute(insert_stmt.on_conflict_do_update(
+            index_elements=["perfil_id", "opcao_id"],
+            set_={"peso": insert_stmt.excluded.peso}
+        ))
+
+    # 4. CÓPIA COMPACTA: os pesos gravados, na ordem de FEATURE_NAMES
+    pesos_finais = pesos_atuais | {linha["opcao_id"]: linha["peso"] for linha in alteradas}
+    vetor_pesos = None
+    if pesos_finais:
+        vetor_pesos = scoring.empacotar_vetor(
+            pesos_finais.get(opcoes_map.get(feature), 0) for feature in FEATURE_NAMES
+        )
+    if vetor_pesos != vetor_pesos_atual:
+        db.execute(
+            update(models.PerfilPreferencias)
+            .where(models.PerfilPreferencias.id_perfil == perfil_id)
+            .values(vetor_pesos=vetor_pesos)
+        )
 
     db.commit()
-    db.refresh(perfil_db)
 
-    return perfil_db
+    if alteradas:
+        # o vetor do aluno mudou: descarta as recomendações dele em cache
+        recommendation_cache.cache.invalidate_aluno(aluno_id)
+
+    return perfil_id
 
 
 
@@ -128,26 +207,214 @@ def get_perfil_completo_by_aluno_id(db: Session, aluno_id: int):
                  .joinedload(models.PreferenciaAluno.opcao)
              ).first()
 
+
+def get_perfil_linhas(db: Session, aluno_id: int) -> list[tuple]:
+    """
+    O mesmo perfil em tuplas (id_perfil, id_preferencia, peso, id_opcao,
+    nome, coluna_mapeada), só com as colunas usadas, sem montar objetos do
+    ORM. Perfil sem preferências vem como uma linha com None nas demais colunas.
+    """
+    return db.execute(
+        select(
+            models.PerfilPreferencias.id_perfil,
+            models.PreferenciaAluno.id_preferencia,
+            models.PreferenciaAluno.peso,
+            models.OpcaoPreferencia.id_opcao,
+            models.OpcaoPreferencia.nome,
+            models.OpcaoPreferencia.coluna_mapeada,
+        )
+        .outerjoin(models.PreferenciaAluno, models.PreferenciaAluno.perfil_id == models.PerfilPreferencias.id_perfil)
+        .outerjoin(models.OpcaoPreferencia, models.OpcaoPreferencia.id_opcao == models.PreferenciaAluno.opcao_id)
+        .where(models.PerfilPreferencias.aluno_id == aluno_id)
+        .order_by(models.PreferenciaAluno.id_preferencia)
+    ).all()
+
+
+def get_vetor_pesos(db: Session, aluno_id: int) -> bytes | None:
+    """
+    Pesos do aluno em bytes (ver scoring.desempacotar_vetor): uma busca pelo
+    índice único de aluno_id, sem joins. None se o perfil não existe ou ainda
+    não tem a cópia compacta; aí o vetor vem de get_perfil_linhas.
+    """
+    return db.execute(
+        select(models.PerfilPreferencias.vetor_pesos)
+        .where(models.PerfilPreferencias.aluno_id == aluno_id)
+    ).scalar()
+
+
+def perfil_resposta(linhas: list[tuple], aluno_id: int) -> dict | None:
+    """Resposta de POST /aluno/me/perfil (formato schemas.PerfilPreferencias) a partir de get_perfil_linhas."""
+    if not linhas:
+        return None
+    return {
+        "id_perfil": linhas[0][0],
+        "aluno_id": aluno_id,
+        "preferencias": [
+            {
+                "id_preferencia": id_preferencia,
+                "opcao": {"id_opcao": id_opcao, "nome": nome, "coluna_mapeada": coluna},
+                "peso": peso,
+            }
+            for _, id_preferencia, peso, id_opcao, nome, coluna in linhas
+            if id_preferencia is not None
+        ],
+    }
+
 def get_disciplinas(db: Session):
     return db.query(models.Disciplina).all()
 
 
+def get_cursos(db: Session):
+    return db.query(models.Curso).order_by(models.Curso.id_curso).all()
+
+
+def get_tipos_preferencia(db: Session):
+    """Tipos de preferência com as opções já carregadas."""
+    return db.query(models.TipoPreferencia).options(
+        joinedload(models.TipoPreferencia.opcoes)
+    ).order_by(models.TipoPreferencia.id_tipo).all()
+
+
 def get_professores_avg_ratings_by_disciplina(db: Session, disciplina_id: int):
+    """
+    Médias dos professores na disciplina, lidas do perfil materializado
+    (perfis_professores) em vez de agregar as avaliações a cada requisição.
+    """
+    return professores_avg_ratings_query(db, [disciplina_id]).all()
+
+
+def get_professores_avg_ratings_by_disciplinas(db: Session, disciplina_ids: list[int]):
+    """
+    Mesmo que get_professores_avg_ratings_by_disciplina para várias disciplinas
+    numa consulta só; cada linha traz também o 'disciplina_id'.
+    """
+    return professores_avg_ratings_query(db, disciplina_ids).all()
+
+
+def professores_avg_ratings_query(db: Session, disciplina_ids, semestre: str | None = None):
+    """
+    'disciplina_ids' pode ser uma lista ou um select de ids. Com 'semestre',
+    médias só das avaliações daquele semestre (parciais por semestre).
+    """
+    # separado para o tools/explain_hot_queries.py inspecionar o plano
+    if semestre is not None or professor_profiles.RECENCY_MODE != "none":
+        return _professores_avg_ratings_recencia_query(db, disciplina_ids, semestre)
+
+    perfil = models.PerfilProfessor
     avg_cols = [
-        func.avg(getattr(models.Avaliacao, col)).label(f"avg_{col}")
+        (cast(getattr(perfil, f"soma_{col}"), Float) / perfil.total_avaliacoes).label(f"avg_{col}")
         for col in FEATURE_NAMES
     ]
-    
+
     return db.query(
+        perfil.disciplina_id,
         models.Professor.id_professor,
         models.Professor.nome,
-        *avg_cols 
+        *avg_cols
     ).join(
-        models.Turma, models.Professor.id_professor == models.Turma.professor_id
+        perfil, models.Professor.id_professor == perfil.professor_id
+    ).filter(
+        perfil.disciplina_id.in_(disciplina_ids),
+        perfil.total_avaliacoes > 0
+    ).order_by(
+        perfil.disciplina_id,
+        models.Professor.id_professor
+    )
+
+
+def _professores_avg_ratings_recencia_query(db: Session, disciplina_ids, semestre: str | None = None):
+    """
+    Médias ponderadas por recência (RECENCY_MODE), recombinando as parciais
+    por semestre: soma(peso * soma_f) / soma(peso * total).
+    Com 'semestre', só a parcial dele, com peso 1.
+    """
+    parcial = models.PerfilProfessorSemestre
+    if semestre is not None:
+        peso = literal(1.0, Float)
+    else:
+        peso = professor_profiles.peso_recencia()
+    total = func.sum(peso * parcial.total_avaliacoes)
+    avg_cols = [
+        (func.sum(peso * getattr(parcial, f"soma_{col}")) / total).label(f"avg_{col}")
+        for col in FEATURE_NAMES
+    ]
+
+    return db.query(
+        parcial.disciplina_id,
+        models.Professor.id_professor,
+        models.Professor.nome,
+        *avg_cols
     ).join(
-        models.Avaliacao, models.Turma.id_turma == models.Avaliacao.turma_id
-    ).filter( 
-        models.Turma.disciplina_id == disciplina_id
+        parcial, models.Professor.id_professor == parcial.professor_id
+    ).filter(
+        parcial.disciplina_id.in_(disciplina_ids),
+        *([parcial.semestre == semestre] if semestre is not None else [])
     ).group_by(
-        models.Professor.id_professor, models.Professor.nome
-    ).all()
\ No newline at end of file
+        parcial.disciplina_id,
+        models.Professor.id_professor,
+        models.Professor.nome
+    ).having(
+        total > 0
+    ).order_by(
+        parcial.disciplina_id,
+        models.Professor.id_professor
+    )
+
+def get_rankings_arquetipo(db: Session, vetor: str, disciplina_ids: list[int]) -> dict[int, list[dict]]:
+    """
+    Rankings pré-calculados (rankings_arquetipos) do vetor nas disciplinas pedidas,
+    por disciplina_id. Disciplinas ainda não calculadas ficam de fora.
+    """
+    linhas = db.query(
+        models.RankingArquetipo.disciplina_id,
+        models.RankingArquetipo.ranking
+    ).filter(
+        models.RankingArquetipo.vetor == vetor,
+        models.RankingArquetipo.disciplina_id.in_(disciplina_ids)
+    ).all()
+    return {disciplina_id: json.loads(ranking) for disciplina_id, ranking in linhas}
+
+
+def iter_vetores_preferencias(db: Session, tamanho_bloco: int = 10_000):
+    """
+    Percorre todos os perfis de preferência em streaming (yield_per),
+    gerando (aluno_id, [pesos na ordem de FEATURE_NAMES]) por aluno.
+
+    Lê a cópia compacta (vetor_pesos); perfis que ainda não a têm vêm
+    depois, montados a partir de preferencias_aluno.
+    """
+    compactos = db.execute(
+        select(models.PerfilPreferencias.aluno_id, models.PerfilPreferencias.vetor_pesos)
+        .where(models.PerfilPreferencias.vetor_pesos.is_not(None))
+        .order_by(models.PerfilPreferencias.aluno_id)
+    ).yield_per(tamanho_bloco)
+    for aluno_id, vetor_pesos in compactos:
+        yield aluno_id, list(vetor_pesos)
+
+    linhas = db.execute(
+        select(
+            models.PerfilPreferencias.aluno_id,
+            models.OpcaoPreferencia.coluna_mapeada,
+            models.PreferenciaAluno.peso,
+        ).join(
+            models.PreferenciaAluno,
+            models.PreferenciaAluno.perfil_id == models.PerfilPreferencias.id_perfil,
+        ).join(
+            models.OpcaoPreferencia,
+            models.OpcaoPreferencia.id_opcao == models.PreferenciaAluno.opcao_id,
+        ).where(
+            models.PerfilPreferencias.vetor_pesos.is_(None)
+        ).order_by(models.PerfilPreferencias.aluno_id)
+    ).yield_per(tamanho_bloco)
+
+    aluno_atual = None
+    pesos = {}
+    for aluno_id, coluna, peso in linhas:
+        if aluno_id != aluno_atual:
+            if aluno_atual is not None:
+                yield aluno_atual, [pesos.get(feature, 0) for feature in FEATURE_NAMES]
+            aluno_atual = aluno_id
+            pesos = {}
+        pesos[coluna] = peso
+    if aluno_atual is not None:
+        yield aluno_atual, [pesos.get(feature, 0) for feature in FEATURE_NAMES]
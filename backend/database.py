@@ -1,24 +1,240 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from starlette.concurrency import run_in_threadpool
 
 # Load environment variables from a .env file if present (local dev convenience).
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-if not DATABASE_URL:
-    # Fails fast to avoid accidentally using a hardcoded/incorrect URL.
-    raise RuntimeError("DATABASE_URL environment variable is not set")
+# DB_ASYNC=true: routes get an AsyncSession (asyncpg, aiosqlite for SQLite) instead of a sync Session.
+# The sync engine is always created for scripts and bulk tools.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit = False, autoflush= False, bind= engine)
+# Optional read-only replica: read-only routes (get_read_db) use it, writes stay on the primary.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
+
+# Pool sizing (per process, per engine). Ignored for SQLite.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Hosted Postgres (Neon, ...) drops idle connections: test each one on checkout
+# and replace connections older than DB_POOL_RECYCLE seconds.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# After a write, that key's reads stay on the primary for this long (replica lag).
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Server-side statement_timeout in milliseconds (0 = no limit). Postgres only.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def _pool_kwargs(url) -> dict:
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def _connect_args(url) -> dict:
+    """statement_timeout for libpq drivers (psycopg2), sent at connection startup."""
+    if url.get_backend_name() != "postgresql" or DB_STATEMENT_TIMEOUT_MS <= 0:
+        return {}
+    return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+
+def _async_url(url):
+    """Same database, async driver (asyncpg / aiosqlite)."""
+    connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        # asyncpg does not understand libpq's sslmode/channel_binding (e.g. Neon URLs)
+        sslmode = url.query.get("sslmode")
+        url = url.difference_update_query(["sslmode", "channel_binding"])
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        url = url.set(drivername="postgresql+asyncpg")
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url, connect_args
+
+
+def _create_engine(url):
+    return create_engine(url, connect_args=_connect_args(url), **_pool_kwargs(url))
+
+
+def _create_async_engine(url):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url, connect_args = _async_url(url)
+    return create_async_engine(async_url, connect_args=connect_args, **_pool_kwargs(url))
+
+
+# Engines are not created on import (no driver imports, no DATABASE_URL check):
+# the app lifespan calls iniciar(), and scripts get it on their first session.
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            iniciar()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit = False, autoflush= False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal() # incializa a sessao
-    try:
-        yield db  # fornece a sessão para a requisição
-    finally:
-        db.close() # fecha a sessão ao final da requisição
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    class _LazyAsyncSessionmaker(async_sessionmaker):
+        def __call__(self, **local_kw):
+            if self.kw.get("bind") is None:
+                iniciar()
+            return super().__call__(**local_kw)
+
+    AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
+
+# Replica sessions fall back to the primary when DATABASE_REPLICA_URL is not set.
+ReplicaSessionLocal = SessionLocal
+AsyncReplicaSessionLocal = AsyncSessionLocal
+if DATABASE_REPLICA_URL:
+    ReplicaSessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+    if DB_ASYNC:
+        AsyncReplicaSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
+
+_engines: dict = {}
+_engines_lock = threading.Lock()
+
+
+def iniciar():
+    """Creates the engines (once) and binds the session factories to them."""
+    with _engines_lock:
+        if _engines:
+            return
+        if not DATABASE_URL:
+            # Fails fast to avoid accidentally using a hardcoded/incorrect URL.
+            raise RuntimeError("DATABASE_URL environment variable is not set")
+
+        url = make_url(DATABASE_URL)
+        engines = {"engine": _create_engine(url), "async_engine": None, "replica_engine": None}
+        SessionLocal.configure(bind=engines["engine"])
+        if DB_ASYNC:
+            engines["async_engine"] = _create_async_engine(url)
+            AsyncSessionLocal.configure(bind=engines["async_engine"])
+
+        if DATABASE_REPLICA_URL:
+            replica_url = make_url(DATABASE_REPLICA_URL)
+            engines["replica_engine"] = _create_engine(replica_url)
+            ReplicaSessionLocal.configure(bind=engines["replica_engine"])
+            if DB_ASYNC:
+                AsyncReplicaSessionLocal.configure(bind=_create_async_engine(replica_url))
+        _engines.update(engines)
+
+
+async def encerrar():
+    """Closes the pooled connections of every engine (app shutdown)."""
+    fabricas = [SessionLocal, ReplicaSessionLocal, AsyncSessionLocal, AsyncReplicaSessionLocal]
+    for fabrica in {id(f): f for f in fabricas if f is not None}.values():
+        engine = fabrica.kw.get("bind")
+        if engine is None:
+            continue
+        if hasattr(engine, "sync_engine"):  # AsyncEngine
+            await engine.dispose()
+        else:
+            engine.dispose()
+
+
+def __getattr__(nome):
+    # engine, async_engine and replica_engine: created on first access
+    if nome in ("engine", "async_engine", "replica_engine"):
+        iniciar()
+        return _engines[nome]
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+def dialect_insert(bind):
+    """
+    Retorna o insert() do dialeto em uso, que suporta ON CONFLICT
+    (Postgres em produção, SQLite em scripts/testes locais).
+    """
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Dialeto sem suporte a upsert: {bind.dialect.name}")
+    return insert
+
+# get_read_db: session for read-only routes, on the replica when
+# DATABASE_REPLICA_URL is set (it may lag behind the primary), otherwise the
+# same as get_db.
+if DB_ASYNC:
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    async def get_read_db():
+        async with AsyncReplicaSessionLocal() as db:
+            yield db
+else:
+    def get_db():
+        db = SessionLocal() # incializa a sessao
+        try:
+            yield db  # fornece a sessão para a requisição
+        finally:
+            db.close() # fecha a sessão ao final da requisição
+
+    def get_read_db():
+        db = ReplicaSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+_escritas_recentes: dict = {}
+
+
+def marcar_escrita(chave):
+    """Records a write for 'chave' (e.g. an aluno id) in this process."""
+    if not DATABASE_REPLICA_URL:
+        return
+    agora = time.monotonic()
+    if len(_escritas_recentes) > 10_000:
+        for antiga in [k for k, quando in _escritas_recentes.items() if agora - quando >= REPLICA_STICKY_SECONDS]:
+            _escritas_recentes.pop(antiga, None)
+    _escritas_recentes[chave] = agora
+
+
+def ler_do_primario(chave) -> bool:
+    """True if 'chave' wrote within REPLICA_STICKY_SECONDS: read it from the primary."""
+    quando = _escritas_recentes.get(chave)
+    return quando is not None and time.monotonic() - quando < REPLICA_STICKY_SECONDS
+
+
+def fabrica_leitura(chave=None):
+    """Sessionmaker for reads of 'chave': the replica, or the primary right after a write."""
+    if chave is not None and ler_do_primario(chave):
+        return AsyncSessionLocal if DB_ASYNC else SessionLocal
+    return AsyncReplicaSessionLocal if DB_ASYNC else ReplicaSessionLocal
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Runs a sync function that takes a Session as first argument (e.g. crud.*)
+    without blocking the event loop, whatever session get_db handed out:
+    AsyncSession -> run_sync on the async connection; Session -> threadpool.
+    """
+    if AsyncSessionLocal is not None and not isinstance(db, Session):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
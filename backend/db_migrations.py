@@ -0,0 +1,70 @@
+"""
+Esquema do banco pelas migrações do Alembic (migrations/), no lugar do
+drop_all/create_all que apagava tudo a cada init_database().
+
+    python db_migrations.py            # aplica as migrações pendentes
+    alembic upgrade head               # o mesmo, pelo Alembic (em backend/)
+    alembic revision --autogenerate -m "..."   # nova migração a partir de models.py
+
+Bancos criados antes das migrações (com create_all, sem a tabela
+alembic_version) são adotados: as tabelas e índices que faltam são criados
+sem tocar nos dados e o banco é marcado na revisão inicial, então só as
+migrações seguintes rodam.
+"""
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+import models  # noqa: F401  (registra as tabelas em Base.metadata)
+from database import Base, engine
+
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+REVISAO_INICIAL = "0001"
+
+# o que a revisão inicial cria: a adoção não pode criar objetos de migrações
+# posteriores, senão elas falham ao rodar em seguida
+TABELAS_REVISAO_INICIAL = (
+    "alunos", "cursos", "professores", "tipos_preferencia", "disciplinas",
+    "opcoes_preferencia", "perfis_preferencias", "preferencias_aluno", "turmas",
+    "avaliacoes", "perfis_professores", "perfis_professores_semestre", "rankings_arquetipos",
+)
+INDICES_REVISAO_INICIAL = (
+    "ix_alunos_matricula", "ix_turmas_disciplina_professor", "ix_turmas_professor_id",
+    "ix_avaliacoes_turma_id", "ix_perfis_professores_disciplina_id",
+    "ix_perfis_professores_semestre_disciplina_id", "ix_perfis_professores_semestre_ordinal",
+)
+
+
+def _config(conexao) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = conexao
+    # não reconfigura o logging da aplicação
+    config.attributes["configurar_logs"] = False
+    return config
+
+
+def _adotar_banco_legado(conexao):
+    """Cria o que falta da revisão inicial (checkfirst) sem apagar nada."""
+    tabelas = [Base.metadata.tables[nome] for nome in TABELAS_REVISAO_INICIAL]
+    Base.metadata.create_all(conexao, tables=tabelas, checkfirst=True)
+    for tabela in tabelas:
+        for indice in tabela.indexes:
+            if indice.name in INDICES_REVISAO_INICIAL:
+                indice.create(conexao, checkfirst=True)
+
+
+def upgrade(revisao: str = "head", progresso=print):
+    with engine.begin() as conexao:
+        tabelas = set(inspect(conexao).get_table_names())
+        config = _config(conexao)
+        if "alembic_version" not in tabelas and models.Aluno.__tablename__ in tabelas:
+            progresso("Banco sem alembic_version: adotando na revisão inicial.")
+            _adotar_banco_legado(conexao)
+            command.stamp(config, REVISAO_INICIAL)
+        command.upgrade(config, revisao)
+
+
+if __name__ == "__main__":
+    upgrade()
+    print("Migrações aplicadas.")
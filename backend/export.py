@@ -0,0 +1,212 @@
+"""
+Exportação em streaming para análise: médias dos professores e matriz de
+similaridade aluno x professor.
+
+Tudo é gerado por geradores sobre cursores do servidor (yield_per), em blocos
+de tamanho fixo, então a memória não depende de quantos alunos e professores
+existem. Formatos: NDJSON, CSV e Parquet (este só com pyarrow instalado).
+Usado por GET /admin/export/... e por tools/exportar.py.
+
+Filtros (todos opcionais): semestre (médias só das avaliações daquele
+semestre), curso_id e disciplina_id.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import crud
+import lazy_imports
+import models
+import scoring
+from constants.features import FEATURE_NAMES
+
+np = lazy_imports.sob_demanda("numpy")
+
+
+FORMATOS = ("ndjson", "csv", "parquet")
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+LINHAS_POR_BLOCO = 5_000
+# a matriz de um bloco tem alunos x professores x 7 floats (~14 MB com 500 x 500)
+ALUNOS_POR_BLOCO = 500
+PROFESSORES_POR_BLOCO = 500
+
+COLUNAS_PROFESSORES = [
+    "disciplina_id", "disciplina", "curso_id", "professor_id", "professor", "semestre",
+    *[f"avg_{feature}" for feature in FEATURE_NAMES],
+]
+COLUNAS_SIMILARIDADES = ["aluno_id", "disciplina_id", "professor_id", "similaridade", "estrelas"]
+
+# tipo de cada coluna (todas podem ser nulas): o schema do Parquet é fixo
+# desde o início, e não inferido do primeiro bloco
+TIPOS_COLUNAS = {
+    "aluno_id": int,
+    "disciplina_id": int,
+    "disciplina": str,
+    "curso_id": int,
+    "professor_id": int,
+    "professor": str,
+    "semestre": str,
+    **{f"avg_{feature}": float for feature in FEATURE_NAMES},
+    "similaridade": float,
+    "estrelas": float,
+}
+
+
+@dataclass
+class Filtros:
+    semestre: str | None = None
+    curso_id: int | None = None
+    disciplina_id: int | None = None
+
+    def disciplinas(self):
+        """select dos ids de disciplina que passam nos filtros."""
+        consulta = select(models.Disciplina.id_disciplina)
+        if self.curso_id is not None:
+            consulta = consulta.where(models.Disciplina.curso_id == self.curso_id)
+        if self.disciplina_id is not None:
+            consulta = consulta.where(models.Disciplina.id_disciplina == self.disciplina_id)
+        return consulta
+
+
+def _medias(db: Session, filtros: Filtros, tamanho_bloco: int):
+    """Linhas de crud.professores_avg_ratings_query em streaming (cursor do servidor), em blocos."""
+    consulta = crud.professores_avg_ratings_query(db, filtros.disciplinas(), filtros.semestre)
+    return db.execute(consulta.statement.execution_options(yield_per=tamanho_bloco)).partitions()
+
+
+def professores(db: Session, filtros: Filtros):
+    """Blocos de linhas (dicts) com as médias de cada professor em cada disciplina."""
+    catalogo = {
+        id_disciplina: (nome, curso_id)
+        for id_disciplina, nome, curso_id in db.execute(select(
+            models.Disciplina.id_disciplina, models.Disciplina.nome, models.Disciplina.curso_id
+        ))
+    }
+    for bloco in _medias(db, filtros, LINHAS_POR_BLOCO):
+        yield [
+            {
+                "disciplina_id": linha.disciplina_id,
+                "disciplina": catalogo.get(linha.disciplina_id, (None, None))[0],
+                "curso_id": catalogo.get(linha.disciplina_id, (None, None))[1],
+                "professor_id": linha.id_professor,
+                "professor": linha.nome,
+                "semestre": filtros.semestre,
+                **{f"avg_{feature}": float(getattr(linha, f"avg_{feature}")) for feature in FEATURE_NAMES},
+            }
+            for linha in bloco
+        ]
+
+
+def _blocos_alunos(db: Session):
+    bloco = []
+    for aluno_id, vetor in crud.iter_vetores_preferencias(db):
+        bloco.append((aluno_id, vetor))
+        if len(bloco) == ALUNOS_POR_BLOCO:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def similaridades(db: Session, filtros: Filtros):
+    """
+    Blocos de linhas (dicts) aluno x professor x disciplina com similaridade e
+    estrelas, como em /aluno/recomendacoes. Para cada bloco de professores os
+    perfis de preferência são percorridos de novo em streaming.
+    """
+    for bloco_prof in _medias(db, filtros, PROFESSORES_POR_BLOCO):
+        prof_matrix = scoring.ratings_matrix(bloco_prof)
+
+        for bloco_alunos in _blocos_alunos(db):
+            aluno_matrix = np.array([vetor for _, vetor in bloco_alunos], dtype=np.float64)
+            sims = scoring.similarity_matrix(aluno_matrix, prof_matrix)
+
+            yield [
+                {
+                    "aluno_id": aluno_id,
+                    "disciplina_id": prof.disciplina_id,
+                    "professor_id": prof.id_professor,
+                    "similaridade": float(sim),
+                    "estrelas": float(sim * 5),
+                }
+                for (aluno_id, _), linha_sims in zip(bloco_alunos, sims.tolist())
+                for prof, sim in zip(bloco_prof, linha_sims)
+            ]
+
+
+def _ndjson(blocos, colunas):
+    for bloco in blocos:
+        yield "".join(json.dumps(linha, ensure_ascii=False) + "\n" for linha in bloco).encode("utf-8")
+
+
+def _csv(blocos, colunas):
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=colunas)
+    escritor.writeheader()
+    for bloco in blocos:
+        escritor.writerows(bloco)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Saida(io.RawIOBase):
+    """Arquivo só de escrita que acumula os bytes até serem drenados."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _parquet(blocos, colunas):
+    # um row group por bloco; os bytes saem conforme cada row group é escrito
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {int: pa.int64(), str: pa.string(), float: pa.float64()}
+    schema = pa.schema([(coluna, tipos[TIPOS_COLUNAS[coluna]]) for coluna in colunas])
+
+    saida = _Saida()
+    escritor = pq.ParquetWriter(saida, schema)
+    for bloco in blocos:
+        escritor.write_table(pa.Table.from_pylist(bloco, schema=schema))
+        yield saida.drenar()
+    escritor.close()
+    yield saida.drenar()
+
+
+def verificar_formato(formato: str):
+    """ValueError se o formato não existe ou depende de um pacote ausente."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Exportar em Parquet requer o pacote pyarrow")
+
+
+def serializar(blocos, colunas: list[str], formato: str):
+    """Gerador de bytes no formato pedido a partir de blocos de linhas."""
+    verificar_formato(formato)
+    return {"ndjson": _ndjson, "csv": _csv, "parquet": _parquet}[formato](blocos, colunas)
@@ -0,0 +1,42 @@
+"""
+Caminho rápido de resposta JSON para as rotas quentes (recomendações e perfil).
+
+Com FAST_RESPONSES ligado as rotas devolvem uma Response já serializada com
+orjson, e o FastAPI não passa o resultado pela validação do response_model
+(que continua declarado, para a documentação). Os dados são montados pelo
+próprio backend a partir de tuplas e dicts, no formato dos schemas, então a
+revalidação só custava tempo. orjson também serializa floats do NumPy.
+
+Sem o pacote orjson cai no json da biblioteca padrão (mesma saída, mais lento).
+"""
+import json
+import os
+from fastapi import Response
+import lazy_imports
+
+np = lazy_imports.sob_demanda("numpy")
+orjson = lazy_imports.sob_demanda("orjson", opcional=True)
+
+
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+
+def _numpy(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+def dumps(dados) -> bytes:
+    """JSON em UTF-8, igual ao do JSONResponse do FastAPI."""
+    if orjson is not None:
+        return orjson.dumps(dados, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        dados, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_numpy
+    ).encode("utf-8")
+
+
+def resposta(dados, status_code: int = 200) -> Response:
+    return Response(content=dumps(dados), status_code=status_code, media_type="application/json")
@@ -0,0 +1,234 @@
+"""
+Importação em lote de avaliações (pesquisa de fim de semestre).
+
+Entrada em CSV (com cabeçalho) ou NDJSON, uma avaliação por linha, com os
+campos aluno_id, turma_id, semestre e as sete notas de FEATURE_NAMES.
+As linhas são validadas (notas inteiras de 0 a 7, como os CheckConstraints;
+4.7, true ou "4.0" são rejeitados, nunca truncados)
+e gravadas em lotes de tamanho fixo, então a memória não depende do
+tamanho do arquivo. Cada lote:
+
+1. entra por COPY (bulk.copy_rows) em uma tabela temporária de staging;
+2. vai para avaliacoes com INSERT ... SELECT ... ON CONFLICT (aluno_id,
+   turma_id) DO UPDATE, descartando aluno/turma inexistentes no join;
+3. recalcula perfis_professores das disciplinas afetadas, uma vez;
+4. faz commit.
+"""
+import csv
+import json
+import re
+from dataclasses import dataclass, field
+from sqlalchemy import Column, Integer, MetaData, String, Table, select, true
+from sqlalchemy.orm import Session
+import bulk
+import models
+import professor_profiles
+from constants.features import FEATURE_NAMES
+from database import dialect_insert
+
+
+FORMATOS = ("csv", "ndjson")
+TAMANHO_LOTE = 20_000
+TAMANHO_LOTE_MAXIMO = 100_000
+NOTA_MINIMA, NOTA_MAXIMA = 0, 7
+MAX_ERROS_REPORTADOS = 50
+
+COLUNAS = ["aluno_id", "turma_id", "semestre", *FEATURE_NAMES]
+
+_staging = Table(
+    "staging_avaliacoes",
+    MetaData(),
+    Column("aluno_id", Integer, nullable=False),
+    Column("turma_id", Integer, nullable=False),
+    Column("semestre", String(20), nullable=False),
+    *[Column(feature, Integer, nullable=False) for feature in FEATURE_NAMES],
+    prefixes=["TEMPORARY"],
+)
+
+
+@dataclass
+class ResultadoImportacao:
+    recebidas: int = 0
+    gravadas: int = 0
+    rejeitadas: int = 0
+    lotes: int = 0
+    erros: list[str] = field(default_factory=list)
+
+    def erro(self, numero_linha: int, mensagem: str):
+        self.rejeitadas += 1
+        if len(self.erros) < MAX_ERROS_REPORTADOS:
+            self.erros.append(f"linha {numero_linha}: {mensagem}")
+
+
+class LeitorLinhas:
+    """Converte linhas de texto (CSV ou NDJSON) em dicionários, uma por vez."""
+
+    def __init__(self, formato: str):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato} (use {' ou '.join(FORMATOS)})")
+        self.formato = formato
+        self.cabecalho = None
+
+    def ler(self, linha: str) -> dict | None:
+        linha = linha.strip()
+        if not linha:
+            return None
+        if self.formato == "ndjson":
+            registro = json.loads(linha)
+            if not isinstance(registro, dict):
+                raise ValueError("cada linha NDJSON deve ser um objeto")
+            return registro
+
+        valores = next(csv.reader([linha]))
+        if self.cabecalho is None:
+            cabecalho = [valor.strip() for valor in valores]
+            faltando = set(COLUNAS) - set(cabecalho)
+            if faltando:
+                raise ValueError(f"cabeçalho CSV sem as colunas: {', '.join(sorted(faltando))}")
+            self.cabecalho = cabecalho
+            return None
+        return dict(zip(self.cabecalho, valores))
+
+
+_INTEIRO = re.compile(r"[0-9]+")
+
+
+def _inteiro(campo: str, valor) -> int:
+    """Inteiro JSON (não bool) ou texto só com dígitos; qualquer outra coisa é rejeitada."""
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str) and _INTEIRO.fullmatch(valor.strip()):
+        return int(valor.strip())
+    raise ValueError(f"{campo}={valor!r} não é um inteiro")
+
+
+def validar(registro: dict) -> tuple:
+    """Tupla na ordem de COLUNAS, ou ValueError com o motivo."""
+    faltando = [coluna for coluna in COLUNAS if coluna not in registro]
+    if faltando:
+        raise ValueError(f"campo ausente: {faltando[0]}")
+
+    aluno_id = _inteiro("aluno_id", registro["aluno_id"])
+    turma_id = _inteiro("turma_id", registro["turma_id"])
+    if not isinstance(registro["semestre"], str):
+        raise ValueError(f"semestre={registro['semestre']!r} não é texto")
+    semestre = registro["semestre"].strip()
+    notas = [_inteiro(feature, registro[feature]) for feature in FEATURE_NAMES]
+
+    if not semestre or len(semestre) > 20:
+        raise ValueError("semestre vazio ou maior que 20 caracteres")
+    for feature, nota in zip(FEATURE_NAMES, notas):
+        if not NOTA_MINIMA <= nota <= NOTA_MAXIMA:
+            raise ValueError(f"{feature}={nota} fora do intervalo {NOTA_MINIMA}..{NOTA_MAXIMA}")
+
+    return (aluno_id, turma_id, semestre, *notas)
+
+
+def gravar_lote(db: Session, linhas: list[tuple]) -> int:
+    """
+    Grava um lote já validado e faz commit. Retorna quantas linhas foram
+    inseridas/atualizadas (linhas com aluno ou turma inexistente ficam de fora).
+    """
+    # a mesma (aluno, turma) duas vezes no lote quebraria o ON CONFLICT: vale a última
+    linhas = list({(linha[0], linha[1]): linha for linha in linhas}.values())
+
+    conexao = db.connection()
+    _staging.drop(conexao, checkfirst=True)
+    _staging.create(conexao)
+    bulk.copy_rows(db, _staging, COLUNAS, linhas)
+
+    avaliacoes = models.Avaliacao.__table__
+    validas = select(
+        *[_staging.c[coluna] for coluna in COLUNAS]
+    ).join(
+        models.Aluno.__table__, models.Aluno.id_aluno == _staging.c.aluno_id
+    ).join(
+        models.Turma.__table__, models.Turma.id_turma == _staging.c.turma_id
+    ).where(true())  # o SQLite exige um WHERE antes do ON CONFLICT em INSERT ... SELECT
+
+    insert_stmt = dialect_insert(conexao)(avaliacoes).from_select(COLUNAS, validas)
+    gravadas = db.execute(insert_stmt.on_conflict_do_update(
+        index_elements=["aluno_id", "turma_id"],
+        set_={coluna: insert_stmt.excluded[coluna] for coluna in ["semestre", *FEATURE_NAMES]},
+    )).rowcount
+
+    disciplinas = db.execute(
+        select(models.Turma.disciplina_id).distinct()
+        .where(models.Turma.id_turma.in_(select(_staging.c.turma_id)))
+    ).scalars().all()
+    professor_profiles.refresh_disciplinas(db, disciplinas)
+
+    _staging.drop(conexao)
+    db.commit()
+    return gravadas
+
+
+class Importacao:
+    """
+    Importação incremental: recebe linha a linha (útil para corpo de
+    requisição em streaming) e grava a cada 'tamanho_lote' linhas válidas.
+    """
+
+    def __init__(self, db: Session, formato: str, tamanho_lote: int = TAMANHO_LOTE, progresso=print):
+        if not 1 <= tamanho_lote <= TAMANHO_LOTE_MAXIMO:
+            raise ValueError(f"tamanho_lote deve estar entre 1 e {TAMANHO_LOTE_MAXIMO}")
+        self.db = db
+        self.leitor = LeitorLinhas(formato)
+        self.tamanho_lote = tamanho_lote
+        self.progresso = progresso
+        self.resultado = ResultadoImportacao()
+        self.lote = []
+        self.numero_linha = 0
+
+    def adicionar_linha(self, linha: str) -> bool:
+        """Retorna True quando o lote está cheio e deve ser gravado com gravar()."""
+        self.numero_linha += 1
+        try:
+            registro = self.leitor.ler(linha)
+        except ValueError as exc:
+            # cabeçalho CSV inválido aborta a importação; linha inválida só é rejeitada
+            if self.leitor.formato == "csv" and self.leitor.cabecalho is None:
+                raise
+            self.resultado.recebidas += 1
+            self.resultado.erro(self.numero_linha, str(exc))
+            return False
+        if registro is None:
+            return False
+
+        self.resultado.recebidas += 1
+        try:
+            self.lote.append(validar(registro))
+        except ValueError as exc:
+            self.resultado.erro(self.numero_linha, str(exc))
+        return len(self.lote) >= self.tamanho_lote
+
+    def gravar(self):
+        if not self.lote:
+            return
+        try:
+            gravadas = gravar_lote(self.db, self.lote)
+        except Exception:
+            self.db.rollback()
+            raise
+        self.resultado.lotes += 1
+        self.resultado.gravadas += gravadas
+        # repetidas no lote e aluno/turma inexistentes (descartadas pelo join)
+        self.resultado.rejeitadas += len(self.lote) - gravadas
+        self.lote = []
+        self.progresso(
+            f"lote {self.resultado.lotes}: {self.resultado.gravadas} gravadas, "
+            f"{self.resultado.rejeitadas} rejeitadas de {self.resultado.recebidas} recebidas"
+        )
+
+    def finalizar(self) -> ResultadoImportacao:
+        self.gravar()
+        return self.resultado
+
+
+def importar(db: Session, linhas_texto, formato: str, tamanho_lote: int = TAMANHO_LOTE, progresso=print) -> ResultadoImportacao:
+    """Importa um iterável de linhas de texto (arquivo aberto, stdin, ...)."""
+    importacao = Importacao(db, formato, tamanho_lote, progresso)
+    for linha in linhas_texto:
+        if importacao.adicionar_linha(linha):
+            importacao.gravar()
+    return importacao.finalizar()
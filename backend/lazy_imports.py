@@ -0,0 +1,39 @@
+"""
+Dependências pesadas (numpy, jose, orjson) importadas só no primeiro uso.
+
+    np = lazy_imports.sob_demanda("numpy")
+
+devolve um módulo vazio que importa o verdadeiro no primeiro atributo
+pedido (np.array, ...) e copia o conteúdo dele para si: dali em diante o
+acesso é um lookup normal, sem custo extra. Assim o import de main.py (e o
+cold start dos workers) não paga o numpy; o primeiro uso, ou o
+STARTUP_WARMUP, paga. O import em si fica com o lock de import do Python,
+então duas threads no primeiro acesso não são problema.
+
+Use para bibliotecas de terceiros, cujos atributos não mudam depois do
+import; módulos do projeto continuam com import normal.
+"""
+import importlib
+import importlib.util
+import sys
+import types
+
+
+class _ModuloSobDemanda(types.ModuleType):
+    def __getattr__(self, nome):
+        # só é chamado para atributos que ainda não estão no dicionário
+        modulo = importlib.import_module(self.__name__)
+        self.__dict__.update(modulo.__dict__)
+        return getattr(modulo, nome)
+
+
+def sob_demanda(nome: str, opcional: bool = False):
+    """
+    Módulo 'nome', importado no primeiro acesso a um atributo. Com
+    opcional=True retorna None se o pacote não estiver instalado.
+    """
+    if nome in sys.modules:
+        return sys.modules[nome]
+    if opcional and importlib.util.find_spec(nome) is None:
+        return None
+    return _ModuloSobDemanda(nome)
@@ -1,12 +1,134 @@
-from fastapi import FastAPI
+import time
+_inicio_importacao = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from routers import auth_router as auth_router
 from routers import aluno_routes as aluno_router
+from routers import admin_routes as admin_router
 from fastapi.middleware.cors import CORSMiddleware
+import auth
+import collaborative_filtering
+import database
+import metrics
+import password_pool
+import precomputed_rankings
+import professor_index
+import recommendation_cache
+import shared_profiles
+import startup
+import token_cache
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def _atualizar_rankings():
+    db = SessionLocal()
+    try:
+        precomputed_rankings.atualizar(db)
+    finally:
+        db.close()
+
+
+def _atualizar_colaborativo():
+    motor = collaborative_filtering.motor
+    if not motor.precisa_atualizar():
+        return
+    db = SessionLocal()
+    try:
+        motor.atualizar(db)
+    finally:
+        db.close()
+
+
+def _publicar_perfis():
+    db = SessionLocal()
+    try:
+        shared_profiles.publicar_se_publicador(db)
+    finally:
+        db.close()
+
+
+def _verificar_perfis():
+    db = SessionLocal()
+    try:
+        shared_profiles.store.verificar(db)
+    finally:
+        db.close()
+
+
+async def _job(funcao, intervalo: float, descricao: str):
+    """Roda 'funcao' no threadpool a cada 'intervalo' segundos até ser cancelado."""
+    while True:
+        try:
+            await run_in_threadpool(funcao)
+        except Exception:
+            logger.exception("Erro ao %s", descricao)
+        await asyncio.sleep(intervalo)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    relatorio = startup.relatorio
+    with relatorio.fase("configuracao"):
+        auth.verificar_configuracao()
+    with relatorio.fase("banco"):
+        database.iniciar()
+    if startup.STARTUP_WARMUP:
+        await startup.aquecer()
 
-app = FastAPI()
+    jobs = []
+    if precomputed_rankings.REFRESH_SECONDS > 0:
+        jobs.append(asyncio.create_task(_job(
+            _atualizar_rankings, precomputed_rankings.REFRESH_SECONDS, "pré-calcular rankings"
+        )))
+    if collaborative_filtering.CF_REFRESH_SECONDS > 0:
+        jobs.append(asyncio.create_task(_job(
+            _atualizar_colaborativo, collaborative_filtering.CF_REFRESH_SECONDS, "atualizar a filtragem colaborativa"
+        )))
+    if shared_profiles.SHARED_PROFILES_DIR and shared_profiles.SHARED_PROFILES_REFRESH_SECONDS > 0:
+        # todos os workers tentam, só o que pegar a trava publica (ver shared_profiles.py)
+        jobs.append(asyncio.create_task(_job(
+            _publicar_perfis, shared_profiles.SHARED_PROFILES_REFRESH_SECONDS, "publicar os perfis compartilhados"
+        )))
+    if shared_profiles.SHARED_PROFILES_DIR:
+        # sem verificar, a geração não é usada: alterações de outros workers só aparecem aqui
+        jobs.append(asyncio.create_task(_job(
+            _verificar_perfis, shared_profiles.SHARED_PROFILES_CHECK_SECONDS, "verificar os perfis compartilhados"
+        )))
+    logger.info(relatorio.resumo())
+    yield
+    for job in jobs:
+        job.cancel()
+    password_pool.shutdown()
+    await database.encerrar()
+
+
+async def medir_requisicao(request: Request, call_next):
+    contagem, token = metrics.iniciar_requisicao()
+    inicio = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # rota como template (/aluno/recomendacoes), não a URL com parâmetros
+        rota = getattr(request.scope.get("route"), "path", "desconhecida")
+        metrics.observar_requisicao(
+            request.method, rota, status_code, time.perf_counter() - inicio, contagem
+        )
+        metrics.encerrar_requisicao(token)
+
+
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-app.include_router(auth_router.router)
-app.include_router(aluno_router.router)
 
 origins = [
     "http://localhost:5173",  # Vite
@@ -15,10 +137,58 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],   
-    allow_headers=["*"],   
-)
+
+def create_app() -> FastAPI:
+    """
+    Monta a aplicação sem tocar no banco nem exigir SECRET_KEY: a
+    configuração é validada e o engine criado no lifespan
+    (uvicorn main:create_app --factory, ou main:app).
+    """
+    app = FastAPI(lifespan=lifespan)
+
+    if metrics.METRICS_ENABLED:
+        metrics.registrar_coletor(
+            "cache_recomendacoes", recommendation_cache.cache.stats,
+            ("hits", "misses", "evictions", "expirations", "invalidations"),
+        )
+        metrics.registrar_coletor("cache_tokens", token_cache.cache.stats, ("hits", "misses"))
+        metrics.registrar_coletor("bcrypt", password_pool.stats, ("rejected", "succeeded", "failed", "restarts", "latency_seconds_sum"))
+        metrics.registrar_coletor(
+            "indice_professores", professor_index.index.stats, ("reconstrucoes", "atualizacoes_incrementais")
+        )
+        metrics.registrar_coletor(
+            "filtragem_colaborativa", collaborative_filtering.motor.stats, ("reconstrucoes", "releituras_parciais")
+        )
+        metrics.registrar_coletor("perfis_compartilhados", shared_profiles.store.stats, ("trocas", "leituras_do_banco"))
+        metrics.registrar_coletor("inicializacao", startup.relatorio.stats)
+        app.middleware("http")(medir_requisicao)
+        app.add_api_route("/metrics", get_metrics, methods=["GET"], include_in_schema=False)
+
+    app.include_router(auth_router.router)
+    app.include_router(aluno_router.router)
+    app.include_router(admin_router.router)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],   
+        allow_headers=["*"],   
+    )
+    return app
+
+
+_app = None
+
+
+def __getattr__(nome: str):
+    # main:app é montada no primeiro acesso: com --factory só existe a do uvicorn
+    global _app
+    if nome == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+startup.relatorio.registrar("importacao", time.perf_counter() - _inicio_importacao)
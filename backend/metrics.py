@@ -0,0 +1,200 @@
+"""
+Métricas de desempenho em memória, expostas em GET /metrics no formato
+texto do Prometheus.
+
+- latência por rota (middleware em main.py);
+- tempo de banco e número de queries por requisição, contados pelos eventos
+  do SQLAlchemy em todas as engines e acumulados na requisição atual via
+  contextvars (o contexto acompanha o threadpool e o run_sync do async);
+- tempos de operações quentes com medir("scoring"), medir("jwt_decode"), ...;
+- contadores dos caches e do pool de bcrypt, lidos na hora do scrape.
+
+As métricas são por processo: com vários workers, cada um expõe as suas.
+Também aqui o log amostrado (LOG_SAMPLE_RATE) que substitui os prints de
+depuração das rotas.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0"))
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_QUERIES = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    """Histograma com labels (buckets acumulados, soma e contagem, como no Prometheus)."""
+
+    def __init__(self, nome: str, ajuda: str, labels: tuple[str, ...], buckets=BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_labels):
+        with self._lock:
+            serie = self._series.get(valores_labels)
+            if serie is None:
+                serie = self._series[valores_labels] = [[0] * len(self.buckets), 0.0, 0]
+            contagens = serie[0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    contagens[i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def linhas(self) -> list[str]:
+        with self._lock:
+            series = {chave: ([*c], s, n) for chave, (c, s, n) in self._series.items()}
+
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for valores_labels, (contagens, soma, total) in sorted(series.items()):
+            base = _labels(self.labels, valores_labels)
+            for limite, contagem in zip(self.buckets, contagens):
+                linhas.append(f'{self.nome}_bucket{_labels(self.labels, valores_labels, le=limite)} {contagem}')
+            linhas.append(f'{self.nome}_bucket{_labels(self.labels, valores_labels, le="+Inf")} {total}')
+            linhas.append(f"{self.nome}_sum{base} {soma}")
+            linhas.append(f"{self.nome}_count{base} {total}")
+        return linhas
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(nomes, valores, le=None) -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if le is not None:
+        pares.append(f'le="{le}"')
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+requisicao_segundos = Histograma(
+    "sra_http_requisicao_segundos", "Latência das requisições por rota.", ("metodo", "rota", "status")
+)
+db_segundos = Histograma(
+    "sra_http_db_segundos", "Tempo gasto no banco por requisição.", ("rota",)
+)
+queries_por_requisicao = Histograma(
+    "sra_http_queries", "Queries SQL emitidas por requisição.", ("rota",), BUCKETS_QUERIES
+)
+operacao_segundos = Histograma(
+    "sra_operacao_segundos", "Tempo de operações internas (scoring, bcrypt, jwt_decode, ...).", ("operacao",)
+)
+
+_HISTOGRAMAS = [requisicao_segundos, db_segundos, queries_por_requisicao, operacao_segundos]
+
+# nome -> (função que devolve {chave: número}, lida a cada scrape; chaves que só crescem)
+_coletores = {}
+
+
+def registrar_coletor(nome: str, funcao, contadores=()):
+    """
+    Expõe os valores numéricos de funcao() como sra_<nome>_<chave>: counter
+    para as chaves em 'contadores' (que só crescem), gauge para as demais.
+    """
+    _coletores[nome] = (funcao, frozenset(contadores))
+
+
+@contextmanager
+def medir(operacao: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        operacao_segundos.observar(time.perf_counter() - inicio, operacao)
+
+
+# --- banco por requisição ---
+
+_requisicao_atual = ContextVar("requisicao_atual", default=None)
+
+
+class _ContagemBanco:
+    __slots__ = ("segundos", "queries")
+
+    def __init__(self):
+        self.segundos = 0.0
+        self.queries = 0
+
+
+def iniciar_requisicao():
+    """Começa a contar o banco para a requisição atual; devolve (contagem, token)."""
+    contagem = _ContagemBanco()
+    return contagem, _requisicao_atual.set(contagem)
+
+
+def encerrar_requisicao(token):
+    _requisicao_atual.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_da_query(conn, cursor, statement, parameters, context, executemany):
+    if _requisicao_atual.get() is not None:
+        conn.info["sra_inicio_query"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois_da_query(conn, cursor, statement, parameters, context, executemany):
+    contagem = _requisicao_atual.get()
+    if contagem is None:
+        return
+    inicio = conn.info.pop("sra_inicio_query", None)
+    if inicio is not None:
+        contagem.segundos += time.perf_counter() - inicio
+    contagem.queries += 1
+
+
+def observar_requisicao(metodo: str, rota: str, status: int, segundos: float, contagem: _ContagemBanco):
+    requisicao_segundos.observar(segundos, metodo, rota, status)
+    db_segundos.observar(contagem.segundos, rota)
+    queries_por_requisicao.observar(contagem.queries, rota)
+
+
+def render() -> str:
+    linhas = []
+    for histograma in _HISTOGRAMAS:
+        linhas.extend(histograma.linhas())
+    for nome, (funcao, contadores) in _coletores.items():
+        for chave, valor in funcao().items():
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                metrica = f"sra_{nome}_{chave}"
+                linhas.append(f"# TYPE {metrica} {'counter' if chave in contadores else 'gauge'}")
+                linhas.append(f"{metrica} {valor}")
+    return "\n".join(linhas) + "\n"
+
+
+# --- log amostrado ---
+
+_logger_amostras = logging.getLogger("sra.amostras")
+if not _logger_amostras.handlers:
+    # sem depender da configuração de logging do servidor: a linha JSON vai para o stdout
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger_amostras.addHandler(_handler)
+    _logger_amostras.setLevel(logging.INFO)
+    _logger_amostras.propagate = False
+
+
+def log_amostrado(evento: str, campos):
+    """
+    Uma linha JSON (logger 'sra.amostras', nível INFO) para uma fração
+    LOG_SAMPLE_RATE das chamadas (0 desliga). 'campos' é uma função que
+    devolve o dict do evento, chamada só quando a linha vai ser registrada.
+    """
+    if LOG_SAMPLE_RATE <= 0 or random.random() >= LOG_SAMPLE_RATE:
+        return
+    _logger_amostras.info(json.dumps({"evento": evento, **campos()}, ensure_ascii=False, default=str))
@@ -0,0 +1,53 @@
+"""
+Ambiente do Alembic: usa a engine de database.py (DATABASE_URL) e os
+modelos de models.py como alvo do --autogenerate.
+"""
+from logging.config import fileConfig
+from alembic import context
+import models  # noqa: F401  (registra as tabelas em Base.metadata)
+from database import Base, engine
+
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configurar_logs", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _opcoes(dialeto: str) -> dict:
+    # SQLite não tem ALTER TABLE completo: as migrações recriam a tabela (batch)
+    return {"render_as_batch": dialeto == "sqlite", "compare_type": True}
+
+
+def run_migrations_offline():
+    """Gera o SQL sem conectar (alembic upgrade head --sql)."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        **_opcoes(engine.dialect.name),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    conexao = config.attributes.get("connection")
+    if conexao is not None:
+        # chamado por db_migrations.upgrade() com uma conexão já aberta
+        context.configure(connection=conexao, target_metadata=target_metadata, **_opcoes(conexao.dialect.name))
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as conexao:
+        context.configure(connection=conexao, target_metadata=target_metadata, **_opcoes(conexao.dialect.name))
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
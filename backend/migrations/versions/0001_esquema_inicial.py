@@ -0,0 +1,191 @@
+"""esquema inicial
+
+Todas as tabelas de models.py, com os índices de consulta e as tabelas
+agregadas (perfis_professores, perfis_professores_semestre e
+rankings_arquetipos). Bancos criados antes das migrações (create_all) são
+adotados nesta revisão por db_migrations.upgrade().
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:03:06.853769
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# congeladas aqui: a migração não deve mudar se constants/features.py mudar
+NOTAS = ['slide', 'quadro', 'velocidade_aula', 'provas', 'trabalhos', 'projetos', 'interacao']
+
+
+def _colunas_perfil():
+    return [
+        sa.Column('total_avaliacoes', sa.Integer(), nullable=False),
+        *[sa.Column(f'soma_{nota}', sa.Integer(), nullable=False) for nota in NOTAS],
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'alunos',
+        sa.Column('id_aluno', sa.Integer(), nullable=False),
+        sa.Column('matricula', sa.String(length=50), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id_aluno'),
+    )
+    op.create_index('ix_alunos_matricula', 'alunos', ['matricula'], unique=True)
+
+    op.create_table(
+        'cursos',
+        sa.Column('id_curso', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id_curso'),
+        sa.UniqueConstraint('nome'),
+    )
+    op.create_table(
+        'professores',
+        sa.Column('id_professor', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id_professor'),
+    )
+    op.create_table(
+        'tipos_preferencia',
+        sa.Column('id_tipo', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id_tipo'),
+        sa.UniqueConstraint('nome'),
+    )
+    op.create_table(
+        'disciplinas',
+        sa.Column('id_disciplina', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.Column('curso_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['curso_id'], ['cursos.id_curso']),
+        sa.PrimaryKeyConstraint('id_disciplina'),
+        sa.UniqueConstraint('nome'),
+    )
+    op.create_table(
+        'opcoes_preferencia',
+        sa.Column('id_opcao', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.Column('tipo_id', sa.Integer(), nullable=False),
+        sa.Column('coluna_mapeada', sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(['tipo_id'], ['tipos_preferencia.id_tipo']),
+        sa.PrimaryKeyConstraint('id_opcao'),
+        sa.UniqueConstraint('coluna_mapeada'),
+        sa.UniqueConstraint('nome'),
+    )
+    op.create_table(
+        'perfis_preferencias',
+        sa.Column('id_perfil', sa.Integer(), nullable=False),
+        sa.Column('aluno_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['aluno_id'], ['alunos.id_aluno']),
+        sa.PrimaryKeyConstraint('id_perfil'),
+        sa.UniqueConstraint('aluno_id'),
+    )
+    op.create_table(
+        'preferencias_aluno',
+        sa.Column('id_preferencia', sa.Integer(), nullable=False),
+        sa.Column('peso', sa.Integer(), nullable=False),
+        sa.Column('perfil_id', sa.Integer(), nullable=False),
+        sa.Column('opcao_id', sa.Integer(), nullable=False),
+        sa.CheckConstraint('peso >= 0 AND peso <= 7', name='check_peso'),
+        sa.ForeignKeyConstraint(['opcao_id'], ['opcoes_preferencia.id_opcao']),
+        sa.ForeignKeyConstraint(['perfil_id'], ['perfis_preferencias.id_perfil']),
+        sa.PrimaryKeyConstraint('id_preferencia'),
+        sa.UniqueConstraint('perfil_id', 'opcao_id', name='uq_perfil_opcao'),
+    )
+
+    op.create_table(
+        'turmas',
+        sa.Column('id_turma', sa.Integer(), nullable=False),
+        sa.Column('nome_turma', sa.String(length=50), nullable=False),
+        sa.Column('semestre', sa.String(length=20), nullable=False),
+        sa.Column('professor_id', sa.Integer(), nullable=False),
+        sa.Column('disciplina_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['disciplina_id'], ['disciplinas.id_disciplina']),
+        sa.ForeignKeyConstraint(['professor_id'], ['professores.id_professor']),
+        sa.PrimaryKeyConstraint('id_turma'),
+    )
+    op.create_index('ix_turmas_disciplina_professor', 'turmas', ['disciplina_id', 'professor_id'])
+    op.create_index('ix_turmas_professor_id', 'turmas', ['professor_id'])
+
+    op.create_table(
+        'avaliacoes',
+        sa.Column('id_avaliacao', sa.Integer(), nullable=False),
+        sa.Column('semestre', sa.String(length=20), nullable=False),
+        sa.Column('turma_id', sa.Integer(), nullable=False),
+        sa.Column('aluno_id', sa.Integer(), nullable=False),
+        *[sa.Column(nota, sa.Integer(), nullable=False) for nota in NOTAS],
+        sa.CheckConstraint('slide >= 0 AND slide <= 7', name='check_aval_slide'),
+        sa.CheckConstraint('quadro >= 0 AND quadro <= 7', name='check_aval_quadro'),
+        sa.CheckConstraint('velocidade_aula >= 0 AND velocidade_aula <= 7', name='check_aval_velocidade'),
+        sa.CheckConstraint('provas >= 0 AND provas <= 7', name='check_aval_provas'),
+        sa.CheckConstraint('trabalhos >= 0 AND trabalhos <= 7', name='check_aval_trabalhos'),
+        sa.CheckConstraint('projetos >= 0 AND projetos <= 7', name='check_aval_projetos'),
+        sa.CheckConstraint('interacao >= 0 AND interacao <= 7', name='check_aval_interacao'),
+        sa.ForeignKeyConstraint(['aluno_id'], ['alunos.id_aluno']),
+        sa.ForeignKeyConstraint(['turma_id'], ['turmas.id_turma']),
+        sa.PrimaryKeyConstraint('id_avaliacao'),
+        sa.UniqueConstraint('aluno_id', 'turma_id', name='uq_aluno_turma'),
+    )
+    op.create_index('ix_avaliacoes_turma_id', 'avaliacoes', ['turma_id'], postgresql_include=NOTAS)
+
+    op.create_table(
+        'perfis_professores',
+        sa.Column('professor_id', sa.Integer(), nullable=False),
+        sa.Column('disciplina_id', sa.Integer(), nullable=False),
+        *_colunas_perfil(),
+        sa.ForeignKeyConstraint(['disciplina_id'], ['disciplinas.id_disciplina']),
+        sa.ForeignKeyConstraint(['professor_id'], ['professores.id_professor']),
+        sa.PrimaryKeyConstraint('professor_id', 'disciplina_id'),
+    )
+    op.create_index('ix_perfis_professores_disciplina_id', 'perfis_professores', ['disciplina_id'])
+
+    op.create_table(
+        'perfis_professores_semestre',
+        sa.Column('professor_id', sa.Integer(), nullable=False),
+        sa.Column('disciplina_id', sa.Integer(), nullable=False),
+        sa.Column('semestre', sa.String(length=20), nullable=False),
+        sa.Column('ordinal', sa.Integer(), nullable=True),
+        *_colunas_perfil(),
+        sa.ForeignKeyConstraint(['disciplina_id'], ['disciplinas.id_disciplina']),
+        sa.ForeignKeyConstraint(['professor_id'], ['professores.id_professor']),
+        sa.PrimaryKeyConstraint('professor_id', 'disciplina_id', 'semestre'),
+    )
+    op.create_index('ix_perfis_professores_semestre_disciplina_id', 'perfis_professores_semestre', ['disciplina_id'])
+    op.create_index('ix_perfis_professores_semestre_ordinal', 'perfis_professores_semestre', ['ordinal'])
+
+    op.create_table(
+        'rankings_arquetipos',
+        sa.Column('disciplina_id', sa.Integer(), nullable=False),
+        sa.Column('vetor', sa.String(length=7), nullable=False),
+        sa.Column('ranking', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['disciplina_id'], ['disciplinas.id_disciplina']),
+        sa.PrimaryKeyConstraint('disciplina_id', 'vetor'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rankings_arquetipos')
+    op.drop_table('perfis_professores_semestre')
+    op.drop_table('perfis_professores')
+    op.drop_table('avaliacoes')
+    op.drop_table('turmas')
+    op.drop_table('preferencias_aluno')
+    op.drop_table('perfis_preferencias')
+    op.drop_table('opcoes_preferencia')
+    op.drop_table('disciplinas')
+    op.drop_table('tipos_preferencia')
+    op.drop_table('professores')
+    op.drop_table('cursos')
+    op.drop_table('alunos')
@@ -0,0 +1,78 @@
+"""vetor_pesos em perfis_preferencias
+
+Cópia compacta dos pesos do aluno (um byte por feature, na ordem de
+FEATURE_NAMES), lida pelas recomendações sem joins. Preenchida aqui a partir
+de preferencias_aluno, que continua sendo a fonte da verdade.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 14:20:41.118902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# congeladas aqui: a migração não deve mudar se constants/features.py mudar
+FEATURES = ['slide', 'quadro', 'velocidade_aula', 'provas', 'trabalhos', 'projetos', 'interacao']
+PERFIS_POR_BLOCO = 10_000
+
+perfis = sa.table('perfis_preferencias', sa.column('id_perfil'), sa.column('vetor_pesos'))
+preferencias = sa.table('preferencias_aluno', sa.column('perfil_id'), sa.column('opcao_id'), sa.column('peso'))
+opcoes = sa.table('opcoes_preferencia', sa.column('id_opcao'), sa.column('coluna_mapeada'))
+
+
+def _preencher(conexao):
+    """vetor_pesos de cada perfil com preferências, em blocos de PERFIS_POR_BLOCO."""
+    linhas = conexao.execute(
+        sa.select(preferencias.c.perfil_id, opcoes.c.coluna_mapeada, preferencias.c.peso)
+        .join(opcoes, opcoes.c.id_opcao == preferencias.c.opcao_id)
+        .order_by(preferencias.c.perfil_id)
+        .execution_options(yield_per=PERFIS_POR_BLOCO * len(FEATURES))
+    )
+    atualizar = (
+        sa.update(perfis)
+        .where(perfis.c.id_perfil == sa.bindparam('b_id_perfil'))
+        .values(vetor_pesos=sa.bindparam('b_vetor_pesos'))
+    )
+
+    bloco = []
+    perfil_atual = None
+    pesos = {}
+    for perfil_id, coluna, peso in linhas:
+        if perfil_id != perfil_atual:
+            if perfil_atual is not None:
+                bloco.append({'b_id_perfil': perfil_atual, 'b_vetor_pesos': bytes(pesos.get(f, 0) for f in FEATURES)})
+            perfil_atual = perfil_id
+            pesos = {}
+        pesos[coluna] = peso
+        if len(bloco) == PERFIS_POR_BLOCO:
+            conexao.execute(atualizar, bloco)
+            bloco = []
+    if perfil_atual is not None:
+        bloco.append({'b_id_perfil': perfil_atual, 'b_vetor_pesos': bytes(pesos.get(f, 0) for f in FEATURES)})
+    if bloco:
+        conexao.execute(atualizar, bloco)
+
+
+def upgrade() -> None:
+    conexao = op.get_bind()
+    colunas = {coluna['name'] for coluna in sa.inspect(conexao).get_columns('perfis_preferencias')}
+    # bancos legados adotados por db_migrations podem já ter a coluna (create_all do models.py atual)
+    if 'vetor_pesos' not in colunas:
+        with op.batch_alter_table('perfis_preferencias') as batch_op:
+            batch_op.add_column(sa.Column('vetor_pesos', sa.LargeBinary(length=len(FEATURES)), nullable=True))
+    _preencher(conexao)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('perfis_preferencias') as batch_op:
+        batch_op.drop_column('vetor_pesos')
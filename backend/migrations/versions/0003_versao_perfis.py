@@ -0,0 +1,35 @@
+"""versao_perfis em disciplinas
+
+Contador que avança a cada alteração nos perfis dos professores da
+disciplina. Os workers comparam com a versão gravada na geração dos perfis
+compartilhados (shared_profiles.py) para saber o que ficou desatualizado.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:02:37.514230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    colunas = {coluna['name'] for coluna in sa.inspect(op.get_bind()).get_columns('disciplinas')}
+    # bancos legados adotados por db_migrations podem já ter a coluna (create_all do models.py atual)
+    if 'versao_perfis' not in colunas:
+        with op.batch_alter_table('disciplinas') as batch_op:
+            batch_op.add_column(sa.Column('versao_perfis', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('disciplinas') as batch_op:
+        batch_op.drop_column('versao_perfis')
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, CheckConstraint, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Float, LargeBinary, ForeignKey, CheckConstraint, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from database import Base  # Importa o Base do seu arquivo database.py
+from constants.features import FEATURE_NAMES
 
 # --- TABELAS CENTRAIS: ALUNO, PROFESSOR, DISCIPLINA ---
 
@@ -41,6 +42,8 @@ class Disciplina(Base):
     id_disciplina = Column(Integer, primary_key=True)
     nome = Column(String(100), nullable=False, unique=True)
     curso_id = Column(Integer, ForeignKey('cursos.id_curso'), nullable=True) # Opcional
+    # avança a cada alteração nos perfis dos professores da disciplina (ver professor_profiles.py)
+    versao_perfis = Column(Integer, nullable=False, default=0, server_default='0')
     
     curso = relationship('Curso', back_populates='disciplinas')
     turmas = relationship('Turma', back_populates='disciplina')
@@ -60,6 +63,12 @@ class Turma(Base):
     
     avaliacoes = relationship('Avaliacao', back_populates='turma')
 
+    __table_args__ = (
+        # filtro da recomendação (disciplina) já trazendo o professor do join
+        Index('ix_turmas_disciplina_professor', 'disciplina_id', 'professor_id'),
+        Index('ix_turmas_professor_id', 'professor_id'),
+    )
+
 class Avaliacao(Base):
     
     #O backend usará (AVG) desses dados para criar o "perfil do professor".
@@ -92,8 +101,85 @@ class Avaliacao(Base):
         CheckConstraint('trabalhos >= 0 AND trabalhos <= 7', name='check_aval_trabalhos'),
         CheckConstraint('projetos >= 0 AND projetos <= 7', name='check_aval_projetos'),
         CheckConstraint('interacao >= 0 AND interacao <= 7', name='check_aval_interacao'),
+        # uq_aluno_turma começa por aluno_id e não serve ao join por turma.
+        # No Postgres o índice cobre as sete notas (INCLUDE): o agregado por
+        # turma vira index-only scan, sem ler o heap de avaliacoes.
+        Index('ix_avaliacoes_turma_id', 'turma_id', postgresql_include=FEATURE_NAMES),
+    )
+
+class PerfilProfessor(Base):
+
+    # Perfil materializado do professor em uma disciplina: somas e contagem das
+    # avaliações, mantidas incrementalmente (ver professor_profiles.py).
+    # Como as colunas de Avaliacao são NOT NULL, uma única contagem vale para as sete.
+
+    __tablename__ = 'perfis_professores'
+
+    professor_id = Column(Integer, ForeignKey('professores.id_professor'), primary_key=True)
+    disciplina_id = Column(Integer, ForeignKey('disciplinas.id_disciplina'), primary_key=True)
+
+    total_avaliacoes = Column(Integer, nullable=False, default=0)
+
+    soma_slide = Column(Integer, nullable=False, default=0)
+    soma_quadro = Column(Integer, nullable=False, default=0)
+    soma_velocidade_aula = Column(Integer, nullable=False, default=0)
+    soma_provas = Column(Integer, nullable=False, default=0)
+    soma_trabalhos = Column(Integer, nullable=False, default=0)
+    soma_projetos = Column(Integer, nullable=False, default=0)
+    soma_interacao = Column(Integer, nullable=False, default=0)
+
+    professor = relationship('Professor')
+    disciplina = relationship('Disciplina')
+
+    __table_args__ = (
+        # a PK começa por professor_id; a recomendação filtra por disciplina
+        Index('ix_perfis_professores_disciplina_id', 'disciplina_id'),
     )
 
+class PerfilProfessorSemestre(Base):
+
+    # Parcial do perfil do professor em uma disciplina e um semestre (de
+    # Avaliacao.semestre): as mesmas somas de PerfilProfessor, separadas por
+    # semestre para o perfil ponderado por recência (RECENCY_MODE).
+    # 'ordinal' ordena os semestres ('2025.1' -> 4050); nulo se o texto não
+    # segue o formato ANO.PERIODO.
+
+    __tablename__ = 'perfis_professores_semestre'
+
+    professor_id = Column(Integer, ForeignKey('professores.id_professor'), primary_key=True)
+    disciplina_id = Column(Integer, ForeignKey('disciplinas.id_disciplina'), primary_key=True)
+    semestre = Column(String(20), primary_key=True)
+    ordinal = Column(Integer, nullable=True)
+
+    total_avaliacoes = Column(Integer, nullable=False, default=0)
+
+    soma_slide = Column(Integer, nullable=False, default=0)
+    soma_quadro = Column(Integer, nullable=False, default=0)
+    soma_velocidade_aula = Column(Integer, nullable=False, default=0)
+    soma_provas = Column(Integer, nullable=False, default=0)
+    soma_trabalhos = Column(Integer, nullable=False, default=0)
+    soma_projetos = Column(Integer, nullable=False, default=0)
+    soma_interacao = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_perfis_professores_semestre_disciplina_id', 'disciplina_id'),
+        # max(ordinal) = semestre de referência da recência
+        Index('ix_perfis_professores_semestre_ordinal', 'ordinal'),
+    )
+
+class RankingArquetipo(Base):
+
+    # Ranking pré-calculado de uma disciplina para um vetor de preferências
+    # (arquétipo), compartilhado por todos os alunos com o mesmo vetor
+    # (ver precomputed_rankings.py). 'vetor' são os sete pesos, um dígito cada,
+    # na ordem de FEATURE_NAMES; 'ranking' é a resposta de /recomendacoes em JSON.
+
+    __tablename__ = 'rankings_arquetipos'
+
+    disciplina_id = Column(Integer, ForeignKey('disciplinas.id_disciplina'), primary_key=True)
+    vetor = Column(String(len(FEATURE_NAMES)), primary_key=True)
+    ranking = Column(Text, nullable=False)
+
 class TipoPreferencia(Base):
    
     __tablename__ = 'tipos_preferencia'
@@ -123,6 +209,11 @@ class PerfilPreferencias(Base):
     
     aluno_id = Column(Integer, ForeignKey('alunos.id_aluno'), unique=True, nullable=False)
     aluno = relationship('Aluno', back_populates='perfil_preferencias')
+
+    # Cópia compacta dos pesos (um byte por feature, na ordem de FEATURE_NAMES),
+    # mantida por crud.create_or_update_aluno_perfil: lida sem joins nas
+    # recomendações. A fonte da verdade continua sendo preferencias_aluno.
+    vetor_pesos = Column(LargeBinary(len(FEATURE_NAMES)), nullable=True)
     
     # O perfil é composto por uma lista de pesos
     preferencias = relationship('PreferenciaAluno', back_populates='perfil', cascade="all, delete-orphan")
@@ -0,0 +1,185 @@
+"""
+Pool de processos dedicado ao bcrypt.
+
+Cada hash/verificação custa dezenas de ms de CPU pura; rodar isso nos
+workers da API bloqueia todas as outras rotas durante um pico de logins.
+As chamadas vão para um ProcessPoolExecutor de tamanho fixo, com um limite
+de tarefas pendentes: acima dele, PasswordPoolSaturated é levantada na hora
+(a rota de login responde 503) em vez de enfileirar sem limite.
+
+Se um processo do pool morre (OOM, kill), o ProcessPoolExecutor fica
+quebrado e recusa tudo com BrokenProcessPool: o executor é trocado por um
+novo e a tarefa é reenviada uma vez.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", str(BCRYPT_WORKERS * 8)))
+
+
+class PasswordPoolSaturated(Exception):
+    """O pool de bcrypt atingiu BCRYPT_MAX_PENDING tarefas pendentes."""
+
+
+# --- executado dentro dos processos do pool ---
+
+_pwd_context = None
+
+def _context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+def _hash(password: str) -> str:
+    return _context().hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _context().verify(plain_password, hashed_password)
+
+
+def _aquecer_processo() -> int:
+    _context()
+    return os.getpid()
+
+
+# --- lado da API ---
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(BCRYPT_MAX_PENDING)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "pending": 0,
+    "rejected": 0,
+    "succeeded": 0,
+    "failed": 0,
+    "restarts": 0,
+    "latency_seconds_sum": 0.0,
+    "latency_seconds_max": 0.0,
+}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS)
+    return _executor
+
+
+def _substituir_executor(quebrado: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    """Troca o executor quebrado por um novo (uma vez só, se várias threads o acharem quebrado)."""
+    global _executor
+    with _executor_lock:
+        if _executor is quebrado:
+            _executor = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS)
+            quebrado.shutdown(wait=False)
+            with _stats_lock:
+                _stats["restarts"] += 1
+        return _executor
+
+
+def _concluir(futuro: Future, inicio: float):
+    """Callback do futuro: devolve a vaga só quando a tarefa termina no pool."""
+    latencia = time.perf_counter() - inicio
+    _slots.release()
+    falhou = futuro.cancelled() or futuro.exception() is not None
+    with _stats_lock:
+        _stats["pending"] -= 1
+        _stats["failed" if falhou else "succeeded"] += 1
+        _stats["latency_seconds_sum"] += latencia
+        _stats["latency_seconds_max"] = max(_stats["latency_seconds_max"], latencia)
+
+
+def _submeter(fn, *args) -> Future:
+    """
+    Reserva uma vaga (ou rejeita na hora) e envia a tarefa ao pool. A vaga
+    fica presa à tarefa, não a quem espera por ela: se a requisição for
+    cancelada, o bcrypt continua ocupando a vaga até terminar.
+    """
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise PasswordPoolSaturated()
+
+    inicio = time.perf_counter()
+    with _stats_lock:
+        _stats["pending"] += 1
+    try:
+        executor = _get_executor()
+        try:
+            futuro = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            futuro = _substituir_executor(executor).submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        with _stats_lock:
+            _stats["pending"] -= 1
+        raise
+    futuro.add_done_callback(lambda f: _concluir(f, inicio))
+    return futuro
+
+
+async def _run_async(fn, *args):
+    try:
+        return await asyncio.wrap_future(_submeter(fn, *args))
+    except BrokenProcessPool:
+        # o processo morreu com a tarefa: _submeter troca o executor e reenvia
+        return await asyncio.wrap_future(_submeter(fn, *args))
+
+
+def aquecer() -> int:
+    """
+    Sobe os processos do pool, já com o CryptContext montado, antes do
+    primeiro login. Retorna quantos processos responderam.
+    """
+    executor = _get_executor()
+    futuros = [executor.submit(_aquecer_processo) for _ in range(BCRYPT_WORKERS)]
+    return len({futuro.result() for futuro in futuros})
+
+
+def hash_password(password: str) -> str:
+    """
+    Versão síncrona, para scripts (seed.py, tools/): bloqueia a thread que
+    chama até o bcrypt terminar. As rotas usam as versões async.
+    """
+    try:
+        return _submeter(_hash, password).result()
+    except BrokenProcessPool:
+        return _submeter(_hash, password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_async(_verify, plain_password, hashed_password)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        resultado = dict(_stats)
+    resultado["workers"] = BCRYPT_WORKERS
+    resultado["max_pending"] = BCRYPT_MAX_PENDING
+    concluidas = resultado["succeeded"] + resultado["failed"]
+    resultado["latency_seconds_avg"] = resultado["latency_seconds_sum"] / concluidas if concluidas else 0.0
+    return resultado
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,143 @@
+"""
+Rankings pré-calculados por arquétipo de preferência (tabela rankings_arquetipos).
+
+Os pesos do perfil são inteiros de 0 a 7 e o formulário limita quais features
+podem ser não nulas ao mesmo tempo, então muitos alunos têm exatamente o mesmo
+vetor. Este job enumera os vetores distintos de preferencias_aluno e grava,
+para cada um e cada disciplina, o ranking completo de /aluno/recomendacoes.
+A rota serve o ranking com uma busca por (disciplina, vetor) e cai no cálculo
+ao vivo quando ele ainda não existe.
+
+Incremental: avaliações novas descartam os rankings da disciplina (ver
+professor_profiles.py) e cada execução só calcula o que falta — disciplinas
+sem ranking (para todos os vetores) e vetores novos (para todas as disciplinas):
+
+    python precomputed_rankings.py          # só o que falta
+    python precomputed_rankings.py --tudo   # recalcula tudo
+
+Com RANKINGS_REFRESH_SECONDS > 0 a própria aplicação roda o job nesse intervalo.
+"""
+import argparse
+import json
+import os
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+import bulk
+import crud
+import models
+import scoring
+from database import SessionLocal
+
+
+# Intervalo do job dentro da aplicação (0 desliga; use em um worker só).
+REFRESH_SECONDS = float(os.getenv("RANKINGS_REFRESH_SECONDS", "0"))
+
+# Disciplinas por transação: as linhas delas ficam travadas (FOR SHARE) até o commit.
+DISCIPLINAS_POR_LOTE = 20
+
+
+def vetores_distintos(db: Session) -> set[str]:
+    """Chaves (scoring.chave_vetor) de todos os vetores de preferência existentes."""
+    return {scoring.chave_vetor(vetor) for _, vetor in crud.iter_vetores_preferencias(db)}
+
+
+def _disciplinas_com_professores(db: Session) -> set[int]:
+    return set(db.execute(
+        select(models.PerfilProfessor.disciplina_id).distinct()
+        .where(models.PerfilProfessor.total_avaliacoes > 0)
+    ).scalars())
+
+
+def calcular(db: Session, disciplina_ids: list[int], vetores: list[str], substituir: bool) -> int:
+    """
+    Calcula e grava os rankings de 'vetores' em 'disciplina_ids' e faz commit.
+    Com substituir=True apaga antes os rankings existentes dessas disciplinas.
+    Retorna quantos rankings foram gravados.
+    """
+    if not disciplina_ids or not vetores:
+        return 0
+
+    # FOR SHARE nas linhas de disciplinas (e não nos perfis, que podem ainda
+    # não existir para um par novo): quem descarta rankings trava a mesma linha
+    # (professor_profiles._descartar_rankings), então uma avaliação gravada
+    # durante o cálculo espera o commit e só então descarta o que foi gravado
+    db.execute(
+        select(models.Disciplina.id_disciplina)
+        .where(models.Disciplina.id_disciplina.in_(disciplina_ids))
+        .order_by(models.Disciplina.id_disciplina)
+        .with_for_update(read=True)
+    ).all()
+    linhas = crud.professores_avg_ratings_query(db, disciplina_ids).all()
+    prof_matrix = scoring.ratings_matrix(linhas)
+
+    def rankings():
+        for vetor in vetores:
+            aluno_vector = [int(peso) for peso in vetor]
+            por_disciplina = scoring.rank_professores_por_disciplina(
+                aluno_vector, linhas, prof_matrix=prof_matrix
+            )
+            for disciplina_id, ranking in por_disciplina.items():
+                yield disciplina_id, vetor, json.dumps(ranking)
+
+    tabela = models.RankingArquetipo.__table__
+    if substituir:
+        db.execute(delete(tabela).where(tabela.c.disciplina_id.in_(disciplina_ids)))
+    total = bulk.copy_rows(db, tabela, ["disciplina_id", "vetor", "ranking"], rankings())
+    db.commit()
+    return total
+
+
+def _em_lotes(disciplina_ids, tamanho: int = DISCIPLINAS_POR_LOTE):
+    disciplina_ids = sorted(disciplina_ids)
+    for inicio in range(0, len(disciplina_ids), tamanho):
+        yield disciplina_ids[inicio:inicio + tamanho]
+
+
+def atualizar(db: Session, tudo: bool = False, progresso=print) -> dict:
+    """Calcula os rankings que faltam (ou todos, com tudo=True)."""
+    vetores = vetores_distintos(db)
+    disciplinas = _disciplinas_com_professores(db)
+
+    if tudo:
+        db.execute(delete(models.RankingArquetipo.__table__))
+        db.commit()
+        pendentes, vetores_novos = disciplinas, set()
+    else:
+        calculadas = set(db.execute(
+            select(models.RankingArquetipo.disciplina_id).distinct()
+        ).scalars())
+        vetores_calculados = set(db.execute(
+            select(models.RankingArquetipo.vetor).distinct()
+        ).scalars())
+        pendentes = disciplinas - calculadas
+        vetores_novos = vetores - vetores_calculados
+    db.rollback()  # encerra a transação de leitura antes dos lotes
+
+    gravados = 0
+    # disciplinas sem ranking: todos os vetores
+    for lote in _em_lotes(pendentes):
+        gravados += calcular(db, lote, sorted(vetores), substituir=True)
+    # vetores novos: nas disciplinas que já tinham ranking
+    for lote in _em_lotes(disciplinas - pendentes):
+        gravados += calcular(db, lote, sorted(vetores_novos), substituir=False)
+
+    resumo = {
+        "vetores": len(vetores),
+        "disciplinas_recalculadas": len(pendentes),
+        "vetores_novos": len(vetores_novos),
+        "rankings_gravados": gravados,
+    }
+    progresso(f"Rankings pré-calculados: {resumo}")
+    return resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-calcula rankings por vetor de preferências.")
+    parser.add_argument("--tudo", action="store_true", help="apaga e recalcula todos os rankings")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        atualizar(db, tudo=args.tudo)
+    finally:
+        db.close()
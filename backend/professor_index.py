@@ -0,0 +1,241 @@
+"""
+Índice em memória dos vetores de perfil dos professores (um por par
+professor/disciplina, na ordem de FEATURE_NAMES), para buscar os K
+professores mais parecidos com o aluno em um curso inteiro sem percorrer
+todos os perfis a cada requisição.
+
+O índice guarda a matriz dos perfis e a dos quadrados (a "norma"
+pré-calculada), além das linhas de cada curso e de cada disciplina. Com os
+pesos w do aluno, a distância ponderada ao quadrado de todas as linhas sai de
+dois produtos matriz-vetor:
+
+    |a - p|²_w = Σ w a² - 2 p · (w a) + p² · w
+
+Essa forma serve só para escolher os candidatos (com uma folga para erros de
+arredondamento); os candidatos são pontuados de novo com scoring.score_matrix,
+então o ranking é o mesmo de weighted_euclidean_similarity, com empates na
+ordem (disciplina, professor) de /aluno/recomendacoes.
+
+Atualização incremental: avaliações alteradas marcam as disciplinas (ver
+professor_profiles.ao_alterar_perfis) e só elas são relidas na próxima busca.
+Uma atualização por vez (a trava de construção vale da leitura do índice
+atual até guardar o novo), então duas buscas simultâneas não perdem as
+disciplinas uma da outra.
+Alterações feitas por outros processos entram pelo PROFESSOR_INDEX_TTL_SECONDS.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import crud
+import lazy_imports
+import models
+import professor_profiles
+import scoring
+
+np = lazy_imports.sob_demanda("numpy")
+
+
+PROFESSOR_INDEX_TTL_SECONDS = float(os.getenv("PROFESSOR_INDEX_TTL_SECONDS", "300"))
+
+# folga relativa na distância aproximada ao escolher candidatos
+TOLERANCIA = 1e-9
+
+
+@dataclass(frozen=True)
+class _Indice:
+    matriz: np.ndarray          # (N x 7) médias
+    quadrados: np.ndarray       # matriz ** 2
+    disciplina_ids: np.ndarray
+    curso_ids: np.ndarray       # -1 para disciplina sem curso
+    professor_ids: np.ndarray
+    nomes: np.ndarray
+    por_curso: dict
+    por_disciplina: dict
+
+
+def _grupos(valores: np.ndarray) -> dict:
+    """{valor: índices das linhas com esse valor} (em ordem crescente de linha)."""
+    if not len(valores):
+        return {}
+    ordem = np.argsort(valores, kind="stable")
+    unicos, inicios = np.unique(valores[ordem], return_index=True)
+    return {int(v): bloco for v, bloco in zip(unicos, np.split(ordem, inicios[1:]))}
+
+
+def _montar(matriz, disciplina_ids, curso_ids, professor_ids, nomes) -> _Indice:
+    # ordem (disciplina, professor), a mesma da consulta de /aluno/recomendacoes
+    ordem = np.lexsort((professor_ids, disciplina_ids))
+    matriz = matriz[ordem]
+    disciplina_ids = disciplina_ids[ordem]
+    curso_ids = curso_ids[ordem]
+    return _Indice(
+        matriz=matriz,
+        quadrados=matriz ** 2,
+        disciplina_ids=disciplina_ids,
+        curso_ids=curso_ids,
+        professor_ids=professor_ids[ordem],
+        nomes=nomes[ordem],
+        por_curso=_grupos(curso_ids),
+        por_disciplina=_grupos(disciplina_ids),
+    )
+
+
+def _ler(db: Session, disciplina_ids=None):
+    """Arrays das linhas de perfil das disciplinas (todas, se None)."""
+    filtro = select(models.Disciplina.id_disciplina)
+    if disciplina_ids is not None:
+        filtro = filtro.where(models.Disciplina.id_disciplina.in_(disciplina_ids))
+    linhas = crud.professores_avg_ratings_query(db, filtro).all()
+
+    cursos = dict(db.execute(
+        select(models.Disciplina.id_disciplina, models.Disciplina.curso_id).where(
+            models.Disciplina.id_disciplina.in_(filtro)
+        )
+    ).all())
+
+    return (
+        scoring.ratings_matrix(linhas),
+        np.array([linha.disciplina_id for linha in linhas], dtype=np.int64),
+        np.array([cursos.get(linha.disciplina_id) or -1 for linha in linhas], dtype=np.int64),
+        np.array([linha.id_professor for linha in linhas], dtype=np.int64),
+        np.array([linha.nome for linha in linhas], dtype=object),
+    )
+
+
+class ProfessorIndex:
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._indice = None
+        self._construido_em = 0.0
+        self._sujas = set()
+        self._tudo_sujo = True
+        self._lock = threading.Lock()
+        self._construcao = threading.Lock()
+        self.reconstrucoes = 0
+        self.atualizacoes_incrementais = 0
+
+    def marcar(self, disciplina_ids):
+        """Disciplinas com perfis alterados (None = todas)."""
+        with self._lock:
+            if disciplina_ids is None:
+                self._tudo_sujo = True
+            else:
+                self._sujas.update(disciplina_ids)
+
+    def precisa_atualizar(self) -> bool:
+        with self._lock:
+            return (
+                self._indice is None or self._tudo_sujo or bool(self._sujas)
+                or time.monotonic() - self._construido_em >= self.ttl_seconds
+            )
+
+    def atualizar(self, db: Session):
+        """Reconstrói o índice inteiro ou relê só as disciplinas marcadas."""
+        with self._construcao:
+            self._atualizar(db)
+
+    def _atualizar(self, db: Session):
+        with self._lock:
+            indice = self._indice
+            tudo = (
+                indice is None or self._tudo_sujo
+                or time.monotonic() - self._construido_em >= self.ttl_seconds
+            )
+            sujas = self._sujas
+            self._sujas = set()
+            self._tudo_sujo = False
+
+        if not tudo and not sujas:
+            return
+        try:
+            if tudo:
+                novo = _montar(*_ler(db))
+            else:
+                manter = ~np.isin(indice.disciplina_ids, list(sujas))
+                matriz, disciplinas, cursos, professores, nomes = _ler(db, sujas)
+                novo = _montar(
+                    np.concatenate([indice.matriz[manter], matriz]),
+                    np.concatenate([indice.disciplina_ids[manter], disciplinas]),
+                    np.concatenate([indice.curso_ids[manter], cursos]),
+                    np.concatenate([indice.professor_ids[manter], professores]),
+                    np.concatenate([indice.nomes[manter], nomes]),
+                )
+        except BaseException:
+            # falhou: as marcadas voltam para a próxima tentativa
+            with self._lock:
+                self._sujas.update(sujas)
+                self._tudo_sujo = self._tudo_sujo or tudo
+            raise
+
+        with self._lock:
+            self._indice = novo
+            if tudo:
+                self._construido_em = time.monotonic()
+                self.reconstrucoes += 1
+            else:
+                self.atualizacoes_incrementais += 1
+
+    def top_k(self, aluno_vector, k: int, curso_id: int | None = None, disciplina_id: int | None = None) -> list[dict]:
+        """
+        Os k pares (professor, disciplina) mais similares ao aluno, filtrados
+        por curso e/ou disciplina, no formato de /aluno/recomendacoes
+        acrescido de 'disciplina_id'.
+        """
+        indice = self._indice
+        if indice is None or k <= 0:
+            return []
+
+        vazio = np.zeros(0, dtype=np.int64)
+        if disciplina_id is not None:
+            linhas = indice.por_disciplina.get(disciplina_id, vazio)
+            if curso_id is not None:
+                linhas = linhas[indice.curso_ids[linhas] == curso_id]
+        elif curso_id is not None:
+            linhas = indice.por_curso.get(curso_id, vazio)
+        else:
+            linhas = np.arange(len(indice.disciplina_ids))
+        if not len(linhas):
+            return []
+
+        aluno_vector = np.asarray(aluno_vector)
+        if len(linhas) > k:
+            pesos = aluno_vector.astype(np.float64)
+            ponderado = pesos * aluno_vector
+            dist2 = (
+                float((ponderado * aluno_vector).sum())
+                - 2 * (indice.matriz[linhas] @ ponderado)
+                + indice.quadrados[linhas] @ pesos
+            )
+            limite = np.partition(dist2, k - 1)[k - 1]
+            linhas = linhas[dist2 <= limite + TOLERANCIA * max(1.0, abs(limite))]
+
+        similaridades, estrelas, ordem = scoring.score_matrix(aluno_vector, indice.matriz[linhas])
+        return [
+            {
+                "id_professor": int(indice.professor_ids[linhas[i]]),
+                "nome": indice.nomes[linhas[i]],
+                "similaridade": float(similaridades[i]),
+                "estrelas": float(estrelas[i]),
+                "disciplina_id": int(indice.disciplina_ids[linhas[i]]),
+            }
+            for i in ordem[:k].tolist()
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            indice = self._indice
+            return {
+                "perfis": 0 if indice is None else len(indice.disciplina_ids),
+                "disciplinas_pendentes": len(self._sujas),
+                "reconstrucoes": self.reconstrucoes,
+                "atualizacoes_incrementais": self.atualizacoes_incrementais,
+            }
+
+
+index = ProfessorIndex(PROFESSOR_INDEX_TTL_SECONDS)
+professor_profiles.ao_alterar_perfis.append(index.marcar)
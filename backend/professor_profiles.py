@@ -0,0 +1,389 @@
+"""
+Manutenção do perfil materializado dos professores (tabelas perfis_professores
+e perfis_professores_semestre).
+
+Cada INSERT/UPDATE/DELETE de Avaliacao feito pelo ORM aplica um delta nas
+somas e na contagem do par (professor, disciplina) da turma e na parcial do
+semestre da avaliação, na mesma transação, e descarta os rankings
+pré-calculados da disciplina (ver precomputed_rankings.py). Trocar o
+professor ou a disciplina de uma Turma pelo ORM move as avaliações dela do
+par antigo para o novo da mesma forma. Operações em massa
+que não passam pelo ORM (query().delete(), insert() do Core, COPY) não
+disparam os eventos: depois delas rode o rebuild completo:
+
+    python professor_profiles.py
+
+Recência (RECENCY_MODE): com 'none' a recomendação usa perfis_professores
+(todas as avaliações com o mesmo peso). Com 'decay' cada semestre pesa
+RECENCY_DECAY ** idade e com 'window' só os últimos RECENCY_WINDOW semestres
+contam, onde a idade é a distância até o semestre mais recente do banco.
+Nos dois casos o perfil é recombinado na consulta a partir das parciais por
+semestre (poucas linhas por professor), sem reler avaliacoes.
+"""
+import os
+from sqlalchemy import Float, case, cast, event, func, inspect, literal, select, delete, insert, update
+from sqlalchemy.orm import Session, object_session
+import models
+import recommendation_cache
+from constants.features import FEATURE_NAMES
+from database import SessionLocal, dialect_insert
+
+
+SOMA_COLUNAS = [f"soma_{feature}" for feature in FEATURE_NAMES]
+
+RECENCY_MODES = ("none", "decay", "window")
+RECENCY_MODE = os.getenv("RECENCY_MODE", "none").strip().lower()
+RECENCY_DECAY = float(os.getenv("RECENCY_DECAY", "0.8"))
+RECENCY_WINDOW = int(os.getenv("RECENCY_WINDOW", "4"))
+
+if RECENCY_MODE not in RECENCY_MODES:
+    raise ValueError(f"RECENCY_MODE inválido: {RECENCY_MODE} (use {', '.join(RECENCY_MODES)})")
+
+# no modo 'decay', semestres com peso abaixo disso são ignorados
+PESO_MINIMO = 1e-4
+
+
+def ordinal_semestre(semestre: str) -> int | None:
+    """'2025.1' -> 2025 * 2 + 0; None se não segue o formato ANO.PERIODO (período 1 ou 2)."""
+    try:
+        ano, periodo = (int(parte) for parte in semestre.strip().split("."))
+    except (AttributeError, ValueError):
+        return None
+    if periodo not in (1, 2):
+        return None
+    return ano * 2 + (periodo - 1)
+
+
+def _par_da_turma(connection, turma_id: int):
+    """(professor_id, disciplina_id) da turma."""
+    return connection.execute(
+        select(models.Turma.professor_id, models.Turma.disciplina_id)
+        .where(models.Turma.id_turma == turma_id)
+    ).one()
+
+
+def _somar(connection, tabela, chave: dict, delta: dict, **extras):
+    """Upsert que soma 'delta' às colunas da linha de 'chave' (ou a cria com 'extras')."""
+    insert_stmt = dialect_insert(connection)(tabela).values(**chave, **delta, **extras)
+    connection.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=list(chave),
+            set_={coluna: tabela.c[coluna] + insert_stmt.excluded[coluna] for coluna in delta},
+        )
+    )
+
+
+def _ordinal_referencia(connection):
+    """Ordinal do semestre mais recente com parciais (a idade zero da recência)."""
+    return connection.execute(
+        select(func.max(models.PerfilProfessorSemestre.ordinal))
+    ).scalar()
+
+
+def _aplicar_delta(connection, turma_id: int, valores: dict, sinal: int):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) uma avaliação do perfil
+    do par (professor, disciplina) da turma e da parcial do semestre,
+    com um upsert em cada tabela.
+    """
+    professor_id, disciplina_id = _par_da_turma(connection, turma_id)
+    ordinal = ordinal_semestre(valores["semestre"])
+
+    delta = {
+        "total_avaliacoes": sinal,
+        **{f"soma_{feature}": sinal * valores[feature] for feature in FEATURE_NAMES},
+    }
+    par = {"professor_id": professor_id, "disciplina_id": disciplina_id}
+
+    # um semestre mais novo que todos muda a idade (e o peso) de todas as parciais
+    if RECENCY_MODE != "none" and sinal > 0 and ordinal is not None:
+        referencia = _ordinal_referencia(connection)
+        if referencia is not None and ordinal > referencia:
+            _descartar_rankings(connection)
+
+    _somar(connection, models.PerfilProfessor.__table__, par, delta)
+    _somar(
+        connection, models.PerfilProfessorSemestre.__table__,
+        {**par, "semestre": valores["semestre"]}, delta, ordinal=ordinal,
+    )
+    _descartar_rankings(connection, [disciplina_id])
+    return disciplina_id
+
+
+def _descartar_rankings(connection, disciplina_ids=None):
+    """
+    Rankings pré-calculados das disciplinas (todas, se None) deixam de valer
+    (a rota cai no cálculo ao vivo) e a versão dos perfis delas avança
+    (Disciplina.versao_perfis, ver shared_profiles.py).
+
+    Antes trava as linhas de disciplinas (FOR NO KEY UPDATE, que não bloqueia
+    as checagens de chave estrangeira): um precomputed_rankings.calcular em
+    andamento nelas (FOR SHARE) termina primeiro, e o delete pega o que ele gravou.
+    """
+    tabela = models.RankingArquetipo.__table__
+    disciplinas = models.Disciplina.__table__
+    trava = select(disciplinas.c.id_disciplina).order_by(disciplinas.c.id_disciplina)
+    comando = delete(tabela)
+    versao = update(disciplinas).values(versao_perfis=disciplinas.c.versao_perfis + 1)
+    if disciplina_ids is not None:
+        trava = trava.where(disciplinas.c.id_disciplina.in_(disciplina_ids))
+        comando = comando.where(tabela.c.disciplina_id.in_(disciplina_ids))
+        versao = versao.where(disciplinas.c.id_disciplina.in_(disciplina_ids))
+    connection.execute(trava.with_for_update(key_share=True)).all()
+    connection.execute(versao)
+    connection.execute(comando)
+
+
+def marcar_disciplinas(session: Session, disciplina_ids):
+    """Guarda as disciplinas afetadas para invalidar o cache só depois do commit."""
+    session.info.setdefault("disciplinas_alteradas", set()).update(disciplina_ids)
+
+
+def _marcar_disciplina(target, disciplina_id: int):
+    session = object_session(target)
+    if session is not None:
+        marcar_disciplinas(session, [disciplina_id])
+
+
+# funções chamadas com as disciplinas alteradas depois do commit (None = todas),
+# para quem mantém estruturas derivadas dos perfis (ex: professor_index.py)
+ao_alterar_perfis = []
+
+
+def _notificar(disciplina_ids):
+    for funcao in ao_alterar_perfis:
+        funcao(disciplina_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_cache_recomendacoes(session):
+    disciplinas = session.info.pop("disciplinas_alteradas", set())
+    for disciplina_id in disciplinas:
+        recommendation_cache.cache.invalidate_disciplina(disciplina_id)
+    if disciplinas:
+        _notificar(disciplinas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_disciplinas_alteradas(session):
+    session.info.pop("disciplinas_alteradas", None)
+
+
+def _valores(avaliacao: models.Avaliacao) -> dict:
+    return {coluna: getattr(avaliacao, coluna) for coluna in ["semestre", *FEATURE_NAMES]}
+
+
+# sem active_history o valor antigo não entra no histórico se o atributo estava
+# expirado (ex: alterado depois de um commit), e o delta sairia do valor novo
+def _guardar_valor_antigo(target, valor, antigo, iniciador):
+    pass
+
+for _atributo in (
+    models.Avaliacao.turma_id, models.Avaliacao.semestre,
+    *[getattr(models.Avaliacao, feature) for feature in FEATURE_NAMES],
+    models.Turma.professor_id, models.Turma.disciplina_id,
+):
+    event.listen(_atributo, "set", _guardar_valor_antigo, active_history=True)
+
+
+@event.listens_for(models.Avaliacao, "after_insert")
+def _avaliacao_inserida(mapper, connection, target):
+    disciplina_id = _aplicar_delta(connection, target.turma_id, _valores(target), 1)
+    _marcar_disciplina(target, disciplina_id)
+
+
+@event.listens_for(models.Avaliacao, "after_update")
+def _avaliacao_atualizada(mapper, connection, target):
+    estado = inspect(target)
+    colunas = ["turma_id", "semestre", *FEATURE_NAMES]
+    if not any(estado.attrs[coluna].history.has_changes() for coluna in colunas):
+        return
+
+    # valores antigos: o que saiu do histórico, ou o valor atual se não mudou
+    antigos = {}
+    for coluna in colunas:
+        historico = estado.attrs[coluna].history
+        antigos[coluna] = historico.deleted[0] if historico.deleted else getattr(target, coluna)
+
+    _marcar_disciplina(target, _aplicar_delta(connection, antigos["turma_id"], antigos, -1))
+    _marcar_disciplina(target, _aplicar_delta(connection, target.turma_id, _valores(target), 1))
+
+
+def _par_anterior(estado, coluna: str):
+    historico = estado.attrs[coluna].history
+    return historico.deleted[0] if historico.deleted else getattr(estado.object, coluna)
+
+
+@event.listens_for(models.Turma, "after_update")
+def _turma_atualizada(mapper, connection, target):
+    """
+    Turma trocada de professor ou de disciplina: as avaliações dela saem do
+    perfil do par antigo e entram no do novo (um delta por semestre).
+    """
+    estado = inspect(target)
+    antigo = (_par_anterior(estado, "professor_id"), _par_anterior(estado, "disciplina_id"))
+    novo = (target.professor_id, target.disciplina_id)
+    if antigo == novo:
+        return
+
+    avaliacao = models.Avaliacao
+    parciais = connection.execute(
+        select(
+            avaliacao.semestre,
+            func.count().label("total_avaliacoes"),
+            *[func.sum(getattr(avaliacao, feature)).label(f"soma_{feature}") for feature in FEATURE_NAMES],
+        ).where(avaliacao.turma_id == target.id_turma).group_by(avaliacao.semestre)
+    ).all()
+    if not parciais:
+        return
+
+    for sinal, (professor_id, disciplina_id) in ((-1, antigo), (1, novo)):
+        par = {"professor_id": professor_id, "disciplina_id": disciplina_id}
+        total = {coluna: 0 for coluna in ["total_avaliacoes", *SOMA_COLUNAS]}
+        for parcial in parciais:
+            delta = {coluna: sinal * getattr(parcial, coluna) for coluna in total}
+            _somar(
+                connection, models.PerfilProfessorSemestre.__table__,
+                {**par, "semestre": parcial.semestre}, delta, ordinal=ordinal_semestre(parcial.semestre),
+            )
+            for coluna in total:
+                total[coluna] += delta[coluna]
+        _somar(connection, models.PerfilProfessor.__table__, par, total)
+
+    disciplinas = sorted({antigo[1], novo[1]})
+    _descartar_rankings(connection, disciplinas)
+    for disciplina_id in disciplinas:
+        _marcar_disciplina(target, disciplina_id)
+
+
+@event.listens_for(models.Avaliacao, "before_delete")
+def _avaliacao_removida(mapper, connection, target):
+    # before_delete: a linha ainda existe, então atributos expirados ainda carregam
+    disciplina_id = _aplicar_delta(connection, target.turma_id, _valores(target), -1)
+    _marcar_disciplina(target, disciplina_id)
+
+
+def agregado_select(por_semestre: bool = False):
+    """
+    SELECT com contagem e somas das avaliações por (professor, disciplina),
+    ou por (professor, disciplina, semestre), direto de avaliacoes
+    (o que perfis_professores / perfis_professores_semestre materializam).
+    """
+    chave = [models.Turma.professor_id, models.Turma.disciplina_id]
+    if por_semestre:
+        chave.append(models.Avaliacao.semestre)
+
+    return select(
+        *chave,
+        func.count().label("total_avaliacoes"),
+        *[
+            func.sum(getattr(models.Avaliacao, feature)).label(f"soma_{feature}")
+            for feature in FEATURE_NAMES
+        ],
+    ).join(
+        models.Avaliacao, models.Turma.id_turma == models.Avaliacao.turma_id
+    ).group_by(*chave)
+
+
+def _preencher_ordinais(db: Session):
+    """Calcula 'ordinal' das parciais inseridas por INSERT ... SELECT (poucos semestres distintos)."""
+    tabela = models.PerfilProfessorSemestre.__table__
+    semestres = db.execute(
+        select(tabela.c.semestre).distinct().where(tabela.c.ordinal.is_(None))
+    ).scalars().all()
+    for semestre in semestres:
+        ordinal = ordinal_semestre(semestre)
+        if ordinal is not None:
+            db.execute(update(tabela).where(tabela.c.semestre == semestre).values(ordinal=ordinal))
+
+
+def _recalcular(db: Session, disciplina_ids=None):
+    """Recalcula as duas tabelas a partir de avaliacoes (todas as disciplinas, se None)."""
+    for modelo, por_semestre in (
+        (models.PerfilProfessor, False),
+        (models.PerfilProfessorSemestre, True),
+    ):
+        tabela = modelo.__table__
+        agregado = agregado_select(por_semestre)
+        comando = delete(tabela)
+        if disciplina_ids is not None:
+            comando = comando.where(tabela.c.disciplina_id.in_(disciplina_ids))
+            agregado = agregado.where(models.Turma.disciplina_id.in_(disciplina_ids))
+        db.execute(comando)
+
+        colunas = ["professor_id", "disciplina_id", *(["semestre"] if por_semestre else []),
+                   "total_avaliacoes", *SOMA_COLUNAS]
+        db.execute(insert(tabela).from_select(colunas, agregado))
+    _preencher_ordinais(db)
+
+
+def refresh_disciplinas(db: Session, disciplina_ids):
+    """
+    Recalcula perfis_professores e as parciais por semestre só para as
+    disciplinas dadas, a partir de avaliacoes (usado depois de cargas em
+    lote, uma vez por lote). Não faz commit: roda na transação da carga.
+    """
+    disciplina_ids = list(disciplina_ids)
+    if not disciplina_ids:
+        return
+
+    referencia = _ordinal_referencia(db)
+    _recalcular(db, disciplina_ids)
+
+    novo_semestre = referencia is not None and (_ordinal_referencia(db) or 0) > referencia
+    if RECENCY_MODE != "none" and novo_semestre:
+        _descartar_rankings(db)
+    else:
+        _descartar_rankings(db, disciplina_ids)
+    marcar_disciplinas(db, disciplina_ids)
+
+
+def rebuild(db: Session):
+    """
+    Recalcula perfis_professores e perfis_professores_semestre inteiras a
+    partir de avaliacoes (backfill ou depois de cargas em massa que não passam
+    pelo ORM). Caches de recomendação de outros processos expiram pelo TTL.
+    """
+    _recalcular(db)
+    _descartar_rankings(db)
+    db.commit()
+    recommendation_cache.cache.clear()
+    _notificar(None)
+
+
+def peso_recencia():
+    """
+    Peso de cada linha de perfis_professores_semestre no perfil ponderado
+    (expressão SQL), conforme RECENCY_MODE.
+    """
+    parcial = models.PerfilProfessorSemestre
+    referencia = select(func.max(parcial.ordinal)).scalar_subquery()
+    idade = referencia - parcial.ordinal
+
+    if RECENCY_MODE == "window":
+        return cast(case((idade < RECENCY_WINDOW, 1.0), else_=0.0), Float)
+
+    # RECENCY_DECAY ** idade calculado na consulta; só a idade máxima sai daqui
+    return case(
+        (idade <= _idade_maxima(), func.power(cast(literal(RECENCY_DECAY), Float), cast(idade, Float))),
+        else_=cast(literal(0.0), Float),
+    )
+
+
+def _idade_maxima() -> int:
+    """Maior idade (até 199) com RECENCY_DECAY ** idade >= PESO_MINIMO, no modo 'decay'."""
+    idade = 0
+    while idade < 199 and RECENCY_DECAY ** (idade + 1) >= PESO_MINIMO:
+        idade += 1
+    return idade
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        total = db.query(models.PerfilProfessor).count()
+        parciais = db.query(models.PerfilProfessorSemestre).count()
+        print(f"Perfis de professores recalculados: {total} pares (professor, disciplina), {parciais} parciais por semestre.")
+    finally:
+        db.close()
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """
+    Cache LRU + TTL, em memória do processo, dos resultados de
+    /aluno/recomendacoes por (aluno_id, disciplina_id).
+
+    A invalidação é por versão: salvar o perfil dá uma versão nova ao aluno
+    e novas avaliações dão uma versão nova à disciplina. Entradas gravadas
+    com uma versão antiga viram "miss" na próxima leitura, sem varrer o cache.
+    Entre processos diferentes (vários workers, scripts) o limite de
+    desatualização é o TTL.
+
+    As versões são carimbos de um contador que só cresce. Os mapas de versões
+    guardam no máximo max_entries chaves (LRU); quem sai eleva o "piso" do
+    mapa, que é a versão de toda chave ausente. Assim a versão de uma chave
+    nunca volta a um valor antigo: podar só causa misses a mais. clear()
+    esvazia os mapas e eleva os pisos a um carimbo novo, o que invalida também
+    os cálculos em andamento.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._relogio = 0
+        self._versao_aluno = OrderedDict()
+        self._versao_disciplina = OrderedDict()
+        self._piso_aluno = 0
+        self._piso_disciplina = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _versao(self, aluno_id: int, disciplina_id: int) -> tuple[int, int]:
+        return (
+            self._versao_aluno.get(aluno_id, self._piso_aluno),
+            self._versao_disciplina.get(disciplina_id, self._piso_disciplina),
+        )
+
+    def versao(self, aluno_id: int, disciplina_id: int) -> tuple[int, int]:
+        """Versão atual do par; capture antes de calcular e passe para set()."""
+        with self._lock:
+            return self._versao(aluno_id, disciplina_id)
+
+    def get(self, aluno_id: int, disciplina_id: int):
+        chave = (aluno_id, disciplina_id)
+        with self._lock:
+            entrada = self._entries.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            valor, expira_em, versao = entrada
+            if versao != self._versao(aluno_id, disciplina_id):
+                del self._entries[chave]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expira_em <= time.monotonic():
+                del self._entries[chave]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def set(self, aluno_id: int, disciplina_id: int, valor, versao: tuple[int, int]):
+        if self.max_entries <= 0:
+            return
+        chave = (aluno_id, disciplina_id)
+        with self._lock:
+            # perfil ou avaliações mudaram enquanto o resultado era calculado
+            if versao != self._versao(aluno_id, disciplina_id):
+                return
+
+            self._entries[chave] = (valor, time.monotonic() + self.ttl_seconds, versao)
+            self._entries.move_to_end(chave)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _nova_versao(self, versoes: OrderedDict, chave) -> int:
+        """Carimbo novo para 'chave'; devolve o piso do mapa (maior carimbo podado)."""
+        self._relogio += 1
+        versoes.pop(chave, None)
+        versoes[chave] = self._relogio
+        piso = 0
+        while len(versoes) > max(self.max_entries, 1):
+            _, piso = versoes.popitem(last=False)
+        return piso
+
+    def invalidate_aluno(self, aluno_id: int):
+        with self._lock:
+            self._piso_aluno = max(self._piso_aluno, self._nova_versao(self._versao_aluno, aluno_id))
+
+    def invalidate_disciplina(self, disciplina_id: int):
+        with self._lock:
+            self._piso_disciplina = max(
+                self._piso_disciplina, self._nova_versao(self._versao_disciplina, disciplina_id)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._relogio += 1
+            self._versao_aluno.clear()
+            self._versao_disciplina.clear()
+            self._piso_aluno = self._piso_disciplina = self._relogio
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = RecommendationCache(
+    max_entries=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "300")),
+)
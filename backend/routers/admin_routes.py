@@ -0,0 +1,132 @@
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import auth
+import export
+import ingestion
+from database import SessionLocal
+import recommendation_cache
+import password_pool
+import professor_index
+import startup
+import token_cache
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(auth.get_admin)]
+)
+
+
+@router.get("/cache/recomendacoes")
+def get_recommendation_cache_stats():
+    """contadores do cache de recomendações (para dimensionar tamanho/TTL)"""
+    return recommendation_cache.cache.stats()
+
+
+@router.get("/bcrypt")
+def get_password_pool_stats():
+    """fila e latência do pool de bcrypt"""
+    return password_pool.stats()
+
+
+@router.get("/indice/professores")
+def get_professor_index_stats():
+    """tamanho e atualizações do índice de perfis de professores"""
+    return professor_index.index.stats()
+
+
+@router.get("/cache/tokens")
+def get_token_cache_stats():
+    """contadores do cache de tokens verificados"""
+    return token_cache.cache.stats()
+
+
+@router.get("/inicializacao")
+def get_startup_stats():
+    """duração de cada fase da inicialização deste processo"""
+    return startup.relatorio.stats()
+
+
+@router.post("/avaliacoes/importar")
+async def importar_avaliacoes(
+    request: Request,
+    formato: str = "csv",
+    tamanho_lote: int = Query(ingestion.TAMANHO_LOTE, ge=1, le=ingestion.TAMANHO_LOTE_MAXIMO)
+):
+    """
+    Importa avaliações enviadas no corpo (CSV com cabeçalho ou NDJSON),
+    lendo o corpo em streaming e gravando lote a lote (ver ingestion.py).
+    Usa sempre a sessão síncrona: o COPY precisa do psycopg2.
+    """
+    db = SessionLocal()
+    try:
+        importacao = ingestion.Importacao(db, formato, tamanho_lote)
+
+        resto = b""
+        async for pedaco in request.stream():
+            *linhas, resto = (resto + pedaco).split(b"\n")
+            for linha in linhas:
+                if importacao.adicionar_linha(linha.decode("utf-8")):
+                    await run_in_threadpool(importacao.gravar)
+        if resto:
+            importacao.adicionar_linha(resto.decode("utf-8"))
+
+        resultado = await run_in_threadpool(importacao.finalizar)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        db.close()
+
+    return asdict(resultado)
+
+
+def _exportar(nome: str, gerar_blocos, colunas: list[str], formato: str, filtros: export.Filtros):
+    """
+    StreamingResponse sobre um gerador de export.py. A sessão síncrona é
+    aberta e fechada pelo próprio gerador, que o Starlette percorre no
+    threadpool enquanto envia a resposta.
+    """
+    try:
+        export.verificar_formato(formato)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    def conteudo():
+        db = SessionLocal()
+        try:
+            yield from export.serializar(gerar_blocos(db, filtros), colunas, formato)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        conteudo(),
+        media_type=export.CONTENT_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'},
+    )
+
+
+@router.get("/export/professores")
+def exportar_professores(
+    formato: str = "ndjson",
+    semestre: str | None = None,
+    curso_id: int | None = None,
+    disciplina_id: int | None = None
+):
+    """médias de cada professor em cada disciplina (ver export.py)"""
+    filtros = export.Filtros(semestre=semestre, curso_id=curso_id, disciplina_id=disciplina_id)
+    return _exportar("professores", export.professores, export.COLUNAS_PROFESSORES, formato, filtros)
+
+
+@router.get("/export/similaridades")
+def exportar_similaridades(
+    formato: str = "ndjson",
+    semestre: str | None = None,
+    curso_id: int | None = None,
+    disciplina_id: int | None = None
+):
+    """similaridade de cada aluno com perfil com cada professor de cada disciplina"""
+    filtros = export.Filtros(semestre=semestre, curso_id=curso_id, disciplina_id=disciplina_id)
+    return _exportar("similaridades", export.similaridades, export.COLUNAS_SIMILARIDADES, formato, filtros)
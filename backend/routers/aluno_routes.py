@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 import auth #onde esta a get_current_aluno()
 import schemas
 import crud
-import models
-from sqlalchemy.orm import Session
-from database import get_db
-import numpy as np
-import math
+import database
+from database import get_db, get_read_db, run_db
+import lazy_imports
+import scoring
+import catalog
+import collaborative_filtering
+import fast_json
+import professor_index
+import recommendation_cache
+import shared_profiles
+import metrics
+from scoring import weighted_euclidean_similarity
 from constants.features import FEATURE_NAMES
 
+np = lazy_imports.sob_demanda("numpy")
+
 
 router= APIRouter(
     prefix="/aluno", 
@@ -20,18 +30,89 @@ router= APIRouter(
 
 # todas as rotas abaixo estão protegidas, nao precisa de Depends(get_current aluno) pois colocamos no router
 
+MAX_DISCIPLINAS_LOTE = 50
+MAX_TOP_K = 200
+
+# "conteudo": pesos do aluno x médias dos professores; "colaborativo": as
+# médias misturadas às notas de alunos parecidos (ver collaborative_filtering.py)
+Motor = Literal["conteudo", "colaborativo"]
+
+
+async def _vetor_aluno(db, aluno_id: int) -> "np.ndarray":
+    """Vetor de preferências do aluno na ordem de FEATURE_NAMES (404 se não tiver perfil)."""
+    vetor_pesos = await run_db(db, crud.get_vetor_pesos, aluno_id=aluno_id)
+    if vetor_pesos is not None:
+        return scoring.desempacotar_vetor(vetor_pesos)
+
+    # perfil sem a cópia compacta (ou inexistente): pelas tabelas normalizadas
+    linhas = await run_db(db, crud.get_perfil_linhas, aluno_id=aluno_id)
+
+    preferencias_dict = {
+        coluna: peso
+        for _, id_preferencia, peso, _, _, coluna in linhas
+        if id_preferencia is not None
+    }
+    if not preferencias_dict:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil de preferências não encontrado. Preencha suas preferências primeiro."
+        )
+
+    return np.array([
+        preferencias_dict.get(feature, 0)
+        for feature in FEATURE_NAMES
+    ])
+
+
+# Leituras do próprio aluno: na réplica (se houver), exceto logo depois de ele
+# salvar o perfil, quando vão ao primário (ver database.REPLICA_STICKY_SECONDS).
+if database.DB_ASYNC:
+    async def get_db_leitura_aluno(current_aluno: schemas.Aluno = Depends(auth.get_current_aluno)):
+        async with database.fabrica_leitura(current_aluno.id_aluno)() as db:
+            yield db
+else:
+    def get_db_leitura_aluno(current_aluno: schemas.Aluno = Depends(auth.get_current_aluno)):
+        db = database.fabrica_leitura(current_aluno.id_aluno)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def _ranking_colaborativo(db, aluno_id: int, aluno_vector, disciplina_ids: list[int]) -> dict[int, list[dict]]:
+    """
+    Ranking do motor colaborativo por disciplina. Não passa pelo cache nem
+    pelos rankings pré-calculados, que são do motor de conteúdo.
+    """
+    prof_ratings_list = await run_db(
+        db, crud.get_professores_avg_ratings_by_disciplinas, disciplina_ids=disciplina_ids
+    )
+    with metrics.medir("scoring_colaborativo"):
+        prof_matrix = collaborative_filtering.motor.misturar(
+            aluno_id, prof_ratings_list, scoring.ratings_matrix(prof_ratings_list)
+        )
+        return scoring.rank_professores_por_disciplina(aluno_vector, prof_ratings_list, prof_matrix=prof_matrix)
+
+
+def _responder(dados):
+    """Com FAST_RESPONSES, resposta já serializada (sem revalidar pelo response_model)."""
+    if fast_json.FAST_RESPONSES:
+        return fast_json.resposta(dados)
+    return dados
+
+
 @router.post("/me/perfil", response_model=schemas.PerfilPreferencias)
-def salvar_perfil_aluno(
+async def salvar_perfil_aluno(
     perfil_data: schemas.PerfilFrontend, # Recebe o schema do frontend
-    db: Session = Depends(get_db),
-    current_aluno: models.Aluno = Depends(auth.get_current_aluno)
+    db = Depends(get_db),
+    current_aluno: schemas.Aluno = Depends(auth.get_current_aluno)
 ):
     """
     recebe os dados do formulario e transforma em forma de vetor
     """
     
     # 1. Pega o mapa de 'coluna' -> 'id_opcao' (ex: 'slide' -> 1)
-    opcoes_map = crud.get_opcoes_dict(db)
+    opcoes_map = await run_db(db, crud.get_opcoes_dict)
     if not opcoes_map:
         raise HTTPException(
             status_code=500, 
@@ -39,32 +120,69 @@ def salvar_perfil_aluno(
         )
 
     
+    # a partir daqui as leituras deste aluno vão ao primário por alguns segundos
+    database.marcar_escrita(current_aluno.id_aluno)
     try:
-        perfil_salvo = crud.create_or_update_aluno_perfil(
-            db=db, 
-            aluno=current_aluno, 
+        await run_db(
+            db, crud.create_or_update_aluno_perfil,
+            aluno_id=current_aluno.id_aluno, 
             perfil_data=perfil_data, 
             opcoes_map=opcoes_map
         )
-        return perfil_salvo
     except Exception as e:
-        db.rollback()
+        await run_db(db, lambda sessao: sessao.rollback())
+        # o mapa de opções em memória pode estar velho (banco populado de novo)
+        crud.invalidate_opcoes_cache()
         raise HTTPException(
             status_code=500, 
             detail=f"Erro ao salvar perfil: {e}"
         )
 
+    if fast_json.FAST_RESPONSES:
+        # só as colunas da resposta, em tuplas
+        linhas = await run_db(db, crud.get_perfil_linhas, aluno_id=current_aluno.id_aluno)
+        return fast_json.resposta(crud.perfil_resposta(linhas, current_aluno.id_aluno))
+
+    # recarrega com preferências e opções já carregadas (sem lazy load na serialização)
+    return await run_db(db, crud.get_perfil_completo_by_aluno_id, aluno_id=current_aluno.id_aluno)
+
+
+async def _resposta_catalogo(request: Request, db, chave: str) -> Response:
+    """
+    Resposta pré-serializada do snapshot do catálogo (ver catalog.py),
+    com ETag e Cache-Control; 304 se o cliente já tem essa versão.
+    """
+    snapshot = catalog.snapshot_atual()
+    if snapshot is None:
+        snapshot = await run_db(db, catalog.carregar)
+    resposta = snapshot[chave]
+
+    headers = {
+        "ETag": resposta.etag,
+        "Cache-Control": f"private, max-age={catalog.CATALOG_MAX_AGE_SECONDS}",
+    }
+    if catalog.etag_confere(request.headers.get("if-none-match"), resposta.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=resposta.corpo, media_type="application/json", headers=headers)
+
 
 @router.get("/disciplinas", response_model=list[schemas.Disciplina])
-def get_all_disciplinas(db: Session = Depends(get_db)):
-    return crud.get_disciplinas(db)
+async def get_all_disciplinas(request: Request, db = Depends(get_read_db)):
+    return await _resposta_catalogo(request, db, "disciplinas")
+
+
+@router.get("/catalogo", response_model=schemas.Catalogo)
+async def get_catalogo(request: Request, db = Depends(get_read_db)):
+    """cursos, disciplinas e tipos/opções de preferência"""
+    return await _resposta_catalogo(request, db, "catalogo")
     
     
 @router.get("/recomendacoes", response_model=list[schemas.ProfessorComSimilaridade])
-def get_recomendacoes(
+async def get_recomendacoes(
     disciplina_id: int,
-    db: Session = Depends(get_db),
-    current_aluno: models.Aluno = Depends(auth.get_current_aluno)
+    motor: Motor = "conteudo",
+    db = Depends(get_db_leitura_aluno),
+    current_aluno: schemas.Aluno = Depends(auth.get_current_aluno)
 ):
     """
     Calcula e retorna professores ranqueados por similaridade
@@ -72,92 +190,144 @@ def get_recomendacoes(
     Também retorna a quantidade de estrelas (0 a 5).
     """
 
+    if motor == "colaborativo":
+        aluno_vector = await _vetor_aluno(db, current_aluno.id_aluno)
+        por_disciplina = await _ranking_colaborativo(db, current_aluno.id_aluno, aluno_vector, [disciplina_id])
+        return _responder(por_disciplina.get(disciplina_id, []))
+
+    cache = recommendation_cache.cache
+    versao_cache = cache.versao(current_aluno.id_aluno, disciplina_id)
+    resultados_cache = cache.get(current_aluno.id_aluno, disciplina_id)
+    if resultados_cache is not None:
+        return _responder(resultados_cache)
+
     # 1. Perfil do aluno
-    perfil = crud.get_perfil_completo_by_aluno_id(db, aluno_id=current_aluno.id_aluno)
+    aluno_vector = await _vetor_aluno(db, current_aluno.id_aluno)
+    pesos_vector = aluno_vector.copy()
 
-    if not perfil or not perfil.preferencias:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Perfil de preferências não encontrado. Preencha suas preferências primeiro."
+    # ranking pré-calculado para o mesmo vetor, se já existir
+    precalculados = await run_db(
+        db, crud.get_rankings_arquetipo, vetor=scoring.chave_vetor(aluno_vector), disciplina_ids=[disciplina_id]
+    )
+    if disciplina_id in precalculados:
+        cache.set(current_aluno.id_aluno, disciplina_id, precalculados[disciplina_id], versao_cache)
+        return _responder(precalculados[disciplina_id])
+
+    # 2. Médias dos professores: da matriz compartilhada entre os workers
+    # (ver shared_profiles.py), se publicada, ou do banco
+    fatia = shared_profiles.store.fatias([disciplina_id]).get(disciplina_id)
+    if fatia is not None:
+        with metrics.medir("scoring"):
+            resultados_ordenados = fatia.rank(aluno_vector, pesos_vector)
+    else:
+        prof_ratings_list = await run_db(
+            db, crud.get_professores_avg_ratings_by_disciplina, disciplina_id=disciplina_id
         )
 
-    preferencias_dict = {
-        pref.opcao.coluna_mapeada: pref.peso
-        for pref in perfil.preferencias
-    }
+        if not prof_ratings_list:
+            cache.set(current_aluno.id_aluno, disciplina_id, [], versao_cache)
+            return _responder([])
 
-    aluno_vector = np.array([
-        preferencias_dict.get(feature, 0)
-        for feature in FEATURE_NAMES
-    ])
+        # 3. Similaridade + estrelas (todos os professores de uma vez) e ordenação
+        with metrics.medir("scoring"):
+            resultados_ordenados = scoring.rank_professores(aluno_vector, prof_ratings_list, pesos_vector)
 
-    pesos_vector = aluno_vector.copy()
+    metrics.log_amostrado("recomendacoes", lambda: {
+        "aluno_id": current_aluno.id_aluno,
+        "disciplina_id": disciplina_id,
+        "professores": [
+            (r["nome"], round(r["similaridade"], 3), round(r["estrelas"], 2))
+            for r in resultados_ordenados
+        ],
+    })
 
-    # 2. Médias dos professores
-    prof_ratings_list = crud.get_professores_avg_ratings_by_disciplina(
-        db, disciplina_id=disciplina_id
-    )
+    cache.set(current_aluno.id_aluno, disciplina_id, resultados_ordenados, versao_cache)
 
-    if not prof_ratings_list:
-        return []
+    return _responder(resultados_ordenados)
 
-    resultados = []
 
-    # 3. Similaridade + estrelas
-    for prof_data in prof_ratings_list:
 
-        prof_vector = np.array([
-            float(getattr(prof_data, f"avg_{feature}", 0) or 0)
-            for feature in FEATURE_NAMES
+@router.get("/recomendacoes/lote", response_model=list[schemas.RecomendacoesDisciplina])
+async def get_recomendacoes_lote(
+    disciplina_ids: list[int] = Query(..., min_length=1, max_length=MAX_DISCIPLINAS_LOTE),
+    motor: Motor = "conteudo",
+    db = Depends(get_db_leitura_aluno),
+    current_aluno: schemas.Aluno = Depends(auth.get_current_aluno)
+):
+    """
+    Mesmo ranking de /recomendacoes para várias disciplinas de uma vez
+    (ex: ?disciplina_ids=1&disciplina_ids=2): o perfil é lido uma vez e as
+    disciplinas fora do cache e sem ranking pré-calculado são buscadas e
+    pontuadas juntas.
+    """
+    cache = recommendation_cache.cache
+    aluno_id = current_aluno.id_aluno
+    disciplina_ids = list(dict.fromkeys(disciplina_ids))  # sem repetidas, na ordem pedida
+
+    if motor == "colaborativo":
+        aluno_vector = await _vetor_aluno(db, aluno_id)
+        por_disciplina = await _ranking_colaborativo(db, aluno_id, aluno_vector, disciplina_ids)
+        return _responder([
+            {"disciplina_id": disciplina_id, "professores": por_disciplina.get(disciplina_id, [])}
+            for disciplina_id in disciplina_ids
         ])
 
-        similaridade = weighted_euclidean_similarity(
-            aluno_vector,
-            prof_vector,
-            pesos_vector
-        )
+    resultados = {}
+    versoes = {}
+    for disciplina_id in disciplina_ids:
+        versoes[disciplina_id] = cache.versao(aluno_id, disciplina_id)
+        resultados_cache = cache.get(aluno_id, disciplina_id)
+        if resultados_cache is not None:
+            resultados[disciplina_id] = resultados_cache
 
-        # conversão similaridade (0 a 1) → estrelas (0 a 5)
-        estrelas = similaridade * 5
-
-        resultados.append({
-            "id_professor": prof_data.id_professor,
-            "nome": prof_data.nome,
-            "similaridade": similaridade,
-            "estrelas": estrelas
-        })
-
-    # 4. Ordenar
-    resultados_ordenados = sorted(
-        resultados,
-        key=lambda p: p["similaridade"],
-        reverse=True
-    )
-    for r in resultados_ordenados:
-        print(r["nome"], 
-          "sim:", round(r["similaridade"], 3), 
-          "estrelas:", round(r["estrelas"], 2))
+    faltando = [d for d in disciplina_ids if d not in resultados]
+    if faltando:
+        aluno_vector = await _vetor_aluno(db, aluno_id)
+        por_disciplina = await run_db(
+            db, crud.get_rankings_arquetipo, vetor=scoring.chave_vetor(aluno_vector), disciplina_ids=faltando
+        )
+        ao_vivo = [d for d in faltando if d not in por_disciplina]
+        if ao_vivo:
+            with metrics.medir("scoring"):
+                for disciplina_id, fatia in shared_profiles.store.fatias(ao_vivo).items():
+                    por_disciplina[disciplina_id] = fatia.rank(aluno_vector)
+            ao_vivo = [d for d in ao_vivo if d not in por_disciplina]
+        if ao_vivo:
+            prof_ratings_list = await run_db(
+                db, crud.get_professores_avg_ratings_by_disciplinas, disciplina_ids=ao_vivo
+            )
+            with metrics.medir("scoring"):
+                por_disciplina.update(scoring.rank_professores_por_disciplina(aluno_vector, prof_ratings_list))
 
+        for disciplina_id in faltando:
+            resultados[disciplina_id] = por_disciplina.get(disciplina_id, [])
+            cache.set(aluno_id, disciplina_id, resultados[disciplina_id], versoes[disciplina_id])
 
-    return resultados_ordenados
+    return _responder([
+        {"disciplina_id": disciplina_id, "professores": resultados[disciplina_id]}
+        for disciplina_id in disciplina_ids
+    ])
 
 
-def weighted_euclidean_similarity(aluno_vector, prof_vector, pesos_vector):
+@router.get("/recomendacoes/curso", response_model=list[schemas.ProfessorDisciplinaComSimilaridade])
+async def get_recomendacoes_curso(
+    curso_id: int | None = None,
+    disciplina_id: int | None = None,
+    k: int = Query(20, ge=1, le=MAX_TOP_K),
+    db = Depends(get_db_leitura_aluno),
+    current_aluno: schemas.Aluno = Depends(auth.get_current_aluno)
+):
     """
-    Calcula similaridade baseada na distância euclidiana ponderada,
-    normalizando pela maior distância possível (escala 0-7).
+    Os k pares (professor, disciplina) mais compatíveis com o aluno em um
+    curso inteiro (ou em uma disciplina), pelo índice em memória dos
+    perfis (ver professor_index.py). Mesmo cálculo de /recomendacoes.
     """
-    diff = aluno_vector - prof_vector
-    weighted = pesos_vector * (diff ** 2)
-    dist = float(np.sqrt(weighted.sum()))
-
-    # Máxima distância considerando notas/avaliações entre 0 e 7.
-    max_dist = float(np.sqrt((pesos_vector * (7 ** 2)).sum()))
-    if max_dist == 0:
-        return 0.0
+    aluno_vector = await _vetor_aluno(db, current_aluno.id_aluno)
 
-    ratio =  dist / max_dist
-    similarity = 1 / (1 + math.exp(10 * (ratio - 0.5)))
+    indice = professor_index.index
+    if indice.precisa_atualizar():
+        await run_db(db, indice.atualizar)
 
- 
-    return similarity
+    with metrics.medir("indice_top_k"):
+        resultados = indice.top_k(aluno_vector, k, curso_id=curso_id, disciplina_id=disciplina_id)
+    return _responder(resultados)
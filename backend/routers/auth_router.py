@@ -1,26 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status
+from database import get_db, run_db
 import schemas
 import auth
 import crud
+import password_pool
 
 router = APIRouter(tags=["auth"])
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(request: schemas.LoginRequest, db: Session = Depends(get_db)):
-    aluno = auth.authenticate_user(db, request.matricula, request.senha)
+async def login(request: schemas.LoginRequest, db = Depends(get_db)):
+    try:
+        aluno = await auth.authenticate_user_async(db, request.matricula, request.senha)
+    except password_pool.PasswordPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos logins simultâneos. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+    except password_pool.BrokenProcessPool:
+        # o pool quebrou de novo depois de trocado
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login temporariamente indisponível. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
 
     if not aluno:
         raise HTTPException(status_code=400, detail="Matrícula ou senha incorretos")
 
     token = auth.create_access_token(
-        data={"sub": aluno.matricula, "aluno_id": aluno.id_aluno},
+        data={
+            "sub": aluno.matricula,
+            "aluno_id": aluno.id_aluno,
+            "pwd": auth.password_stamp(aluno.hashed_password),
+        },
     )
 
-    has_profile = bool(aluno.perfil_preferencias)
+    has_profile = await run_db(db, crud.aluno_tem_perfil, aluno_id=aluno.id_aluno)
 
 
 
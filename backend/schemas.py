@@ -83,9 +83,42 @@ class ProfessorComSimilaridade(BaseModel):
     class Config:
         from_attributes = True
 
+class RecomendacoesDisciplina(BaseModel):
+    #resposta da rota /recomendacoes/lote, um item por disciplina pedida
+    disciplina_id: int
+    professores: list[ProfessorComSimilaridade]
+
+class ProfessorDisciplinaComSimilaridade(ProfessorComSimilaridade):
+    #resposta da rota /recomendacoes/curso: o mesmo professor pode aparecer em várias disciplinas
+    disciplina_id: int
+
 class Disciplina(BaseModel):
     id_disciplina: int
     nome: str
     
     class Config:
         from_attributes = True
+
+class DisciplinaCatalogo(Disciplina):
+    curso_id: int | None = None
+
+class Curso(BaseModel):
+    id_curso: int
+    nome: str
+
+    class Config:
+        from_attributes = True
+
+class TipoPreferenciaCatalogo(BaseModel):
+    id_tipo: int
+    nome: str
+    opcoes: list[OpcaoSchemaHelper]
+
+    class Config:
+        from_attributes = True
+
+class Catalogo(BaseModel):
+    #resposta da rota /catalogo: dados de referência, mudam uma vez por semestre
+    cursos: list[Curso]
+    disciplinas: list[DisciplinaCatalogo]
+    tipos_preferencia: list[TipoPreferenciaCatalogo]
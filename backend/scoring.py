@@ -0,0 +1,171 @@
+from __future__ import annotations
+import math
+import lazy_imports
+from constants.features import FEATURE_NAMES
+
+np = lazy_imports.sob_demanda("numpy")
+
+# Nota máxima das avaliações/preferências (mesma escala dos CheckConstraints).
+NOTA_MAXIMA = 7
+
+
+def weighted_euclidean_similarity(aluno_vector, prof_vector, pesos_vector):
+    """
+    Calcula similaridade baseada na distância euclidiana ponderada,
+    normalizando pela maior distância possível (escala 0-7).
+    """
+    diff = aluno_vector - prof_vector
+    weighted = pesos_vector * (diff ** 2)
+    dist = float(np.sqrt(weighted.sum()))
+
+    # Máxima distância considerando notas/avaliações entre 0 e 7.
+    max_dist = float(np.sqrt((pesos_vector * (NOTA_MAXIMA ** 2)).sum()))
+    if max_dist == 0:
+        return 0.0
+
+    ratio =  dist / max_dist
+    similarity = 1 / (1 + math.exp(10 * (ratio - 0.5)))
+
+
+    return similarity
+
+
+def chave_vetor(aluno_vector) -> str:
+    """Vetor de pesos (inteiros 0 a 7) como texto, um dígito por feature: [5, 0, 3, ...] -> '503...'."""
+    return "".join(str(int(peso)) for peso in aluno_vector)
+
+
+def empacotar_vetor(aluno_vector) -> bytes:
+    """Vetor de pesos (0 a 7, ordem de FEATURE_NAMES) em bytes, um byte por feature (PerfilPreferencias.vetor_pesos)."""
+    return bytes(int(peso) for peso in aluno_vector)
+
+
+def desempacotar_vetor(dados: bytes) -> np.ndarray:
+    """Inverso de empacotar_vetor, direto do buffer (np.frombuffer)."""
+    # int64 como o np.array([...]) de inteiros: em uint8, pesos * NOTA_MAXIMA ** 2 estouraria
+    return np.frombuffer(dados, dtype=np.uint8).astype(np.int64)
+
+
+def ratings_matrix(prof_ratings_list) -> np.ndarray:
+    """
+    Converte o resultado do agregado (linhas com 'avg_<feature>')
+    em uma matriz (N x 7) na ordem de FEATURE_NAMES.
+    """
+    matriz = np.zeros((len(prof_ratings_list), len(FEATURE_NAMES)), dtype=np.float64)
+    for i, prof_data in enumerate(prof_ratings_list):
+        matriz[i] = [
+            float(getattr(prof_data, f"avg_{feature}", 0) or 0)
+            for feature in FEATURE_NAMES
+        ]
+    return matriz
+
+
+def _sigmoide(razoes: np.ndarray) -> np.ndarray:
+    """1 / (1 + e^(10 (razão - 0.5))) elemento a elemento, como em weighted_euclidean_similarity."""
+    expoente = 10 * (razoes - 0.5)
+    # math.exp (via map, sem laço Python) em vez de np.exp: o np.exp
+    # vetorizado pode diferir no último bit e mudar a ordem de empates.
+    exps = np.fromiter(map(math.exp, expoente.ravel().tolist()), dtype=np.float64, count=expoente.size)
+    return 1 / (1 + exps.reshape(expoente.shape))
+
+
+def score_matrix(aluno_vector, prof_matrix, pesos_vector=None):
+    """
+    Versão vetorizada de weighted_euclidean_similarity para todos os
+    professores de uma vez.
+
+    Retorna (similaridades, estrelas, ordem), onde 'ordem' são os índices
+    das linhas da mais para a menos similar (empates mantêm a ordem original,
+    como o sorted(..., reverse=True) da rota).
+    """
+    aluno_vector = np.asarray(aluno_vector)
+    if pesos_vector is None:
+        pesos_vector = aluno_vector
+    pesos_vector = np.asarray(pesos_vector)
+    prof_matrix = np.asarray(prof_matrix, dtype=np.float64)
+
+    n = prof_matrix.shape[0]
+    max_dist = float(np.sqrt((pesos_vector * (NOTA_MAXIMA ** 2)).sum()))
+
+    if max_dist == 0:
+        similaridades = np.zeros(n, dtype=np.float64)
+    else:
+        diff = aluno_vector - prof_matrix
+        dist = np.sqrt((pesos_vector * (diff ** 2)).sum(axis=1))
+        similaridades = _sigmoide(dist / max_dist)
+
+    # conversão similaridade (0 a 1) → estrelas (0 a 5)
+    estrelas = similaridades * 5
+    ordem = np.argsort(-similaridades, kind="stable")
+
+    return similaridades, estrelas, ordem
+
+
+def similarity_matrix(aluno_matrix, prof_matrix) -> np.ndarray:
+    """
+    Similaridade de cada aluno (linha de aluno_matrix, que também é o vetor
+    de pesos dele) com cada professor: matriz (alunos x professores), igual
+    a weighted_euclidean_similarity par a par.
+    """
+    aluno_matrix = np.asarray(aluno_matrix, dtype=np.float64)
+    prof_matrix = np.asarray(prof_matrix, dtype=np.float64)
+
+    diff = aluno_matrix[:, None, :] - prof_matrix[None, :, :]
+    dist = np.sqrt((aluno_matrix[:, None, :] * (diff ** 2)).sum(axis=2))
+    max_dist = np.sqrt((aluno_matrix * (NOTA_MAXIMA ** 2)).sum(axis=1))
+
+    similaridades = np.zeros(dist.shape, dtype=np.float64)
+    validos = max_dist > 0
+    similaridades[validos] = _sigmoide(dist[validos] / max_dist[validos, None])
+    return similaridades
+
+
+def rank_professores(aluno_vector, prof_ratings_list, pesos_vector=None) -> list[dict]:
+    """
+    Pontua e ordena o resultado do agregado de professores
+    no formato de resposta de /aluno/recomendacoes.
+    """
+    if not prof_ratings_list:
+        return []
+
+    prof_matrix = ratings_matrix(prof_ratings_list)
+    similaridades, estrelas, ordem = score_matrix(aluno_vector, prof_matrix, pesos_vector)
+
+    return [
+        {
+            "id_professor": prof_ratings_list[i].id_professor,
+            "nome": prof_ratings_list[i].nome,
+            "similaridade": float(similaridades[i]),
+            "estrelas": float(estrelas[i]),
+        }
+        for i in ordem.tolist()
+    ]
+
+
+def rank_professores_por_disciplina(aluno_vector, prof_ratings_list, pesos_vector=None, prof_matrix=None) -> dict[int, list[dict]]:
+    """
+    Como rank_professores, para linhas de várias disciplinas (com 'disciplina_id'):
+    pontua tudo de uma vez e devolve {disciplina_id: professores ordenados}.
+    'prof_matrix' evita refazer ratings_matrix ao pontuar as mesmas linhas várias vezes.
+    """
+    if not prof_ratings_list:
+        return {}
+
+    if prof_matrix is None:
+        prof_matrix = ratings_matrix(prof_ratings_list)
+    similaridades, estrelas, _ = score_matrix(aluno_vector, prof_matrix, pesos_vector)
+
+    disciplinas = np.array([linha.disciplina_id for linha in prof_ratings_list])
+    # lexsort é estável: dentro de cada disciplina, mesma ordem de rank_professores
+    ordem = np.lexsort((-similaridades, disciplinas))
+
+    resultado = {}
+    for i in ordem.tolist():
+        linha = prof_ratings_list[i]
+        resultado.setdefault(linha.disciplina_id, []).append({
+            "id_professor": linha.id_professor,
+            "nome": linha.nome,
+            "similaridade": float(similaridades[i]),
+            "estrelas": float(estrelas[i]),
+        })
+    return resultado
@@ -0,0 +1,190 @@
+"""
+Seeding idempotente do banco: catálogo de preferências, dados de simulação
+e, para staging, alunos em volume.
+
+    python seed.py                   # catálogo + simulação
+    python seed.py --alunos 50000    # + 50 mil alunos seed-0000001, ... (senha SENHA_SEED)
+
+Tudo entra em massa (insert().values([...]) ou COPY, ver bulk.py) com
+ON CONFLICT DO NOTHING nas chaves naturais (nome, matrícula, aluno/turma):
+rodar de novo não duplica nem apaga nada. Professores e turmas não têm chave
+única no esquema, então só os que ainda não existem (pelo nome) são inseridos.
+A senha é hasheada com bcrypt uma vez só, para todos os alunos.
+
+O esquema vem das migrações (db_migrations.py); dados sintéticos realistas
+(perfis e avaliações em volume) ficam em tools/synthetic_data.py.
+"""
+import argparse
+import time
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import bulk
+import catalog
+import crud
+import models
+import professor_profiles
+from constants.features import FEATURE_NAMES
+from database import SessionLocal, dialect_insert
+
+
+SENHA_SEED = "puc123"
+PREFIXO_MATRICULA = "seed-"
+
+TIPOS = ["Forma de Lecionar", "Método Avaliativo", "Ritmo da Aula", "Engajamento"]
+
+# (nome, coluna_mapeada, tipo)
+OPCOES = [
+    ("Usa Slides", "slide", "Forma de Lecionar"),
+    ("Usa Quadro", "quadro", "Forma de Lecionar"),
+    ("Foco em Provas", "provas", "Método Avaliativo"),
+    ("Foco em Trabalhos", "trabalhos", "Método Avaliativo"),
+    ("Foco em Projetos", "projetos", "Método Avaliativo"),
+    ("Ritmo da Aula", "velocidade_aula", "Ritmo da Aula"),
+    ("Interação e Participação", "interacao", "Engajamento"),
+]
+
+# dados de simulação
+CURSOS = ["Engenharia de Software"]
+DISCIPLINAS = [("Banco de Dados", "Engenharia de Software")]
+PROFESSORES = ["Prof. Adriano", "Prof. Carla"]
+# (nome_turma, semestre, professor, disciplina)
+TURMAS = [
+    ("3WA", "2025.1", "Prof. Adriano", "Banco de Dados"),
+    ("3WB", "2025.1", "Prof. Carla", "Banco de Dados"),
+]
+ALUNOS = [
+    ("2110001", "João Silva"),
+    ("2110002", "Maria Souza"),
+    ("2110003", "Pedro Costa"),
+    ("2110004", "Felipe Veeck"),
+    ("2110005", "Vitor Python"),
+]
+# (matrícula, turma, semestre, notas na ordem de FEATURE_NAMES)
+AVALIACOES = [
+    ("2110002", "3WA", "2025.1", (7, 2, 6, 4, 5, 5, 5)),
+    ("2110003", "3WA", "2025.1", (6, 3, 7, 5, 5, 5, 6)),
+    ("2110002", "3WB", "2025.1", (2, 7, 4, 6, 5, 5, 7)),
+    ("2110003", "3WB", "2025.1", (3, 6, 5, 6, 5, 5, 6)),
+]
+
+
+def _inserir(db: Session, tabela, linhas: list[dict], conflito: list[str]) -> int:
+    """INSERT ... VALUES (...), (...) ON CONFLICT DO NOTHING; retorna quantas entraram."""
+    if not linhas:
+        return 0
+    insert_stmt = dialect_insert(db.get_bind())(tabela).values(linhas)
+    return db.execute(insert_stmt.on_conflict_do_nothing(index_elements=conflito)).rowcount
+
+
+def _ids(db: Session, coluna_id, *colunas_chave) -> dict:
+    """{chave natural: id} de uma tabela pequena."""
+    linhas = db.execute(select(coluna_id, *colunas_chave)).all()
+    if len(colunas_chave) == 1:
+        return {linha[1]: linha[0] for linha in linhas}
+    return {tuple(linha[1:]): linha[0] for linha in linhas}
+
+
+def semear_catalogo(db: Session) -> int:
+    """Tipos e opções de preferência."""
+    inseridas = _inserir(db, models.TipoPreferencia.__table__, [{"nome": nome} for nome in TIPOS], ["nome"])
+    tipos = _ids(db, models.TipoPreferencia.id_tipo, models.TipoPreferencia.nome)
+    inseridas += _inserir(db, models.OpcaoPreferencia.__table__, [
+        {"nome": nome, "coluna_mapeada": coluna, "tipo_id": tipos[tipo]}
+        for nome, coluna, tipo in OPCOES
+    ], ["nome"])
+    return inseridas
+
+
+def semear_simulacao(db: Session, senha_hash: str) -> int:
+    """Curso, disciplina, professores, turmas, alunos e avaliações de exemplo."""
+    inseridas = _inserir(db, models.Curso.__table__, [{"nome": nome} for nome in CURSOS], ["nome"])
+    cursos = _ids(db, models.Curso.id_curso, models.Curso.nome)
+    inseridas += _inserir(db, models.Disciplina.__table__, [
+        {"nome": nome, "curso_id": cursos[curso]} for nome, curso in DISCIPLINAS
+    ], ["nome"])
+    disciplinas = _ids(db, models.Disciplina.id_disciplina, models.Disciplina.nome)
+
+    existentes = _ids(db, models.Professor.id_professor, models.Professor.nome)
+    novos = [{"nome": nome} for nome in PROFESSORES if nome not in existentes]
+    if novos:
+        inseridas += db.execute(models.Professor.__table__.insert().values(novos)).rowcount
+    professores = _ids(db, models.Professor.id_professor, models.Professor.nome)
+
+    existentes = _ids(db, models.Turma.id_turma, models.Turma.disciplina_id, models.Turma.nome_turma, models.Turma.semestre)
+    novas = [
+        {
+            "nome_turma": nome_turma, "semestre": semestre,
+            "professor_id": professores[professor], "disciplina_id": disciplinas[disciplina],
+        }
+        for nome_turma, semestre, professor, disciplina in TURMAS
+        if (disciplinas[disciplina], nome_turma, semestre) not in existentes
+    ]
+    if novas:
+        inseridas += db.execute(models.Turma.__table__.insert().values(novas)).rowcount
+    turmas = _ids(db, models.Turma.id_turma, models.Turma.disciplina_id, models.Turma.nome_turma, models.Turma.semestre)
+    disciplina_da_turma = {nome_turma: disciplinas[disciplina] for nome_turma, _, _, disciplina in TURMAS}
+
+    inseridas += _inserir(db, models.Aluno.__table__, [
+        {"matricula": matricula, "nome": nome, "hashed_password": senha_hash}
+        for matricula, nome in ALUNOS
+    ], ["matricula"])
+    alunos = dict(db.execute(
+        select(models.Aluno.matricula, models.Aluno.id_aluno)
+        .where(models.Aluno.matricula.in_([matricula for matricula, _ in ALUNOS]))
+    ).all())
+
+    avaliacoes = _inserir(db, models.Avaliacao.__table__, [
+        {
+            "aluno_id": alunos[matricula], "turma_id": turmas[(disciplina_da_turma[nome_turma], nome_turma, semestre)],
+            "semestre": semestre, **dict(zip(FEATURE_NAMES, notas)),
+        }
+        for matricula, nome_turma, semestre, notas in AVALIACOES
+    ], ["aluno_id", "turma_id"])
+    if avaliacoes:
+        # inserts fora do ORM não disparam a manutenção incremental dos perfis
+        professor_profiles.refresh_disciplinas(db, [disciplinas[disciplina] for disciplina, _ in DISCIPLINAS])
+    return inseridas + avaliacoes
+
+
+def semear_alunos(db: Session, quantidade: int, senha_hash: str) -> int:
+    """Alunos PREFIXO_MATRICULA0000001... em massa (COPY no Postgres), todos com a mesma senha."""
+    return bulk.copy_rows_ignorando_conflitos(
+        db, models.Aluno.__table__, ["matricula", "nome", "hashed_password"],
+        (
+            (f"{PREFIXO_MATRICULA}{i:07d}", f"Aluno Seed {i}", senha_hash)
+            for i in range(1, quantidade + 1)
+        ),
+        conflito=["matricula"],
+    )
+
+
+def seed(db: Session, alunos: int = 0, progresso=print) -> dict:
+    from auth import get_password_hash
+    senha_hash = get_password_hash(SENHA_SEED)  # um bcrypt só para todos os alunos
+
+    resumo = {"catalogo": semear_catalogo(db)}
+    resumo["simulacao"] = semear_simulacao(db, senha_hash)
+    if alunos:
+        resumo["alunos"] = semear_alunos(db, alunos, senha_hash)
+    db.commit()
+
+    if resumo["catalogo"] or resumo["simulacao"]:
+        # inserts fora do ORM não passam pelos eventos que invalidam esses caches
+        crud.invalidate_opcoes_cache()
+        catalog.invalidate()
+    progresso(f"Seeding concluído (linhas novas): {resumo}")
+    return resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Popula o banco (idempotente).")
+    parser.add_argument("--alunos", type=int, default=0, help=f"alunos extras {PREFIXO_MATRICULA}NNNNNNN para staging")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        seed(db, alunos=args.alunos)
+        print(f"Em {time.perf_counter() - inicio:.1f}s")
+    finally:
+        db.close()
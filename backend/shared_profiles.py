@@ -0,0 +1,379 @@
+"""
+Matriz dos perfis dos professores (as médias de
+get_professores_avg_ratings_by_disciplina, de todas as disciplinas)
+publicada em um arquivo mapeado em memória, compartilhado pelos workers.
+
+Um processo publica (o job de main.py no worker que pegar a trava do
+diretório, ou `python shared_profiles.py`); cada worker só mapeia o arquivo
+em modo leitura (mmap) e pontua direto nas views NumPy, sem copiar nem
+consultar o banco. Com SHARED_PROFILES_DIR em /dev/shm
+o arquivo fica na memória e as páginas são as mesmas para todos os processos.
+
+Cada publicação é uma geração nova: o arquivo perfis-<geração>.bin é escrito
+à parte e só depois o ponteiro ATUAL é trocado (os.replace, atômico). Os
+workers relêem ATUAL a cada SHARED_PROFILES_CHECK_SECONDS e passam a usar a
+geração nova; quem ainda usa a antiga continua com ela até terminar (o
+arquivo apagado só some quando ninguém mais o mapeia).
+
+Formato (little-endian, seções alinhadas em 8 bytes):
+
+    cabeçalho     MAGIA, geração, criado_em, features, linhas, disciplinas, bytes dos nomes
+    disciplinas   int64[D]      ids de todas as disciplinas, em ordem crescente
+    versões       int64[D]      Disciplina.versao_perfis de cada uma na publicação
+    inícios       int64[D + 1]  linhas de cada disciplina: inícios[i]:inícios[i + 1]
+    professores   int64[N]
+    matriz        float64[N x 7]  médias na ordem de FEATURE_NAMES
+    nomes         int64[N + 1] posições + bytes utf-8
+
+As linhas seguem a ordem da consulta (disciplina, professor), então o
+ranking é o mesmo de /aluno/recomendacoes.
+
+Desatualização: toda alteração nos perfis de uma disciplina avança
+Disciplina.versao_perfis (professor_profiles._descartar_rankings). Em cada
+worker, verificar() (job de main.py, a cada SHARED_PROFILES_CHECK_SECONDS)
+compara as versões do banco com as da geração; disciplinas diferentes voltam
+a ser lidas do banco até a próxima geração. Uma geração ainda não verificada
+não é usada. Alterações feitas no próprio processo valem na hora (ver
+professor_profiles.ao_alterar_perfis); as de outros workers, em até
+SHARED_PROFILES_CHECK_SECONDS.
+"""
+from __future__ import annotations
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import crud
+import lazy_imports
+import models
+import professor_profiles
+import scoring
+from constants.features import FEATURE_NAMES
+
+np = lazy_imports.sob_demanda("numpy")
+
+
+SHARED_PROFILES_DIR = os.getenv("SHARED_PROFILES_DIR", "")
+SHARED_PROFILES_REFRESH_SECONDS = float(os.getenv("SHARED_PROFILES_REFRESH_SECONDS", "0"))
+# uma consulta a disciplinas por worker a cada intervalo: o padrão é folgado
+SHARED_PROFILES_CHECK_SECONDS = float(os.getenv("SHARED_PROFILES_CHECK_SECONDS", "30"))
+
+MAGIA = b"SRAPERF2"
+CABECALHO = struct.Struct("<8sqdqqqq")
+PONTEIRO = "ATUAL"
+TRAVA_PUBLICADOR = ".publicador"
+GERACOES_MANTIDAS = 2
+N_FEATURES = len(FEATURE_NAMES)
+
+logger = logging.getLogger("sra.perfis_compartilhados")
+
+
+def _alinhar(tamanho: int) -> int:
+    return (tamanho + 7) // 8 * 8
+
+
+def _secoes(linhas: int, disciplinas: int) -> list[tuple[str, int]]:
+    """(nome, bytes) das seções de arrays, na ordem do arquivo."""
+    return [
+        ("disciplinas", 8 * disciplinas),
+        ("versoes", 8 * disciplinas),
+        ("inicios", 8 * (disciplinas + 1)),
+        ("professores", 8 * linhas),
+        ("matriz", 8 * linhas * N_FEATURES),
+        ("posicoes_nomes", 8 * (linhas + 1)),
+    ]
+
+
+# --- publicação ---
+
+def _versoes(db: Session) -> tuple[np.ndarray, np.ndarray]:
+    """(ids, versao_perfis) de todas as disciplinas, por id."""
+    linhas = db.execute(
+        select(models.Disciplina.id_disciplina, models.Disciplina.versao_perfis)
+        .order_by(models.Disciplina.id_disciplina)
+    ).all()
+    dados = np.array(linhas, dtype=np.int64).reshape(-1, 2)
+    return dados[:, 0], dados[:, 1]
+
+
+def _ler(db: Session):
+    # versões antes dos perfis: uma alteração entre as duas leituras deixa a
+    # versão gravada atrasada (a disciplina vai ao banco), nunca adiantada
+    ids, versoes = _versoes(db)
+    linhas = crud.professores_avg_ratings_query(db, select(models.Disciplina.id_disciplina)).all()
+    disciplinas = np.array([linha.disciplina_id for linha in linhas], dtype=np.int64)
+    nomes = [linha.nome.encode("utf-8") for linha in linhas]
+    professores = np.array([linha.id_professor for linha in linhas], dtype=np.int64)
+    return ids, versoes, disciplinas, professores, scoring.ratings_matrix(linhas), nomes
+
+
+def _conteudo(geracao: int, criado_em: float, ids, versoes, disciplinas, professores, matriz, nomes) -> list[bytes]:
+    # disciplinas criadas depois da leitura das versões (raras) ficam sem linhas no arquivo
+    presentes = np.isin(disciplinas, ids)
+    disciplinas, professores, matriz = disciplinas[presentes], professores[presentes], matriz[presentes]
+    nomes = [nome for nome, presente in zip(nomes, presentes.tolist()) if presente]
+    inicios = np.searchsorted(disciplinas, np.append(ids, np.iinfo(np.int64).max)).astype(np.int64)
+    inicios[-1] = len(disciplinas)
+    posicoes_nomes = np.zeros(len(nomes) + 1, dtype=np.int64)
+    np.cumsum([len(nome) for nome in nomes], out=posicoes_nomes[1:])
+    blob = b"".join(nomes)
+
+    partes = [CABECALHO.pack(MAGIA, geracao, criado_em, N_FEATURES, len(professores), len(ids), len(blob))]
+    for array in (ids, versoes, inicios, professores, np.ascontiguousarray(matriz, dtype=np.float64), posicoes_nomes):
+        partes.append(array.astype("<i8" if array.dtype.kind == "i" else "<f8").tobytes())
+    partes.append(blob)
+    return partes
+
+
+def publicar(db: Session, diretorio: str = SHARED_PROFILES_DIR) -> str:
+    """Escreve uma geração nova e troca o ponteiro; retorna o nome do arquivo."""
+    os.makedirs(diretorio, exist_ok=True)
+    # o que for alterado depois deste instante pode não estar na geração
+    criado_em = time.time()
+    geracao = time.time_ns()
+    partes = _conteudo(geracao, criado_em, *_ler(db))
+
+    nome = f"perfis-{geracao}.bin"
+    temporario = os.path.join(diretorio, f".{nome}.{os.getpid()}.tmp")
+    with open(temporario, "wb") as f:
+        for parte in partes:
+            f.write(parte)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, os.path.join(diretorio, nome))
+
+    temporario = os.path.join(diretorio, f".{PONTEIRO}.{os.getpid()}.tmp")
+    with open(temporario, "w") as f:
+        f.write(nome)
+    os.replace(temporario, os.path.join(diretorio, PONTEIRO))
+
+    _apagar_antigas(diretorio, nome)
+    return nome
+
+
+_trava_publicador = None
+
+
+def publicar_se_publicador(db: Session, diretorio: str = SHARED_PROFILES_DIR) -> str | None:
+    """
+    publicar() só no worker que detém a trava do diretório (o primeiro a
+    tentar fica com ela enquanto viver); nos outros não faz nada.
+    """
+    global _trava_publicador
+    if _trava_publicador is None:
+        os.makedirs(diretorio, exist_ok=True)
+        trava = open(os.path.join(diretorio, TRAVA_PUBLICADOR), "w")
+        try:
+            fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            trava.close()
+            return None
+        _trava_publicador = trava
+    return publicar(db, diretorio)
+
+
+def _apagar_antigas(diretorio: str, atual: str):
+    geracoes = sorted(
+        arquivo for arquivo in os.listdir(diretorio)
+        if arquivo.startswith("perfis-") and arquivo.endswith(".bin")
+    )
+    for arquivo in geracoes[:-GERACOES_MANTIDAS]:
+        if arquivo != atual:
+            try:
+                os.remove(os.path.join(diretorio, arquivo))
+            except FileNotFoundError:
+                pass
+
+
+# --- leitura ---
+
+@dataclass(frozen=True)
+class Fatia:
+    """Os professores de uma disciplina: views sobre o arquivo mapeado."""
+    professor_ids: np.ndarray
+    matriz: np.ndarray
+    nomes: list[str]
+
+    def rank(self, aluno_vector, pesos_vector=None) -> list[dict]:
+        """Como scoring.rank_professores, direto sobre a matriz mapeada."""
+        if not len(self.professor_ids):
+            return []
+        similaridades, estrelas, ordem = scoring.score_matrix(aluno_vector, self.matriz, pesos_vector)
+        return [
+            {
+                "id_professor": int(self.professor_ids[i]),
+                "nome": self.nomes[i],
+                "similaridade": float(similaridades[i]),
+                "estrelas": float(estrelas[i]),
+            }
+            for i in ordem.tolist()
+        ]
+
+
+class _Geracao:
+
+    def __init__(self, caminho: str):
+        with open(caminho, "rb") as f:
+            self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, self.geracao, self.criado_em, features, linhas, disciplinas, bytes_nomes = CABECALHO.unpack_from(self._mapa, 0)
+        if magia != MAGIA or features != N_FEATURES:
+            raise ValueError(f"{caminho}: formato desconhecido")
+
+        posicao = _alinhar(CABECALHO.size)
+        arrays = {}
+        for nome, tamanho in _secoes(linhas, disciplinas):
+            tipo = "<f8" if nome == "matriz" else "<i8"
+            arrays[nome] = np.frombuffer(self._mapa, dtype=tipo, count=tamanho // 8, offset=posicao)
+            posicao += _alinhar(tamanho)
+
+        self.disciplinas = arrays["disciplinas"]
+        self.versoes = arrays["versoes"]
+        self.inicios = arrays["inicios"]
+        self.professores = arrays["professores"]
+        self.matriz = arrays["matriz"].reshape(linhas, N_FEATURES)
+        self._posicoes_nomes = arrays["posicoes_nomes"]
+        self._inicio_nomes = posicao
+        self.tamanho = posicao + bytes_nomes
+
+    def fatia(self, disciplina_id: int) -> Fatia:
+        i = int(np.searchsorted(self.disciplinas, disciplina_id))
+        if i == len(self.disciplinas) or self.disciplinas[i] != disciplina_id:
+            inicio = fim = 0
+        else:
+            inicio, fim = int(self.inicios[i]), int(self.inicios[i + 1])
+        posicoes = (self._posicoes_nomes[inicio:fim + 1] + self._inicio_nomes).tolist()
+        return Fatia(
+            professor_ids=self.professores[inicio:fim],
+            matriz=self.matriz[inicio:fim],
+            nomes=[self._mapa[a:b].decode("utf-8") for a, b in zip(posicoes, posicoes[1:])],
+        )
+
+
+class PerfisCompartilhados:
+
+    def __init__(self, diretorio: str, intervalo_verificacao: float):
+        self.diretorio = diretorio
+        self.intervalo_verificacao = intervalo_verificacao
+        self._geracao = None
+        self._arquivo = None
+        self._verificado_em = float("-inf")
+        self._alteradas = {}
+        # (geração verificada, ids desatualizados nela)
+        self._desatualizadas = (None, frozenset())
+        self._lock = threading.Lock()
+        self.trocas = 0
+        self.leituras_do_banco = 0
+        self.disciplinas_desatualizadas = 0
+
+    def marcar(self, disciplina_ids):
+        """Disciplinas alteradas neste processo (None = todas): vão ao banco até a próxima geração."""
+        agora = time.time()
+        with self._lock:
+            if disciplina_ids is None:
+                self._alteradas = {None: agora}
+            else:
+                for disciplina_id in disciplina_ids:
+                    self._alteradas[disciplina_id] = agora
+
+    def _atual(self):
+        """A geração publicada mais recente (relendo o ponteiro no máximo a cada intervalo)."""
+        if not self.diretorio:
+            return None
+        agora = time.monotonic()
+        if agora - self._verificado_em < self.intervalo_verificacao:
+            return self._geracao
+        with self._lock:
+            if agora - self._verificado_em < self.intervalo_verificacao:
+                return self._geracao
+            self._verificado_em = agora
+            try:
+                with open(os.path.join(self.diretorio, PONTEIRO)) as f:
+                    arquivo = f.read().strip()
+                if arquivo != self._arquivo:
+                    self._geracao = _Geracao(os.path.join(self.diretorio, arquivo))
+                    self._arquivo = arquivo
+                    self.trocas += 1
+                    self._alteradas = {
+                        d: quando for d, quando in self._alteradas.items() if quando >= self._geracao.criado_em
+                    }
+            except (OSError, ValueError) as e:
+                if self._geracao is None:
+                    return None
+                logger.warning("Perfis compartilhados: mantendo a geração atual (%s)", e)
+            return self._geracao
+
+    def verificar(self, db: Session):
+        """
+        Compara Disciplina.versao_perfis no banco com as versões da geração
+        atual: as diferentes (alteradas por qualquer processo depois da
+        publicação, ou criadas depois dela) vão ao banco até a próxima geração.
+        """
+        geracao = self._atual()
+        if geracao is None:
+            return
+        ids, versoes = _versoes(db)
+        posicoes = np.minimum(np.searchsorted(geracao.disciplinas, ids), max(len(geracao.disciplinas) - 1, 0))
+        if len(geracao.disciplinas):
+            iguais = (geracao.disciplinas[posicoes] == ids) & (geracao.versoes[posicoes] == versoes)
+        else:
+            iguais = np.zeros(len(ids), dtype=bool)
+        desatualizadas = frozenset(ids[~iguais].tolist())
+        with self._lock:
+            self._desatualizadas = (geracao, desatualizadas)
+            self.disciplinas_desatualizadas = len(desatualizadas)
+
+    def fatias(self, disciplina_ids) -> dict[int, Fatia]:
+        """
+        {disciplina_id: Fatia} das disciplinas que podem ser servidas pelo
+        arquivo; as que faltarem devem ser lidas do banco.
+        """
+        geracao = self._atual()
+        if geracao is None:
+            return {}
+        verificada, desatualizadas = self._desatualizadas
+        alteradas = self._alteradas
+        if verificada is not geracao or alteradas.get(None, 0) >= geracao.criado_em:
+            self.leituras_do_banco += 1
+            return {}
+        resultado = {
+            disciplina_id: geracao.fatia(disciplina_id)
+            for disciplina_id in disciplina_ids
+            if alteradas.get(disciplina_id, 0) < geracao.criado_em and disciplina_id not in desatualizadas
+        }
+        if len(resultado) < len(disciplina_ids):
+            self.leituras_do_banco += 1
+        return resultado
+
+    def stats(self) -> dict:
+        geracao = self._geracao
+        return {
+            "geracao": 0 if geracao is None else geracao.geracao,
+            "linhas": 0 if geracao is None else len(geracao.professores),
+            "bytes": 0 if geracao is None else geracao.tamanho,
+            "trocas": self.trocas,
+            "leituras_do_banco": self.leituras_do_banco,
+            "disciplinas_desatualizadas": self.disciplinas_desatualizadas,
+        }
+
+
+store = PerfisCompartilhados(SHARED_PROFILES_DIR, SHARED_PROFILES_CHECK_SECONDS)
+professor_profiles.ao_alterar_perfis.append(store.marcar)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    if not SHARED_PROFILES_DIR:
+        raise SystemExit("Defina SHARED_PROFILES_DIR.")
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        arquivo = publicar(db)
+        print(f"Publicado {arquivo} em {time.perf_counter() - inicio:.2f}s")
+    finally:
+        db.close()
@@ -0,0 +1,134 @@
+"""
+Inicialização da aplicação em fases medidas e aquecimento opcional.
+
+As fases (importação, configuração, banco, aquecimento...) são registradas
+em `relatorio`: uma linha no log quando a aplicação fica pronta, gauges
+sra_inicializacao_* em /metrics e GET /admin/inicializacao.
+
+Com STARTUP_WARMUP=true o lifespan, antes de aceitar requisições, importa
+as bibliotecas pesadas adiadas por lazy_imports (numpy, jose), abre as
+conexões do pool (primário e réplica), carrega o snapshot do catálogo e o
+mapa de opções, monta o índice de professores (e a matriz da filtragem
+colaborativa, se ligada), mapeia a geração atual dos perfis compartilhados e
+sobe os processos do bcrypt. Sem ele (padrão, para o processo subir o mais
+rápido possível) cada coisa é feita na primeira requisição que precisar.
+"""
+import importlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from starlette.concurrency import run_in_threadpool
+import catalog
+import collaborative_filtering
+import crud
+import database
+import password_pool
+import professor_index
+import shared_profiles
+
+
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "false").lower() in ("1", "true", "yes")
+# importadas no primeiro uso (ver lazy_imports.py); o aquecimento paga antes do tráfego
+BIBLIOTECAS_ADIADAS = ("numpy", "jose.jwt")
+
+
+class Relatorio:
+
+    def __init__(self):
+        self._fases = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, segundos: float):
+        with self._lock:
+            self._fases[nome] = self._fases.get(nome, 0.0) + segundos
+
+    @contextmanager
+    def fase(self, nome: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio)
+
+    def resumo(self) -> str:
+        with self._lock:
+            fases = dict(self._fases)
+        partes = [f"{nome} {segundos * 1000:.0f}ms" for nome, segundos in fases.items()]
+        return f"Inicialização em {sum(fases.values()) * 1000:.0f}ms: " + ", ".join(partes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            fases = dict(self._fases)
+        return {**{f"{nome}_segundos": segundos for nome, segundos in fases.items()}, "total_segundos": sum(fases.values())}
+
+
+relatorio = Relatorio()
+
+
+def _abrir_conexoes(engine, quantidade: int):
+    """Abre 'quantidade' conexões ao mesmo tempo e as devolve ao pool."""
+    conexoes = []
+    try:
+        for _ in range(quantidade):
+            conexao = engine.connect()
+            conexoes.append(conexao)
+            conexao.exec_driver_sql("SELECT 1")
+    finally:
+        for conexao in conexoes:
+            conexao.close()
+
+
+async def _abrir_conexoes_async(engine, quantidade: int):
+    conexoes = []
+    try:
+        for _ in range(quantidade):
+            conexao = await engine.connect()
+            conexoes.append(conexao)
+            await conexao.exec_driver_sql("SELECT 1")
+    finally:
+        for conexao in conexoes:
+            await conexao.close()
+
+
+def _importar_bibliotecas():
+    with relatorio.fase("bibliotecas"):
+        for nome in BIBLIOTECAS_ADIADAS:
+            importlib.import_module(nome)
+
+
+def _aquecer_caches():
+    db = database.SessionLocal()
+    try:
+        with relatorio.fase("catalogo"):
+            catalog.carregar(db)
+            crud.get_opcoes_dict(db)
+        with relatorio.fase("indice_professores"):
+            professor_index.index.atualizar(db)
+        if collaborative_filtering.CF_REFRESH_SECONDS > 0:
+            with relatorio.fase("filtragem_colaborativa"):
+                collaborative_filtering.motor.atualizar(db)
+    finally:
+        db.close()
+    with relatorio.fase("perfis_compartilhados"):
+        shared_profiles.store.fatias([])
+
+
+def _aquecer_bcrypt():
+    with relatorio.fase("bcrypt"):
+        password_pool.aquecer()
+
+
+async def aquecer():
+    """Prepara conexões, caches e o pool de bcrypt antes do tráfego (STARTUP_WARMUP)."""
+    await run_in_threadpool(_importar_bibliotecas)
+    with relatorio.fase("conexoes"):
+        quantidade = database.DB_POOL_SIZE
+        await run_in_threadpool(_abrir_conexoes, database.engine, quantidade)
+        if database.replica_engine is not None:
+            await run_in_threadpool(_abrir_conexoes, database.replica_engine, quantidade)
+        for fabrica in {id(f): f for f in (database.AsyncSessionLocal, database.AsyncReplicaSessionLocal) if f}.values():
+            await _abrir_conexoes_async(fabrica.kw["bind"], quantidade)
+
+    await run_in_threadpool(_aquecer_caches)
+    await run_in_threadpool(_aquecer_bcrypt)
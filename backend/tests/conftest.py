@@ -0,0 +1,220 @@
+"""
+Fixtures dos testes: banco SQLite temporário criado pelas migrações e pelo
+seed (como o init_database), a aplicação com o lifespan e o login do aluno
+da simulação. Sem Postgres; rode em backend/:
+
+    python -m pytest -q
+"""
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+
+# antes de qualquer import do projeto: os módulos leem a configuração no import
+_DIRETORIO = tempfile.mkdtemp(prefix="sra-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIRETORIO, 'testes.sqlite')}"
+os.environ["SECRET_KEY"] = "testes-" + "x" * 32
+os.environ["ADMIN_API_KEY"] = "testes"
+os.environ["DB_ASYNC"] = "false"
+os.environ["SHARED_PROFILES_DIR"] = ""
+os.environ["STARTUP_WARMUP"] = "false"
+os.environ["RECENCY_MODE"] = "none"
+# sem jobs em segundo plano: cada teste monta o que precisa
+os.environ["CF_REFRESH_SECONDS"] = "0"
+os.environ["RANKINGS_REFRESH_SECONDS"] = "0"
+os.environ["SHARED_PROFILES_REFRESH_SECONDS"] = "0"
+os.environ["BCRYPT_WORKERS"] = "1"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+import db_migrations
+import models
+import password_pool
+import seed
+from constants.features import FEATURE_NAMES
+from scoring import weighted_euclidean_similarity
+from database import SessionLocal
+
+
+MATRICULA, SENHA = "2110001", "puc123"  # aluno da simulação (seed.py)
+ADMIN = {"X-Admin-Key": os.environ["ADMIN_API_KEY"]}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def banco():
+    db_migrations.upgrade()
+    db = SessionLocal()
+    try:
+        seed.seed(db, progresso=lambda *_: None)
+    finally:
+        db.close()
+    yield os.environ["DATABASE_URL"]
+    password_pool.shutdown()
+    shutil.rmtree(_DIRETORIO, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def cliente(banco):
+    from main import app
+
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def db(banco):
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.rollback()
+        sessao.close()
+
+
+def login(cliente, matricula: str, senha: str) -> dict:
+    resposta = cliente.post("/login", json={"matricula": matricula, "senha": senha})
+    assert resposta.status_code == 200, resposta.text
+    return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def headers(cliente):
+    """Login do aluno da simulação (com perfil de preferências salvo)."""
+    headers = login(cliente, MATRICULA, SENHA)
+    perfil = {
+        "curso": "Engenharia de Software", "periodo": "5",
+        "formaLecionar": "Teórica", "formaAvaliar": "Provas", "ritmoAula": "Moderado", "incentivo": "Sim",
+        "formaLecionarImportancia": 5, "formaAvaliarImportancia": 4,
+        "ritmoAulaImportancia": 3, "incentivoImportancia": 6,
+    }
+    assert cliente.post("/aluno/me/perfil", json=perfil, headers=headers).status_code == 200
+    return headers
+
+
+def perfis_materializados(db) -> list:
+    """
+    perfis_professores e perfis_professores_semestre inteiras, sem as linhas
+    zeradas (os deltas deixam; o rebuild não cria), para comparar com o rebuild.
+    """
+    resultado = []
+    for modelo in (models.PerfilProfessor, models.PerfilProfessorSemestre):
+        tabela = modelo.__table__
+        linhas = db.execute(
+            select(tabela).where(tabela.c.total_avaliacoes != 0).order_by(*tabela.primary_key.columns)
+        ).all()
+        resultado.append([tuple(linha) for linha in linhas])
+    return resultado
+
+
+def medias_referencia(db, disciplina_id: int, peso=lambda semestre: 1.0) -> list[tuple]:
+    """
+    (id_professor, nome, médias) dos professores da disciplina, somando as
+    avaliações linha a linha (como a consulta original, sem os perfis
+    materializados); 'peso' dá o peso de cada avaliação pelo semestre.
+    """
+    linhas = db.execute(
+        select(
+            models.Professor.id_professor, models.Professor.nome, models.Avaliacao.semestre,
+            *[getattr(models.Avaliacao, feature) for feature in FEATURE_NAMES],
+        )
+        .join(models.Turma, models.Turma.professor_id == models.Professor.id_professor)
+        .join(models.Avaliacao, models.Avaliacao.turma_id == models.Turma.id_turma)
+        .where(models.Turma.disciplina_id == disciplina_id)
+    ).all()
+
+    somas = {}
+    for id_professor, nome, semestre, *notas in linhas:
+        w = peso(semestre)
+        _, soma, total = somas.setdefault(id_professor, (nome, np.zeros(len(FEATURE_NAMES)), [0.0]))
+        soma += w * np.array(notas, dtype=np.float64)
+        total[0] += w
+    return [
+        (id_professor, nome, soma / total[0])
+        for id_professor, (nome, soma, total) in sorted(somas.items())
+        if total[0] > 0
+    ]
+
+
+def ranking_referencia(aluno_vector, medias: list[tuple]) -> list[dict]:
+    """O laço original de /aluno/recomendacoes: uma similaridade por professor e sorted(reverse=True)."""
+    aluno_vector = np.array(aluno_vector)
+    resultados = []
+    for id_professor, nome, prof_vector in medias:
+        similaridade = weighted_euclidean_similarity(aluno_vector, prof_vector, aluno_vector.copy())
+        resultados.append({
+            "id_professor": id_professor, "nome": nome,
+            "similaridade": similaridade, "estrelas": similaridade * 5,
+        })
+    return sorted(resultados, key=lambda p: p["similaridade"], reverse=True)
+
+
+def vetor_referencia(db, aluno_id: int) -> list[int]:
+    """Pesos do aluno pelas tabelas normalizadas, como a rota original montava o vetor."""
+    linhas = db.execute(
+        select(models.OpcaoPreferencia.coluna_mapeada, models.PreferenciaAluno.peso)
+        .join(models.PreferenciaAluno, models.PreferenciaAluno.opcao_id == models.OpcaoPreferencia.id_opcao)
+        .join(models.PerfilPreferencias, models.PerfilPreferencias.id_perfil == models.PreferenciaAluno.perfil_id)
+        .where(models.PerfilPreferencias.aluno_id == aluno_id)
+    ).all()
+    preferencias = dict(linhas)
+    return [preferencias.get(feature, 0) for feature in FEATURE_NAMES]
+
+
+_sequencia = itertools.count(1)
+
+
+class Fabrica:
+    """Cria linhas de teste com nomes únicos (o banco é compartilhado pela sessão)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _n(self) -> int:
+        return next(_sequencia)
+
+    def aluno(self, hashed_password: str = "x") -> models.Aluno:
+        n = self._n()
+        aluno = models.Aluno(matricula=f"teste-{n}", nome=f"Aluno Teste {n}", hashed_password=hashed_password)
+        self.db.add(aluno)
+        self.db.flush()
+        return aluno
+
+    def professor(self) -> models.Professor:
+        professor = models.Professor(nome=f"Prof. Teste {self._n()}")
+        self.db.add(professor)
+        self.db.flush()
+        return professor
+
+    def disciplina(self) -> models.Disciplina:
+        disciplina = models.Disciplina(nome=f"Disciplina Teste {self._n()}")
+        self.db.add(disciplina)
+        self.db.flush()
+        return disciplina
+
+    def turma(self, professor, disciplina, semestre: str = "2024.1") -> models.Turma:
+        turma = models.Turma(
+            nome_turma=f"T{self._n()}", semestre=semestre,
+            professor_id=professor.id_professor, disciplina_id=disciplina.id_disciplina,
+        )
+        self.db.add(turma)
+        self.db.flush()
+        return turma
+
+    def avaliacao(self, aluno, turma, notas, semestre: str | None = None) -> models.Avaliacao:
+        avaliacao = models.Avaliacao(
+            aluno_id=aluno.id_aluno, turma_id=turma.id_turma,
+            semestre=semestre or turma.semestre, **dict(zip(FEATURE_NAMES, notas)),
+        )
+        self.db.add(avaliacao)
+        self.db.flush()
+        return avaliacao
+
+
+@pytest.fixture
+def fabrica(db):
+    return Fabrica(db)
@@ -0,0 +1,36 @@
+"""
+Montagem da aplicação (main.py): main:app só é criada quando pedida, e os
+jobs em segundo plano registram as falhas no log em vez de parar.
+"""
+import asyncio
+import logging
+import pytest
+import main
+
+
+def test_app_e_montada_uma_vez_so_quando_pedida(monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(main, "_app", None)
+    monkeypatch.setattr(main, "create_app", lambda: chamadas.append(1) or object())
+
+    assert chamadas == []
+    assert main.app is main.app
+    assert chamadas == [1]
+
+
+def test_falha_no_job_vai_para_o_log_e_o_job_continua(caplog):
+    chamadas = []
+
+    def funcao():
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            raise RuntimeError("banco fora")
+        raise asyncio.CancelledError
+
+    with caplog.at_level(logging.ERROR, logger=main.__name__):
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(main._job(funcao, 0, "testar o job"))
+
+    assert len(chamadas) == 2
+    assert "Erro ao testar o job" in caplog.text
+    assert "RuntimeError: banco fora" in caplog.text
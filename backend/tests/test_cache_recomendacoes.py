@@ -0,0 +1,97 @@
+"""
+Invalidação por versão do RecommendationCache e integração com os eventos
+de avaliações e do perfil do aluno.
+"""
+import recommendation_cache
+from recommendation_cache import RecommendationCache
+
+
+def test_versao_nova_invalida_so_a_chave():
+    cache = RecommendationCache(max_entries=10, ttl_seconds=60)
+    for aluno_id, disciplina_id in [(1, 1), (1, 2), (2, 1)]:
+        cache.set(aluno_id, disciplina_id, f"{aluno_id}/{disciplina_id}", cache.versao(aluno_id, disciplina_id))
+
+    cache.invalidate_disciplina(1)
+    assert cache.get(1, 1) is None
+    assert cache.get(2, 1) is None
+    assert cache.get(1, 2) == "1/2"
+
+    cache.invalidate_aluno(1)
+    assert cache.get(1, 2) is None
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_calculo_em_andamento_nao_grava_resultado_antigo():
+    cache = RecommendationCache(max_entries=10, ttl_seconds=60)
+    versao = cache.versao(1, 1)
+    cache.invalidate_disciplina(1)  # avaliação nova enquanto calculava
+    cache.set(1, 1, "antigo", versao)
+    assert cache.get(1, 1) is None
+
+    versao = cache.versao(1, 1)
+    cache.clear()
+    cache.set(1, 1, "antigo", versao)
+    assert cache.get(1, 1) is None
+
+
+def test_podar_as_versoes_nunca_volta_a_uma_versao_antiga():
+    cache = RecommendationCache(max_entries=2, ttl_seconds=60)
+    versao = cache.versao(1, 1)
+    cache.invalidate_disciplina(1)
+    # empurra a disciplina 1 para fora do mapa de versões
+    for disciplina_id in range(2, 6):
+        cache.invalidate_disciplina(disciplina_id)
+    cache.set(1, 1, "antigo", versao)
+    assert cache.get(1, 1) is None
+    assert len(cache._versao_disciplina) <= 2
+
+
+def test_ttl():
+    cache = RecommendationCache(max_entries=10, ttl_seconds=0)
+    cache.set(1, 1, "valor", cache.versao(1, 1))
+    assert cache.get(1, 1) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_avaliacao_nova_invalida_a_disciplina_depois_do_commit(db, fabrica):
+    cache = recommendation_cache.cache
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    db.commit()
+    disciplina_id = turma.disciplina_id
+    cache.set(-1, disciplina_id, ["em cache"], cache.versao(-1, disciplina_id))
+
+    fabrica.avaliacao(fabrica.aluno(), turma, [1] * 7)
+    assert cache.get(-1, disciplina_id) == ["em cache"]  # antes do commit nada muda
+    db.commit()
+    assert cache.get(-1, disciplina_id) is None
+
+
+def test_rollback_nao_invalida(db, fabrica):
+    cache = recommendation_cache.cache
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    db.commit()
+    disciplina_id = turma.disciplina_id
+    cache.set(-1, disciplina_id, ["em cache"], cache.versao(-1, disciplina_id))
+
+    fabrica.avaliacao(fabrica.aluno(), turma, [1] * 7)
+    db.rollback()
+    assert cache.get(-1, disciplina_id) == ["em cache"]
+
+
+def test_rota_usa_o_cache_e_salvar_o_perfil_invalida(cliente, headers):
+    cache = recommendation_cache.cache
+    primeira = cliente.get("/aluno/recomendacoes?disciplina_id=1", headers=headers).json()
+    hits = cache.stats()["hits"]
+    assert cliente.get("/aluno/recomendacoes?disciplina_id=1", headers=headers).json() == primeira
+    assert cache.stats()["hits"] == hits + 1
+
+    formulario = {
+        "curso": "Engenharia de Software", "periodo": "5",
+        "formaLecionar": "Prática", "formaAvaliar": "Trabalhos", "ritmoAula": "Moderado", "incentivo": "Sim",
+        "formaLecionarImportancia": 1, "formaAvaliarImportancia": 7,
+        "ritmoAulaImportancia": 2, "incentivoImportancia": 0,
+    }
+    assert cliente.post("/aluno/me/perfil", json=formulario, headers=headers).status_code == 200
+    misses = cache.stats()["misses"]
+    cliente.get("/aluno/recomendacoes?disciplina_id=1", headers=headers)
+    assert cache.stats()["misses"] == misses + 1
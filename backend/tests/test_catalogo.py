@@ -0,0 +1,50 @@
+"""
+Snapshot do catálogo (catalog.py): ETag, 304 com If-None-Match e
+invalidação quando o catálogo muda pelo ORM.
+"""
+import catalog
+import models
+
+
+def test_etag_e_304(cliente, headers):
+    for rota in ("/aluno/disciplinas", "/aluno/catalogo"):
+        resposta = cliente.get(rota, headers=headers)
+        assert resposta.status_code == 200
+        etag = resposta.headers["etag"]
+        assert resposta.headers["cache-control"].startswith("private")
+
+        for if_none_match in (etag, f"W/{etag}", f'"outro", {etag}', "*"):
+            nao_modificado = cliente.get(rota, headers={**headers, "If-None-Match": if_none_match})
+            assert nao_modificado.status_code == 304
+            assert nao_modificado.content == b""
+            assert nao_modificado.headers["etag"] == etag
+
+        assert cliente.get(rota, headers={**headers, "If-None-Match": '"outro"'}).status_code == 200
+
+
+def test_etag_e_o_hash_do_conteudo(cliente, headers):
+    primeira = cliente.get("/aluno/catalogo", headers=headers)
+    catalog.invalidate()
+    segunda = cliente.get("/aluno/catalogo", headers=headers)
+    assert segunda.headers["etag"] == primeira.headers["etag"]
+    assert segunda.content == primeira.content
+
+
+def test_alterar_o_catalogo_troca_o_etag(cliente, headers, db, fabrica):
+    antes = cliente.get("/aluno/disciplinas", headers=headers)
+    disciplina = fabrica.disciplina()
+    db.commit()
+
+    depois = cliente.get("/aluno/disciplinas", headers={**headers, "If-None-Match": antes.headers["etag"]})
+    assert depois.status_code == 200
+    assert depois.headers["etag"] != antes.headers["etag"]
+    assert disciplina.id_disciplina in [d["id_disciplina"] for d in depois.json()]
+
+
+def test_rollback_mantem_o_snapshot(cliente, headers, db):
+    cliente.get("/aluno/disciplinas", headers=headers)
+    snapshot = catalog.snapshot_atual()
+    db.add(models.Curso(nome="Curso Descartado"))
+    db.flush()
+    db.rollback()
+    assert catalog.snapshot_atual() is snapshot
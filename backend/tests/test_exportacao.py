@@ -0,0 +1,107 @@
+"""
+Exportação em streaming (export.py): NDJSON, CSV e Parquet em vários blocos
+trazem as mesmas linhas, e as médias e similaridades são as do cálculo
+linha a linha.
+"""
+import csv
+import io
+import json
+import numpy as np
+import pytest
+import crud
+import export
+from conftest import ADMIN, medias_referencia, vetor_referencia
+from constants.features import FEATURE_NAMES
+from scoring import weighted_euclidean_similarity
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture(autouse=True)
+def blocos_pequenos(monkeypatch):
+    # vários blocos mesmo com o banco de teste
+    monkeypatch.setattr(export, "LINHAS_POR_BLOCO", 2)
+    monkeypatch.setattr(export, "ALUNOS_POR_BLOCO", 2)
+    monkeypatch.setattr(export, "PROFESSORES_POR_BLOCO", 3)
+
+
+@pytest.fixture(autouse=True)
+def professores(db, fabrica):
+    disciplina = fabrica.disciplina()
+    for n in range(4):
+        turma = fabrica.turma(fabrica.professor(), disciplina)
+        fabrica.avaliacao(fabrica.aluno(), turma, [(n + i) % 8 for i in range(7)])
+        fabrica.avaliacao(fabrica.aluno(), turma, [(n * i) % 8 for i in range(7)], semestre="2023.2")
+    db.commit()
+
+
+def _ler(dados: bytes, formato: str) -> list[dict]:
+    if formato == "ndjson":
+        return [json.loads(linha) for linha in dados.decode("utf-8").splitlines()]
+    if formato == "csv":
+        return list(csv.DictReader(io.StringIO(dados.decode("utf-8"))))
+    return pq.read_table(io.BytesIO(dados)).to_pylist()
+
+
+def _exportar(db, gerar_blocos, colunas, formato, filtros=export.Filtros()) -> list[dict]:
+    dados = b"".join(export.serializar(gerar_blocos(db, filtros), colunas, formato))
+    return _ler(dados, formato)
+
+
+def _numeros(linhas: list[dict], colunas) -> list[tuple]:
+    """Linhas como tuplas de números (o CSV traz tudo como texto)."""
+    return [tuple(float(linha[coluna]) for coluna in colunas) for linha in linhas]
+
+
+def _disciplinas(db) -> list[int]:
+    return [d.id_disciplina for d in crud.get_disciplinas(db) if medias_referencia(db, d.id_disciplina)]
+
+
+@pytest.mark.parametrize("formato", export.FORMATOS)
+def test_professores_iguais_as_avaliacoes(db, formato):
+    linhas = _exportar(db, export.professores, export.COLUNAS_PROFESSORES, formato)
+    assert list(linhas[0]) == export.COLUNAS_PROFESSORES
+
+    colunas = ["disciplina_id", "professor_id", *[f"avg_{feature}" for feature in FEATURE_NAMES]]
+    referencia = [
+        (disciplina_id, id_professor, *medias)
+        for disciplina_id in _disciplinas(db)
+        for id_professor, _, medias in medias_referencia(db, disciplina_id)
+    ]
+    assert _numeros(linhas, colunas) == [tuple(map(float, linha)) for linha in referencia]
+
+
+@pytest.mark.parametrize("formato", export.FORMATOS)
+def test_similaridades_iguais_ao_laco(db, headers, formato):
+    disciplina_id = _disciplinas(db)[-1]
+    linhas = _exportar(
+        db, export.similaridades, export.COLUNAS_SIMILARIDADES, formato, export.Filtros(disciplina_id=disciplina_id)
+    )
+
+    # alunos sem perfil ficam de fora
+    referencia = []
+    for aluno_id, _ in crud.iter_vetores_preferencias(db):
+        aluno = np.array(vetor_referencia(db, aluno_id))
+        for id_professor, _, medias in medias_referencia(db, disciplina_id):
+            similaridade = weighted_euclidean_similarity(aluno, medias, aluno)
+            referencia.append((aluno_id, disciplina_id, id_professor, similaridade, similaridade * 5))
+    assert sorted(_numeros(linhas, export.COLUNAS_SIMILARIDADES)) == sorted(referencia)
+
+
+def test_csv_tem_um_cabecalho_so_e_parquet_um_row_group_por_bloco(db):
+    blocos = list(export.professores(db, export.Filtros()))
+    assert len(blocos) > 1
+
+    dados = b"".join(export.serializar(iter(blocos), export.COLUNAS_PROFESSORES, "csv")).decode("utf-8")
+    assert dados.count("disciplina_id,") == 1
+
+    dados = b"".join(export.serializar(iter(blocos), export.COLUNAS_PROFESSORES, "parquet"))
+    assert pq.ParquetFile(io.BytesIO(dados)).num_row_groups == len(blocos)
+
+
+def test_rota_em_streaming(cliente, db):
+    resposta = cliente.get("/admin/export/professores?formato=csv", headers=ADMIN)
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/csv")
+    assert _ler(resposta.content, "csv") == _exportar(db, export.professores, export.COLUNAS_PROFESSORES, "csv")
+    assert cliente.get("/admin/export/professores?formato=xlsx", headers=ADMIN).status_code == 400
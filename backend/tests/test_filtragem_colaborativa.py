@@ -0,0 +1,110 @@
+"""
+Motor colaborativo (collaborative_filtering.py): a mistura com as notas dos
+vizinhos e a volta ao motor de conteúdo quando não há modelo ou vizinhos.
+"""
+import numpy as np
+import pytest
+import collaborative_filtering
+import crud
+import scoring
+from collaborative_filtering import MotorColaborativo
+
+
+def _linhas(db, disciplina_id):
+    linhas = crud.get_professores_avg_ratings_by_disciplinas(db, [disciplina_id])
+    return linhas, scoring.ratings_matrix(linhas)
+
+
+def test_sem_modelo_devolve_as_medias(db):
+    linhas, matriz = _linhas(db, 1)
+    assert MotorColaborativo(3600).misturar(1, linhas, matriz) is matriz
+
+
+def test_aluno_sem_vizinhos_devolve_as_medias(db, fabrica):
+    sem_avaliacoes = fabrica.aluno()
+    db.commit()
+    motor = MotorColaborativo(3600)
+    motor.atualizar(db)
+    linhas, matriz = _linhas(db, 1)
+    assert motor.misturar(sem_avaliacoes.id_aluno, linhas, matriz) is matriz
+
+
+def test_vizinho_puxa_o_perfil_para_as_notas_dele(db, fabrica):
+    professores = [fabrica.professor(), fabrica.professor()]
+    disciplina = fabrica.disciplina()
+    turmas = [fabrica.turma(professor, disciplina) for professor in professores]
+    aluno, vizinho, outro = fabrica.aluno(), fabrica.aluno(), fabrica.aluno()
+    # aluno e vizinho avaliaram igual o primeiro professor; só o vizinho e um terceiro, o segundo
+    # (notas variadas: as linhas são centradas na média do aluno)
+    fabrica.avaliacao(aluno, turmas[0], [7, 1, 7, 1, 7, 1, 7])
+    fabrica.avaliacao(vizinho, turmas[0], [7, 1, 7, 1, 7, 1, 7])
+    fabrica.avaliacao(vizinho, turmas[1], [7] * 7)
+    fabrica.avaliacao(outro, turmas[1], [1] * 7)
+    db.commit()
+
+    motor = MotorColaborativo(3600)
+    motor.atualizar(db)
+    linhas, matriz = _linhas(db, disciplina.id_disciplina)
+    misturada = motor.misturar(aluno.id_aluno, linhas, matriz)
+
+    segundo = [linha.id_professor for linha in linhas].index(professores[1].id_professor)
+    assert (matriz[segundo] == 4).all()
+    assert (misturada[segundo] > matriz[segundo]).all()
+    assert (misturada[segundo] < 7).all()
+
+
+@pytest.fixture
+def motor_vazio(monkeypatch):
+    motor = MotorColaborativo(3600)
+    monkeypatch.setattr(collaborative_filtering, "motor", motor)
+    return motor
+
+
+def test_rota_colaborativa_sem_modelo_igual_ao_conteudo(cliente, headers, motor_vazio):
+    conteudo = cliente.get("/aluno/recomendacoes?disciplina_id=1", headers=headers)
+    colaborativo = cliente.get("/aluno/recomendacoes?disciplina_id=1&motor=colaborativo", headers=headers)
+    assert colaborativo.status_code == 200
+    assert colaborativo.json() == conteudo.json()
+
+
+def test_rota_colaborativa_sem_vizinhos_igual_ao_conteudo(cliente, headers, db, motor_vazio):
+    # o aluno da simulação não tem avaliações: nenhum vizinho
+    motor_vazio.atualizar(db)
+    conteudo = cliente.get("/aluno/recomendacoes?disciplina_id=1", headers=headers).json()
+    colaborativo = cliente.get("/aluno/recomendacoes?disciplina_id=1&motor=colaborativo", headers=headers).json()
+    assert [r["id_professor"] for r in colaborativo] == [r["id_professor"] for r in conteudo]
+    np.testing.assert_allclose(
+        [r["similaridade"] for r in colaborativo], [r["similaridade"] for r in conteudo]
+    )
+
+
+def _linhas_base(base):
+    return sorted(zip(base.aluno_ids.tolist(), base.turma_ids.tolist(), map(tuple, base.notas.tolist())))
+
+
+def test_releitura_parcial_igual_a_completa(db, fabrica):
+    motor = MotorColaborativo(3600)
+    motor.atualizar(db)
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    fabrica.avaliacao(fabrica.aluno(), turma, [2, 3, 4, 5, 6, 7, 1])
+    db.commit()
+
+    motor.marcar([turma.disciplina_id])
+    motor.atualizar(db)
+    assert motor.stats()["releituras_parciais"] == 1
+    assert _linhas_base(motor._modelo.base) == _linhas_base(collaborative_filtering._ler(db))
+
+
+def test_falha_na_atualizacao_mantem_as_marcadas(db, monkeypatch):
+    motor = MotorColaborativo(3600)
+    motor.atualizar(db)
+    motor.marcar([1])
+
+    def falha(*args):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(collaborative_filtering, "_ler", falha)
+    with pytest.raises(RuntimeError):
+        motor.atualizar(db)
+    assert motor.precisa_atualizar()
+    assert motor.stats()["disciplinas_pendentes"] == 1
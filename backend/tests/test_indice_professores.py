@@ -0,0 +1,103 @@
+"""
+Índice de professores (professor_index.py): top_k igual ao ranking por força
+bruta com weighted_euclidean_similarity (empates em ordem de disciplina e
+professor) e atualização incremental igual à reconstrução completa.
+"""
+import numpy as np
+import pytest
+import professor_index
+import scoring
+from professor_index import ProfessorIndex
+
+
+ALUNOS = [
+    np.array([5, 0, 4, 0, 0, 3, 6]),
+    np.array([7, 7, 7, 7, 7, 7, 7]),
+    np.array([0, 0, 0, 1, 0, 0, 0]),  # um peso só: muitos empates
+    np.array([0, 0, 0, 0, 0, 0, 0]),  # sem pesos: todos empatados em 0
+]
+
+
+def _forca_bruta(indice, aluno, k, curso_id=None, disciplina_id=None):
+    linhas = [
+        i for i in range(len(indice.disciplina_ids))
+        if (curso_id is None or indice.curso_ids[i] == curso_id)
+        and (disciplina_id is None or indice.disciplina_ids[i] == disciplina_id)
+    ]
+    pontuadas = [
+        (scoring.weighted_euclidean_similarity(aluno, indice.matriz[i], aluno), i) for i in linhas
+    ]
+    pontuadas.sort(key=lambda par: (-par[0], indice.disciplina_ids[par[1]], indice.professor_ids[par[1]]))
+    return [
+        (int(indice.disciplina_ids[i]), int(indice.professor_ids[i]), similaridade)
+        for similaridade, i in pontuadas[:k]
+    ]
+
+
+def _top_k(index, aluno, k, **filtros):
+    return [
+        (r["disciplina_id"], r["id_professor"], r["similaridade"])
+        for r in index.top_k(aluno, k, **filtros)
+    ]
+
+
+def _conteudo(indice):
+    return sorted(
+        zip(indice.disciplina_ids.tolist(), indice.professor_ids.tolist(),
+            indice.curso_ids.tolist(), map(tuple, indice.matriz.tolist()))
+    )
+
+
+@pytest.fixture
+def empatados(db, fabrica):
+    """Professores com perfis idênticos em disciplinas diferentes."""
+    aluno = fabrica.aluno()
+    for _ in range(3):
+        disciplina = fabrica.disciplina()
+        for _ in range(2):
+            fabrica.avaliacao(aluno, fabrica.turma(fabrica.professor(), disciplina), [4, 2, 6, 1, 3, 5, 7])
+    db.commit()
+
+
+def test_top_k_igual_a_forca_bruta(db, empatados):
+    index = ProfessorIndex(3600)
+    index.atualizar(db)
+    indice = index._indice
+    for aluno in ALUNOS:
+        for k in (1, 3, 10, len(indice.disciplina_ids) + 1):
+            assert _top_k(index, aluno, k) == _forca_bruta(indice, aluno, k)
+            assert _top_k(index, aluno, k, curso_id=1) == _forca_bruta(indice, aluno, k, curso_id=1)
+            assert _top_k(index, aluno, k, disciplina_id=1) == _forca_bruta(indice, aluno, k, disciplina_id=1)
+
+
+def test_atualizacao_incremental_igual_a_reconstrucao(db, fabrica):
+    index = ProfessorIndex(3600)
+    index.atualizar(db)
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    fabrica.avaliacao(fabrica.aluno(), turma, [1, 2, 3, 4, 5, 6, 7])
+    db.commit()
+
+    index.marcar([turma.disciplina_id, 1])
+    index.atualizar(db)
+    assert index.stats()["atualizacoes_incrementais"] == 1
+
+    completo = ProfessorIndex(3600)
+    completo.atualizar(db)
+    assert _conteudo(index._indice) == _conteudo(completo._indice)
+    for aluno in ALUNOS:
+        assert _top_k(index, aluno, 5) == _top_k(completo, aluno, 5)
+
+
+def test_falha_na_atualizacao_mantem_as_marcadas(db, monkeypatch):
+    index = ProfessorIndex(3600)
+    index.atualizar(db)
+    index.marcar([1])
+
+    def falha(*args):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(professor_index, "_ler", falha)
+    with pytest.raises(RuntimeError):
+        index.atualizar(db)
+    assert index.precisa_atualizar()
+    assert index.stats()["disciplinas_pendentes"] == 1
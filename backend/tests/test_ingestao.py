@@ -0,0 +1,108 @@
+"""
+Importação em lote de avaliações (ingestion.py): validação das linhas,
+limites do lote e gravação com o recálculo dos perfis.
+"""
+import json
+import pytest
+import ingestion
+import models
+import professor_profiles
+from conftest import ADMIN, perfis_materializados
+
+
+def _registro(**campos):
+    return {"aluno_id": 1, "turma_id": 1, "semestre": "2024.1", **{f: 4 for f in ingestion.FEATURE_NAMES}, **campos}
+
+
+def test_aceita_inteiros_e_texto_com_digitos():
+    linha = ingestion.validar(_registro(aluno_id=" 12 ", turma_id="3", slide="7", quadro=0))
+    assert linha[:5] == (12, 3, "2024.1", 7, 0)
+
+
+@pytest.mark.parametrize("valor", [4.7, 4.0, True, "4.0", "-1", "", None, "４", "1e1", 8, -1])
+def test_rejeita_nota_invalida(valor):
+    with pytest.raises(ValueError):
+        ingestion.validar(_registro(slide=valor))
+
+
+def test_rejeita_campo_ausente_e_semestre_invalido():
+    registro = _registro()
+    del registro["interacao"]
+    with pytest.raises(ValueError, match="interacao"):
+        ingestion.validar(registro)
+    with pytest.raises(ValueError):
+        ingestion.validar(_registro(semestre="  "))
+    with pytest.raises(ValueError):
+        ingestion.validar(_registro(semestre="x" * 21))
+
+
+@pytest.mark.parametrize("valor", [None, 2025, 2024.1])
+def test_rejeita_semestre_que_nao_e_texto(valor):
+    with pytest.raises(ValueError, match="semestre"):
+        ingestion.validar(_registro(semestre=valor))
+
+
+def test_semestre_nulo_e_linha_rejeitada(db, fabrica):
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    aluno = fabrica.aluno()
+    db.commit()
+
+    registro = _registro(aluno_id=aluno.id_aluno, turma_id=turma.id_turma, semestre=None)
+    resultado = ingestion.importar(db, [json.dumps(registro)], "ndjson", progresso=lambda _: None)
+    assert (resultado.gravadas, resultado.rejeitadas) == (0, 1)
+    assert "semestre" in resultado.erros[0]
+    assert db.get(models.PerfilProfessor, (turma.professor_id, turma.disciplina_id)) is None
+
+
+def test_cabecalho_csv_incompleto_aborta(db):
+    with pytest.raises(ValueError, match="cabeçalho"):
+        ingestion.importar(db, ["aluno_id,turma_id\n", "1,1\n"], "csv", progresso=lambda _: None)
+
+
+@pytest.mark.parametrize("tamanho_lote", [0, ingestion.TAMANHO_LOTE_MAXIMO + 1])
+def test_tamanho_do_lote_fora_do_limite(db, cliente, tamanho_lote):
+    with pytest.raises(ValueError):
+        ingestion.Importacao(db, "csv", tamanho_lote)
+    resposta = cliente.post(
+        f"/admin/avaliacoes/importar?formato=csv&tamanho_lote={tamanho_lote}", content=b"", headers=ADMIN
+    )
+    assert resposta.status_code == 422
+
+
+def test_importa_csv_em_lotes_e_recalcula_os_perfis(db, fabrica):
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    alunos = [fabrica.aluno() for _ in range(3)]
+    db.commit()
+
+    cabecalho = ",".join(ingestion.COLUNAS)
+    linhas = [cabecalho] + [
+        f"{aluno.id_aluno},{turma.id_turma},2024.1," + ",".join(str((aluno.id_aluno + i) % 8) for i in range(7))
+        for aluno in alunos
+    ] + [
+        f"{alunos[0].id_aluno},{turma.id_turma},2024.1,4.5,1,1,1,1,1,1",  # nota inválida
+        f"999999,{turma.id_turma},2024.1,1,1,1,1,1,1,1",                  # aluno inexistente
+    ]
+    resultado = ingestion.importar(db, linhas, "csv", tamanho_lote=2, progresso=lambda _: None)
+
+    assert (resultado.recebidas, resultado.gravadas, resultado.rejeitadas) == (5, 3, 2)
+    assert resultado.lotes == 2
+    perfil = db.get(models.PerfilProfessor, (turma.professor_id, turma.disciplina_id))
+    assert perfil.total_avaliacoes == 3
+
+    incremental = perfis_materializados(db)
+    professor_profiles.rebuild(db)
+    assert perfis_materializados(db) == incremental
+
+
+def test_reimportar_atualiza_a_avaliacao(db, fabrica):
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    aluno = fabrica.aluno()
+    db.commit()
+
+    for nota in (2, 6):
+        registro = _registro(aluno_id=aluno.id_aluno, turma_id=turma.id_turma, slide=nota)
+        ingestion.importar(db, [json.dumps(registro)], "ndjson", progresso=lambda _: None)
+
+    perfil = db.get(models.PerfilProfessor, (turma.professor_id, turma.disciplina_id))
+    db.refresh(perfil)
+    assert (perfil.total_avaliacoes, perfil.soma_slide) == (1, 6)
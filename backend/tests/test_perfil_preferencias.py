@@ -0,0 +1,119 @@
+"""
+Upsert do perfil de preferências (crud.create_or_update_aluno_perfil) contra
+a versão original, que apagava e recriava as preferências: mesmos pesos em
+preferencias_aluno e a cópia compacta (vetor_pesos) igual a eles.
+"""
+import pytest
+from sqlalchemy import select
+import crud
+import models
+import recommendation_cache
+import schemas
+import scoring
+from conftest import vetor_referencia
+
+PERFIS = [
+    ("Teórica", "Provas", 5, 4, 3, 6),
+    ("Teórica", "Provas", 5, 4, 3, 6),      # igual: nada muda
+    ("Prática", "Provas", 7, 4, 3, 6),      # troca slide por quadro
+    ("Prática", "Projetos", 7, 1, 0, 6),
+    ("Outra", "Outra", 2, 2, 7, 0),         # sem metodologia nem avaliação
+    ("Teórica", "Trabalhos", 0, 3, 1, 1),
+]
+
+
+def _perfil(forma_lecionar, forma_avaliar, lecionar, avaliar, ritmo, incentivo) -> schemas.PerfilFrontend:
+    return schemas.PerfilFrontend(
+        curso="Engenharia de Software", periodo="5",
+        formaLecionar=forma_lecionar, formaAvaliar=forma_avaliar, ritmoAula="Moderado", incentivo="Sim",
+        formaLecionarImportancia=lecionar, formaAvaliarImportancia=avaliar,
+        ritmoAulaImportancia=ritmo, incentivoImportancia=incentivo,
+    )
+
+
+def _salvar_original(db, aluno, perfil_data, opcoes_map):
+    """A implementação original: apaga as preferências e insere todas de novo."""
+    if not aluno.perfil_preferencias:
+        perfil_db = models.PerfilPreferencias(aluno=aluno)
+        db.add(perfil_db)
+        db.flush()
+    else:
+        perfil_db = aluno.perfil_preferencias
+        db.query(models.PreferenciaAluno).filter_by(perfil_id=perfil_db.id_perfil).delete()
+
+    vetor_final = {"slide": 0, "quadro": 0}
+    if perfil_data.formaLecionar == "Teórica":
+        vetor_final["slide"] = perfil_data.formaLecionarImportancia
+    elif perfil_data.formaLecionar == "Prática":
+        vetor_final["quadro"] = perfil_data.formaLecionarImportancia
+    vetor_final |= {"provas": 0, "trabalhos": 0, "projetos": 0}
+    coluna_avaliar = {"Provas": "provas", "Trabalhos": "trabalhos", "Projetos": "projetos"}.get(perfil_data.formaAvaliar)
+    if coluna_avaliar:
+        vetor_final[coluna_avaliar] = perfil_data.formaAvaliarImportancia
+    vetor_final["velocidade_aula"] = perfil_data.ritmoAulaImportancia
+    vetor_final["interacao"] = perfil_data.incentivoImportancia
+
+    db.add_all([
+        models.PreferenciaAluno(perfil_id=perfil_db.id_perfil, opcao_id=opcoes_map[nome], peso=peso)
+        for nome, peso in vetor_final.items() if nome in opcoes_map
+    ])
+    db.commit()
+
+
+def _preferencias(db, aluno_id) -> dict:
+    """{opcao_id: (id_preferencia, peso)}"""
+    linhas = db.execute(
+        select(models.PreferenciaAluno.opcao_id, models.PreferenciaAluno.id_preferencia, models.PreferenciaAluno.peso)
+        .join(models.PerfilPreferencias)
+        .where(models.PerfilPreferencias.aluno_id == aluno_id)
+    ).all()
+    return {opcao_id: (id_preferencia, peso) for opcao_id, id_preferencia, peso in linhas}
+
+
+def test_upsert_igual_ao_original(db, fabrica):
+    opcoes_map = crud.get_opcoes_dict(db)
+    novo, original = fabrica.aluno(), fabrica.aluno()
+    db.commit()
+
+    for campos in PERFIS:
+        antes = _preferencias(db, novo.id_aluno)
+        crud.create_or_update_aluno_perfil(db, novo.id_aluno, _perfil(*campos), opcoes_map)
+        _salvar_original(db, original, _perfil(*campos), opcoes_map)
+
+        depois = _preferencias(db, novo.id_aluno)
+        assert {o: peso for o, (_, peso) in depois.items()} == {
+            o: peso for o, (_, peso) in _preferencias(db, original.id_aluno).items()
+        }
+        # só os pesos alterados são regravados: as demais linhas continuam as mesmas
+        for opcao_id, (id_preferencia, peso) in antes.items():
+            if depois[opcao_id][1] == peso:
+                assert depois[opcao_id][0] == id_preferencia
+
+        vetor = vetor_referencia(db, original.id_aluno)
+        assert crud.get_vetor_pesos(db, novo.id_aluno) == scoring.empacotar_vetor(vetor)
+        assert scoring.desempacotar_vetor(crud.get_vetor_pesos(db, novo.id_aluno)).tolist() == vetor
+
+
+def test_perfil_sem_copia_compacta_ganha_a_copia(db, fabrica):
+    opcoes_map = crud.get_opcoes_dict(db)
+    aluno = fabrica.aluno()
+    db.commit()
+    _salvar_original(db, aluno, _perfil(*PERFIS[0]), opcoes_map)
+    assert crud.get_vetor_pesos(db, aluno.id_aluno) is None
+
+    # mesmos pesos: nada a regravar em preferencias_aluno, mas a cópia é criada
+    crud.create_or_update_aluno_perfil(db, aluno.id_aluno, _perfil(*PERFIS[0]), opcoes_map)
+    assert crud.get_vetor_pesos(db, aluno.id_aluno) == scoring.empacotar_vetor(vetor_referencia(db, aluno.id_aluno))
+
+
+@pytest.mark.parametrize("campos, invalida", [(PERFIS[0], False), (PERFIS[2], True)])
+def test_cache_so_e_invalidado_quando_os_pesos_mudam(db, fabrica, campos, invalida):
+    opcoes_map = crud.get_opcoes_dict(db)
+    aluno = fabrica.aluno()
+    db.commit()
+    crud.create_or_update_aluno_perfil(db, aluno.id_aluno, _perfil(*PERFIS[0]), opcoes_map)
+
+    cache = recommendation_cache.cache
+    cache.set(aluno.id_aluno, 1, [], cache.versao(aluno.id_aluno, 1))
+    crud.create_or_update_aluno_perfil(db, aluno.id_aluno, _perfil(*campos), opcoes_map)
+    assert (cache.get(aluno.id_aluno, 1) is None) == invalida
@@ -0,0 +1,115 @@
+"""
+Arquivo de perfis compartilhados entre workers (shared_profiles.py): formato,
+ida e volta contra o banco e verificação das versões por disciplina.
+"""
+import os
+import numpy as np
+import pytest
+from sqlalchemy import select
+import crud
+import models
+import scoring
+import shared_profiles
+
+
+@pytest.fixture
+def diretorio(tmp_path):
+    return str(tmp_path)
+
+
+def _store(db, diretorio) -> shared_profiles.PerfisCompartilhados:
+    shared_profiles.publicar(db, diretorio)
+    store = shared_profiles.PerfisCompartilhados(diretorio, 0)
+    store.verificar(db)
+    return store
+
+
+def test_cabecalho_e_secoes(db, diretorio):
+    nome = shared_profiles.publicar(db, diretorio)
+    with open(os.path.join(diretorio, shared_profiles.PONTEIRO)) as f:
+        assert f.read() == nome
+
+    geracao = shared_profiles._Geracao(os.path.join(diretorio, nome))
+    magia, _, _, features, linhas, disciplinas, _ = shared_profiles.CABECALHO.unpack_from(geracao._mapa, 0)
+    assert magia == shared_profiles.MAGIA
+    assert features == len(shared_profiles.FEATURE_NAMES)
+    assert geracao.tamanho == os.path.getsize(os.path.join(diretorio, nome))
+
+    ids = db.execute(select(models.Disciplina.id_disciplina).order_by(models.Disciplina.id_disciplina)).scalars().all()
+    assert geracao.disciplinas.tolist() == ids
+    assert len(geracao.versoes) == disciplinas == len(ids)
+    assert geracao.inicios[0] == 0 and geracao.inicios[-1] == linhas
+    assert (np.diff(geracao.inicios) >= 0).all()
+
+
+def test_formato_desconhecido_e_recusado(diretorio):
+    caminho = os.path.join(diretorio, "perfis-1.bin")
+    with open(caminho, "wb") as f:
+        f.write(b"XXXXXXXX" + bytes(shared_profiles.CABECALHO.size))
+    with pytest.raises(ValueError):
+        shared_profiles._Geracao(caminho)
+
+
+def test_fatias_iguais_ao_banco(db, diretorio, fabrica):
+    vazia = fabrica.disciplina()  # sem professores: fatia vazia, não ausente
+    db.commit()
+    store = _store(db, diretorio)
+
+    ids = db.execute(select(models.Disciplina.id_disciplina)).scalars().all()
+    fatias = store.fatias(ids)
+    assert set(fatias) == set(ids)
+    assert len(fatias[vazia.id_disciplina].professor_ids) == 0
+
+    aluno = np.array([5, 0, 4, 0, 0, 3, 6])
+    for disciplina_id in ids:
+        linhas = crud.get_professores_avg_ratings_by_disciplina(db, disciplina_id)
+        fatia = fatias[disciplina_id]
+        assert fatia.professor_ids.tolist() == [linha.id_professor for linha in linhas]
+        assert fatia.nomes == [linha.nome for linha in linhas]
+        np.testing.assert_array_equal(fatia.matriz, scoring.ratings_matrix(linhas).reshape(-1, 7))
+        assert fatia.rank(aluno, aluno) == (scoring.rank_professores(aluno, linhas, aluno) if linhas else [])
+
+
+def test_geracao_nao_verificada_nao_e_usada(db, diretorio):
+    shared_profiles.publicar(db, diretorio)
+    store = shared_profiles.PerfisCompartilhados(diretorio, 0)
+    assert store.fatias([1]) == {}
+    store.verificar(db)
+    assert 1 in store.fatias([1])
+
+
+def test_alteracao_em_outro_processo_vai_ao_banco_ate_a_proxima_geracao(db, diretorio, fabrica):
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina())
+    db.commit()
+    disciplina_id = turma.disciplina_id
+    store = _store(db, diretorio)
+    assert disciplina_id in store.fatias([disciplina_id])
+
+    # este store não está em ao_alterar_perfis: só vê a alteração pela versão no banco
+    fabrica.avaliacao(fabrica.aluno(), turma, [3] * 7)
+    db.commit()
+    assert disciplina_id in store.fatias([disciplina_id])
+    store.verificar(db)
+    assert disciplina_id not in store.fatias([disciplina_id])
+    assert store.stats()["disciplinas_desatualizadas"] == 1
+
+    shared_profiles.publicar(db, diretorio)
+    store.verificar(db)
+    fatia = store.fatias([disciplina_id])[disciplina_id]
+    assert fatia.professor_ids.tolist() == [turma.professor_id]
+
+
+def test_disciplina_criada_depois_da_publicacao_vai_ao_banco(db, diretorio, fabrica):
+    store = _store(db, diretorio)
+    nova = fabrica.disciplina()
+    db.commit()
+    store.verificar(db)
+    assert nova.id_disciplina not in store.fatias([nova.id_disciplina])
+
+
+def test_marcar_no_proprio_processo_vale_na_hora(db, diretorio):
+    store = _store(db, diretorio)
+    store.marcar([1])
+    assert 1 not in store.fatias([1])
+    store.marcar(None)
+    assert store.fatias([2]) == {}
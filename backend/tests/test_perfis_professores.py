@@ -0,0 +1,85 @@
+"""
+Manutenção incremental de perfis_professores / perfis_professores_semestre
+(professor_profiles.py): depois de cada alteração pelo ORM as tabelas têm
+que ser iguais ao rebuild completo a partir de avaliacoes.
+"""
+import models
+import professor_profiles
+from conftest import perfis_materializados
+
+
+def _confere_com_rebuild(db):
+    db.commit()
+    incremental = perfis_materializados(db)
+    professor_profiles.rebuild(db)
+    assert perfis_materializados(db) == incremental
+
+
+def _cenario(fabrica):
+    professores = [fabrica.professor(), fabrica.professor()]
+    disciplinas = [fabrica.disciplina(), fabrica.disciplina()]
+    turma = fabrica.turma(professores[0], disciplinas[0], "2024.1")
+    alunos = [fabrica.aluno() for _ in range(3)]
+    avaliacoes = [
+        fabrica.avaliacao(alunos[0], turma, [7, 1, 2, 3, 4, 5, 6]),
+        fabrica.avaliacao(alunos[1], turma, [0, 7, 7, 1, 1, 2, 2], semestre="2023.2"),
+        fabrica.avaliacao(alunos[2], turma, [3, 3, 3, 3, 3, 3, 3]),
+    ]
+    return professores, disciplinas, turma, avaliacoes
+
+
+def test_insercao(db, fabrica):
+    _cenario(fabrica)
+    _confere_com_rebuild(db)
+
+
+def test_atualizacao_de_notas_semestre_e_turma(db, fabrica):
+    professores, disciplinas, turma, avaliacoes = _cenario(fabrica)
+    outra = fabrica.turma(professores[1], disciplinas[1], "2024.2")
+    db.commit()
+
+    avaliacoes[0].slide = 0
+    avaliacoes[1].semestre = "2024.1"
+    avaliacoes[2].turma_id = outra.id_turma
+    _confere_com_rebuild(db)
+
+
+def test_remocao(db, fabrica):
+    _, _, _, avaliacoes = _cenario(fabrica)
+    db.commit()
+
+    db.delete(avaliacoes[1])
+    _confere_com_rebuild(db)
+
+
+def test_turma_troca_de_professor(db, fabrica):
+    professores, _, turma, _ = _cenario(fabrica)
+    db.commit()
+
+    turma.professor_id = professores[1].id_professor
+    _confere_com_rebuild(db)
+
+
+def test_turma_troca_de_disciplina_pelo_relacionamento(db, fabrica):
+    _, disciplinas, turma, _ = _cenario(fabrica)
+    db.commit()
+
+    # atributos expirados pelo commit: o valor antigo tem que vir do banco
+    turma.disciplina = db.get(models.Disciplina, disciplinas[1].id_disciplina)
+    _confere_com_rebuild(db)
+
+
+def test_alteracao_avanca_a_versao_e_descarta_rankings(db, fabrica):
+    _, disciplinas, turma, avaliacoes = _cenario(fabrica)
+    db.commit()
+    disciplina_id = disciplinas[0].id_disciplina
+    db.add(models.RankingArquetipo(disciplina_id=disciplina_id, vetor="0" * 7, ranking="[]"))
+    db.commit()
+    versao = db.get(models.Disciplina, disciplina_id).versao_perfis
+
+    avaliacoes[0].quadro = 6
+    db.commit()
+    db.expire_all()
+
+    assert db.get(models.Disciplina, disciplina_id).versao_perfis > versao
+    assert db.get(models.RankingArquetipo, (disciplina_id, "0" * 7)) is None
@@ -0,0 +1,78 @@
+"""
+Pontuação vetorizada (scoring.py) e as rotas de recomendação contra o laço
+original linha a linha: mesmas similaridades bit a bit e mesma ordem, com
+empates na ordem dos professores.
+"""
+import numpy as np
+import pytest
+import crud
+import scoring
+from conftest import MATRICULA, medias_referencia, ranking_referencia, vetor_referencia
+from scoring import weighted_euclidean_similarity
+
+
+def _casos():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        aluno = rng.integers(0, 8, 7)
+        matriz = np.round(rng.random((20, 7)) * 7 * 3) / 3
+        matriz[5] = matriz[2]  # empate
+        yield aluno, matriz
+    yield np.zeros(7, dtype=np.int64), np.ones((3, 7))
+    yield np.array([0, 0, 0, 4, 0, 0, 0]), np.full((4, 7), 2.0)
+
+
+@pytest.mark.parametrize("aluno, matriz", list(_casos()))
+def test_score_matrix_igual_ao_laco(aluno, matriz):
+    similaridades, estrelas, ordem = scoring.score_matrix(aluno, matriz)
+
+    referencia = [weighted_euclidean_similarity(aluno, linha, aluno) for linha in matriz]
+    assert similaridades.tolist() == referencia
+    assert estrelas.tolist() == [s * 5 for s in referencia]
+    assert ordem.tolist() == sorted(range(len(matriz)), key=lambda i: referencia[i], reverse=True)
+
+    por_par = scoring.similarity_matrix(np.array([aluno, aluno[::-1]]), matriz)
+    assert por_par[0].tolist() == referencia
+    assert por_par[1].tolist() == [weighted_euclidean_similarity(aluno[::-1], linha, aluno[::-1]) for linha in matriz]
+
+
+def test_vetor_empacotado_igual_ao_normalizado(db, headers):
+    aluno_id = crud.get_aluno_by_matricula(db, MATRICULA).id_aluno
+    vetor = scoring.desempacotar_vetor(crud.get_vetor_pesos(db, aluno_id))
+    assert vetor.tolist() == vetor_referencia(db, aluno_id)
+
+
+def test_medias_materializadas_iguais_as_avaliacoes(db):
+    for disciplina in crud.get_disciplinas(db):
+        linhas = crud.get_professores_avg_ratings_by_disciplina(db, disciplina.id_disciplina)
+        referencia = medias_referencia(db, disciplina.id_disciplina)
+        assert [linha.id_professor for linha in linhas] == [r[0] for r in referencia]
+        np.testing.assert_array_equal(
+            scoring.ratings_matrix(linhas).reshape(-1, 7), np.reshape([r[2] for r in referencia], (-1, 7))
+        )
+
+
+def test_lote_igual_ao_laco_por_disciplina(cliente, headers, db, fabrica):
+    # disciplina com professores empatados, para a ordem dos empates contar
+    disciplina = fabrica.disciplina()
+    for _ in range(3):
+        turma = fabrica.turma(fabrica.professor(), disciplina)
+        fabrica.avaliacao(fabrica.aluno(), turma, [5, 1, 4, 0, 2, 3, 6])
+    db.commit()
+
+    pedidas = [3, disciplina.id_disciplina, 1, 3, 999999, 2]
+    resposta = cliente.get(
+        "/aluno/recomendacoes/lote", params={"disciplina_ids": pedidas}, headers=headers
+    )
+    assert resposta.status_code == 200
+    lote = resposta.json()
+    assert [item["disciplina_id"] for item in lote] == list(dict.fromkeys(pedidas))
+
+    aluno_id = crud.get_aluno_by_matricula(db, MATRICULA).id_aluno
+    aluno = vetor_referencia(db, aluno_id)
+    for item in lote:
+        referencia = ranking_referencia(aluno, medias_referencia(db, item["disciplina_id"]))
+        assert [r["id_professor"] for r in item["professores"]] == [r["id_professor"] for r in referencia]
+        assert [r["similaridade"] for r in item["professores"]] == [r["similaridade"] for r in referencia]
+        individual = cliente.get(f"/aluno/recomendacoes?disciplina_id={item['disciplina_id']}", headers=headers)
+        assert individual.json() == item["professores"]
@@ -0,0 +1,44 @@
+"""
+Pool de bcrypt (password_pool.py): um processo morto quebra o executor, que
+é trocado por um novo, e a tarefa é reenviada uma vez.
+"""
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+import password_pool
+
+
+def _morre_uma_vez(marca: str) -> str:
+    if not os.path.exists(marca):
+        open(marca, "w").close()
+        os._exit(1)
+    return "ok"
+
+
+def _quebrar_o_pool():
+    with pytest.raises(BrokenProcessPool):
+        password_pool._get_executor().submit(os._exit, 1).result()
+
+
+def test_pool_quebrado_e_trocado_no_envio():
+    hashed = password_pool._hash("segredo")
+    _quebrar_o_pool()
+    reinicios = password_pool.stats()["restarts"]
+
+    assert asyncio.run(password_pool.verify_password_async("segredo", hashed))
+    assert password_pool.stats()["restarts"] == reinicios + 1
+
+
+def test_tarefa_do_processo_morto_e_reenviada(tmp_path):
+    reinicios = password_pool.stats()["restarts"]
+    resultado = asyncio.run(password_pool._run_async(_morre_uma_vez, str(tmp_path / "marca")))
+    assert resultado == "ok"
+    assert password_pool.stats()["restarts"] == reinicios + 1
+    assert password_pool.stats()["pending"] == 0
+
+
+def test_login_com_o_pool_quebrado(cliente):
+    _quebrar_o_pool()
+    resposta = cliente.post("/login", json={"matricula": "2110001", "senha": "puc123"})
+    assert resposta.status_code == 200
@@ -0,0 +1,65 @@
+"""
+Job de rankings pré-calculados (precomputed_rankings.py): cada ranking
+gravado é o do laço original para o vetor e a disciplina, e a rota serve o
+mesmo que calcularia ao vivo.
+"""
+import json
+import pytest
+from sqlalchemy import delete, select
+import crud
+import models
+import precomputed_rankings
+import recommendation_cache
+import scoring
+from conftest import MATRICULA, medias_referencia, ranking_referencia
+
+
+@pytest.fixture
+def rankings(db):
+    precomputed_rankings.atualizar(db, tudo=True, progresso=lambda _: None)
+    yield
+    db.execute(delete(models.RankingArquetipo))
+    db.commit()
+
+
+def _gravados(db) -> dict:
+    linhas = db.execute(select(models.RankingArquetipo.disciplina_id, models.RankingArquetipo.vetor, models.RankingArquetipo.ranking))
+    return {(disciplina_id, vetor): json.loads(ranking) for disciplina_id, vetor, ranking in linhas}
+
+
+def test_rankings_iguais_ao_laco(db, headers, rankings):
+    gravados = _gravados(db)
+    vetores = precomputed_rankings.vetores_distintos(db)
+    disciplinas = [d.id_disciplina for d in crud.get_disciplinas(db) if medias_referencia(db, d.id_disciplina)]
+    assert set(gravados) == {(d, v) for d in disciplinas for v in vetores}
+
+    for (disciplina_id, vetor), ranking in gravados.items():
+        aluno = [int(peso) for peso in vetor]
+        assert ranking == ranking_referencia(aluno, medias_referencia(db, disciplina_id))
+
+
+def test_avaliacao_nova_descarta_e_o_job_recalcula(db, headers, fabrica, rankings):
+    disciplina_id = 1
+    turma = fabrica.turma(fabrica.professor(), db.get(models.Disciplina, disciplina_id))
+    fabrica.avaliacao(fabrica.aluno(), turma, [7, 0, 7, 0, 7, 0, 7])
+    db.commit()
+    assert not [chave for chave in _gravados(db) if chave[0] == disciplina_id]
+
+    resumo = precomputed_rankings.atualizar(db, progresso=lambda _: None)
+    assert resumo["disciplinas_recalculadas"] == 1
+    for (disciplina, vetor), ranking in _gravados(db).items():
+        if disciplina == disciplina_id:
+            assert ranking == ranking_referencia([int(peso) for peso in vetor], medias_referencia(db, disciplina_id))
+
+
+def test_rota_serve_o_pre_calculado_igual_ao_vivo(cliente, headers, db, request):
+    disciplina_id = next(d.id_disciplina for d in crud.get_disciplinas(db) if medias_referencia(db, d.id_disciplina))
+    rota = f"/aluno/recomendacoes?disciplina_id={disciplina_id}"
+    vivo = cliente.get(rota, headers=headers).json()
+    request.getfixturevalue("rankings")
+    recommendation_cache.cache.clear()
+
+    aluno_id = crud.get_aluno_by_matricula(db, MATRICULA).id_aluno
+    vetor = scoring.desempacotar_vetor(crud.get_vetor_pesos(db, aluno_id))
+    assert db.get(models.RankingArquetipo, (disciplina_id, scoring.chave_vetor(vetor))) is not None
+    assert cliente.get(rota, headers=headers).json() == vivo
@@ -0,0 +1,72 @@
+"""
+Médias ponderadas por recência (RECENCY_MODE decay/window) recombinadas das
+parciais por semestre, contra o peso aplicado avaliação por avaliação.
+"""
+import numpy as np
+import pytest
+from sqlalchemy import select
+import crud
+import models
+import professor_profiles
+import scoring
+from conftest import medias_referencia, ranking_referencia
+
+
+def _semestre(ordinal: int) -> str:
+    return f"{ordinal // 2}.{ordinal % 2 + 1}"
+
+
+def _peso(modo: str, referencia: int):
+    def peso(semestre):
+        ordinal = professor_profiles.ordinal_semestre(semestre)
+        if ordinal is None:
+            return 0.0
+        idade = referencia - ordinal
+        if modo == "window":
+            return 1.0 if idade < professor_profiles.RECENCY_WINDOW else 0.0
+        decaido = professor_profiles.RECENCY_DECAY ** idade
+        return decaido if decaido >= professor_profiles.PESO_MINIMO else 0.0
+    return peso
+
+
+@pytest.mark.parametrize("modo", ["decay", "window"])
+def test_medias_por_recencia_iguais_as_avaliacoes(db, fabrica, monkeypatch, modo):
+    monkeypatch.setattr(professor_profiles, "RECENCY_MODE", modo)
+    monkeypatch.setattr(professor_profiles, "RECENCY_DECAY", 0.5)
+    monkeypatch.setattr(professor_profiles, "RECENCY_WINDOW", 3)
+
+    semestres = db.execute(select(models.Avaliacao.semestre).distinct()).scalars()
+    recente = max(filter(None, map(professor_profiles.ordinal_semestre, semestres)))
+
+    disciplina = fabrica.disciplina()
+    professores = [fabrica.professor() for _ in range(3)]
+    # idades 0, 1, 2, 5 e 20 (esta abaixo de PESO_MINIMO com decay 0.5) e um semestre fora do formato
+    idades = [0, 1, 2, 5, 20]
+    for n, professor in enumerate(professores):
+        for idade in idades[n:]:
+            turma = fabrica.turma(professor, disciplina, _semestre(recente - idade))
+            notas = [(idade * 3 + n + i) % 8 for i in range(7)]
+            fabrica.avaliacao(fabrica.aluno(), turma, notas)
+    turma = fabrica.turma(professores[0], disciplina, "verão")
+    fabrica.avaliacao(fabrica.aluno(), turma, [7] * 7)
+    db.commit()
+
+    linhas = crud.get_professores_avg_ratings_by_disciplina(db, disciplina.id_disciplina)
+    referencia = medias_referencia(db, disciplina.id_disciplina, _peso(modo, recente))
+    assert [linha.id_professor for linha in linhas] == [r[0] for r in referencia]
+    np.testing.assert_allclose(scoring.ratings_matrix(linhas), [r[2] for r in referencia], rtol=1e-12)
+
+    aluno = [5, 0, 4, 0, 0, 3, 6]
+    ranking = scoring.rank_professores(aluno, linhas)
+    assert [r["id_professor"] for r in ranking] == [r["id_professor"] for r in ranking_referencia(aluno, referencia)]
+
+
+def test_semestre_filtra_sem_ponderar(db, fabrica):
+    turma = fabrica.turma(fabrica.professor(), fabrica.disciplina(), "2020.1")
+    fabrica.avaliacao(fabrica.aluno(), turma, [1] * 7)
+    fabrica.avaliacao(fabrica.aluno(), turma, [6] * 7, semestre="2019.2")
+    db.commit()
+
+    linhas = crud.professores_avg_ratings_query(db, [turma.disciplina_id], "2019.2").all()
+    referencia = medias_referencia(db, turma.disciplina_id, lambda semestre: float(semestre == "2019.2"))
+    np.testing.assert_array_equal(scoring.ratings_matrix(linhas), [r[2] for r in referencia])
@@ -0,0 +1,79 @@
+"""
+Revogação de tokens pela claim 'pwd' (carimbo da senha, ver auth.py) e pelo
+token_cache.
+"""
+from datetime import timedelta
+from sqlalchemy import update
+import auth
+import models
+import token_cache
+from conftest import login
+
+
+def _aluno_com_senha(db, fabrica, senha: str) -> models.Aluno:
+    aluno = fabrica.aluno(hashed_password=auth.get_password_hash(senha))
+    db.commit()
+    return aluno
+
+
+def test_trocar_a_senha_pelo_orm_revoga_na_hora(cliente, db, fabrica):
+    aluno = _aluno_com_senha(db, fabrica, "antiga")
+    headers = login(cliente, aluno.matricula, "antiga")
+    assert cliente.get("/aluno/disciplinas", headers=headers).status_code == 200
+
+    aluno.hashed_password = auth.get_password_hash("nova")
+    db.commit()
+
+    assert cliente.get("/aluno/disciplinas", headers=headers).status_code == 401
+    novos = login(cliente, aluno.matricula, "nova")
+    assert cliente.get("/aluno/disciplinas", headers=novos).status_code == 200
+
+
+def test_carimbo_recusa_token_de_senha_antiga_em_outro_processo(cliente, db, fabrica):
+    aluno = _aluno_com_senha(db, fabrica, "antiga")
+    headers = login(cliente, aluno.matricula, "antiga")
+    assert cliente.get("/aluno/disciplinas", headers=headers).status_code == 200
+
+    # troca sem eventos do ORM (como outro worker): só o TTL do cache segura o token
+    db.execute(
+        update(models.Aluno).where(models.Aluno.id_aluno == aluno.id_aluno)
+        .values(hashed_password=auth.get_password_hash("nova"))
+    )
+    db.commit()
+    assert cliente.get("/aluno/disciplinas", headers=headers).status_code == 200
+
+    token_cache.cache.invalidate_aluno(aluno.id_aluno)  # a entrada expirou
+    assert cliente.get("/aluno/disciplinas", headers=headers).status_code == 401
+
+
+def test_token_sem_carimbo_continua_valendo(cliente, db, fabrica):
+    aluno = _aluno_com_senha(db, fabrica, "senha")
+    token = auth.create_access_token({"sub": aluno.matricula, "aluno_id": aluno.id_aluno})
+    resposta = cliente.get("/aluno/disciplinas", headers={"Authorization": f"Bearer {token}"})
+    assert resposta.status_code == 200
+
+
+def test_token_com_carimbo_errado_ou_expirado(cliente, db, fabrica):
+    aluno = _aluno_com_senha(db, fabrica, "senha")
+    dados = {"sub": aluno.matricula, "aluno_id": aluno.id_aluno}
+    tokens = [
+        auth.create_access_token({**dados, "pwd": "0" * 16}),
+        auth.create_access_token(
+            {**dados, "pwd": auth.password_stamp(aluno.hashed_password)}, expires_delta=timedelta(seconds=-1)
+        ),
+        "nao-e-um-jwt",
+    ]
+    for token in tokens:
+        resposta = cliente.get("/aluno/disciplinas", headers={"Authorization": f"Bearer {token}"})
+        assert resposta.status_code == 401
+
+
+def test_remover_o_aluno_revoga(cliente, db, fabrica):
+    aluno = _aluno_com_senha(db, fabrica, "senha")
+    headers = login(cliente, aluno.matricula, "senha")
+    assert cliente.get("/aluno/disciplinas", headers=headers).status_code == 200
+
+    db.delete(aluno)
+    db.commit()
+
+    assert cliente.get("/aluno/disciplinas", headers=headers).status_code == 401
@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    Cache curto, em memória do processo, de tokens JWT já verificados
+    -> identidade mínima do aluno (schemas.Aluno).
+
+    Evita decodificar o JWT e buscar o Aluno no banco a cada requisição
+    autenticada. Uma entrada vale até o menor entre o TTL e o 'exp' do token;
+    invalidate_aluno() derruba na hora as entradas de um aluno removido ou
+    que trocou a senha.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str):
+        with self._lock:
+            entrada = self._entries.get(token)
+            if entrada is None or entrada[1] <= time.time():
+                if entrada is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entrada[0]
+
+    def set(self, token: str, identidade, token_exp: float):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (identidade, min(time.time() + self.ttl_seconds, token_exp))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_aluno(self, aluno_id: int):
+        with self._lock:
+            tokens = [
+                token for token, (identidade, _) in self._entries.items()
+                if identidade.id_aluno == aluno_id
+            ]
+            for token in tokens:
+                del self._entries[token]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+cache = TokenCache(
+    max_entries=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60")),
+)
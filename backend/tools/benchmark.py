@@ -0,0 +1,191 @@
+"""
+Benchmark de carga dos endpoints do backend.
+
+Uso (em backend/, depois de popular o banco com tools.synthetic_data):
+
+    python -m tools.benchmark --requisicoes 2000 --concorrencia 32
+    python -m tools.benchmark --url http://127.0.0.1:8000 --comparar benchmark_anterior.json
+
+Sem --url a aplicação roda no mesmo processo (httpx + ASGITransport);
+com --url as requisições vão para um uvicorn já em execução.
+Para cada endpoint reporta p50/p95/p99, média e vazão, e salva tudo em JSON.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+import httpx
+import numpy as np
+from tools import synthetic_data
+
+
+def _perfil_aleatorio(rnd: random.Random) -> dict:
+    return {
+        "curso": "Engenharia",
+        "periodo": "1º",
+        "formaLecionar": rnd.choice(synthetic_data.FORMAS_LECIONAR),
+        "formaAvaliar": rnd.choice(synthetic_data.FORMAS_AVALIAR),
+        "ritmoAula": "Moderado",
+        "incentivo": "Médio",
+        "formaLecionarImportancia": rnd.randint(1, 7),
+        "formaAvaliarImportancia": rnd.randint(1, 7),
+        "ritmoAulaImportancia": rnd.randint(1, 7),
+        "incentivoImportancia": rnd.randint(1, 7),
+    }
+
+
+async def _medir(nome: str, fazer_requisicao, requisicoes: int, concorrencia: int) -> dict:
+    """Dispara 'requisicoes' chamadas com 'concorrencia' clientes simultâneos."""
+    latencias = []
+    erros = 0
+    restantes = iter(range(requisicoes))
+
+    async def cliente():
+        nonlocal erros
+        for i in restantes:
+            inicio = time.perf_counter()
+            try:
+                resposta = await fazer_requisicao(i)
+                if resposta.status_code >= 400:
+                    erros += 1
+            except httpx.HTTPError:
+                erros += 1
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) if latencias else (0, 0, 0)
+    resultado = {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "media_ms": round(float(np.mean(latencias)), 3) if latencias else 0.0,
+        "vazao_rps": round(len(latencias) / duracao, 1) if duracao else 0.0,
+    }
+    print(
+        f"{nome:<16} n={resultado['requisicoes']:<6} erros={erros:<4} "
+        f"p50={resultado['p50_ms']:.1f}ms p95={resultado['p95_ms']:.1f}ms "
+        f"p99={resultado['p99_ms']:.1f}ms vazão={resultado['vazao_rps']:.0f} req/s"
+    )
+    return resultado
+
+
+async def rodar(args) -> dict:
+    rnd = random.Random(args.seed)
+    prefixo = synthetic_data.prefixo_matricula(args.seed)
+
+    def matricula_aleatoria():
+        return f"{prefixo}-{rnd.randrange(args.alunos):07d}"
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    resultados = {}
+    async with client:
+        async def login(_):
+            return await client.post("/login", json={
+                "matricula": matricula_aleatoria(), "senha": synthetic_data.SENHA_SINTETICA
+            })
+
+        # tokens de alguns alunos para as rotas autenticadas
+        headers = []
+        for _ in range(args.usuarios):
+            resposta = await login(None)
+            if resposta.status_code == 200:
+                headers.append({"Authorization": f"Bearer {resposta.json()['access_token']}"})
+        if not headers:
+            raise SystemExit("Nenhum login funcionou: gere os dados com a mesma --seed e --alunos.")
+
+        disciplinas = (await client.get("/aluno/disciplinas", headers=headers[0])).json()
+        ids_disciplinas = [d["id_disciplina"] for d in disciplinas]
+
+        async def get_disciplinas(i):
+            return await client.get("/aluno/disciplinas", headers=headers[i % len(headers)])
+
+        async def get_recomendacoes(i):
+            return await client.get(
+                "/aluno/recomendacoes",
+                params={"disciplina_id": rnd.choice(ids_disciplinas)},
+                headers=headers[i % len(headers)],
+            )
+
+        async def get_recomendacoes_lote(i):
+            return await client.get(
+                "/aluno/recomendacoes/lote",
+                params={"disciplina_ids": rnd.sample(ids_disciplinas, min(args.disciplinas_lote, len(ids_disciplinas)))},
+                headers=headers[i % len(headers)],
+            )
+
+        async def post_perfil(i):
+            return await client.post("/aluno/me/perfil", json=_perfil_aleatorio(rnd), headers=headers[i % len(headers)])
+
+        cenarios = {
+            "login": (login, args.requisicoes_login),
+            "disciplinas": (get_disciplinas, args.requisicoes),
+            "recomendacoes": (get_recomendacoes, args.requisicoes),
+            "recomendacoes_lote": (get_recomendacoes_lote, args.requisicoes),
+            "perfil": (post_perfil, args.requisicoes),
+        }
+        for nome, (fazer_requisicao, requisicoes) in cenarios.items():
+            if args.endpoints and nome not in args.endpoints:
+                continue
+            resultados[nome] = await _medir(nome, fazer_requisicao, requisicoes, args.concorrencia)
+
+    return resultados
+
+
+def _comparar(atual: dict, arquivo_anterior: str):
+    with open(arquivo_anterior) as f:
+        anterior = json.load(f)["endpoints"]
+    print(f"\nComparação com {arquivo_anterior} (p95 / vazão):")
+    for nome, r in atual.items():
+        if nome not in anterior:
+            continue
+        a = anterior[nome]
+        delta_p95 = (r["p95_ms"] / a["p95_ms"] - 1) * 100 if a["p95_ms"] else 0.0
+        delta_vazao = (r["vazao_rps"] / a["vazao_rps"] - 1) * 100 if a["vazao_rps"] else 0.0
+        print(f"{nome:<16} p95 {a['p95_ms']:.1f} -> {r['p95_ms']:.1f}ms ({delta_p95:+.0f}%), "
+              f"vazão {a['vazao_rps']:.0f} -> {r['vazao_rps']:.0f} ({delta_vazao:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga dos endpoints.")
+    parser.add_argument("--url", help="URL de um servidor em execução (padrão: app no mesmo processo)")
+    parser.add_argument("--requisicoes", type=int, default=1000, help="por endpoint")
+    parser.add_argument("--requisicoes-login", type=int, default=100, help="login é dominado pelo bcrypt")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--usuarios", type=int, default=20, help="alunos logados usados nas rotas autenticadas")
+    parser.add_argument("--endpoints", nargs="*", help="login disciplinas recomendacoes recomendacoes_lote perfil (padrão: todos)")
+    parser.add_argument("--disciplinas-lote", type=int, default=6, help="disciplinas por chamada de recomendacoes_lote")
+    parser.add_argument("--alunos", type=int, default=5000, help="mesmo valor usado no tools.synthetic_data")
+    parser.add_argument("--seed", type=int, default=42, help="mesma seed usada no tools.synthetic_data")
+    parser.add_argument("--saida", default=f"benchmark_{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(rodar(args))
+
+    with open(args.saida, "w") as f:
+        json.dump({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "alvo": args.url or "in-process",
+            "concorrencia": args.concorrencia,
+            "endpoints": resultados,
+        }, f, indent=2)
+    print(f"\nResultados salvos em {args.saida}")
+
+    if args.comparar:
+        _comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Custo de montar e serializar as respostas de recomendações e de perfil,
+por requisição, no caminho do response_model (validação Pydantic + json)
+e no caminho rápido de fast_json (tuplas/dicts + orjson). Não usa banco.
+
+Uso (em backend/):
+
+    python -m tools.benchmark_serializacao --professores 40 --repeticoes 20000
+
+Para o efeito de ponta a ponta, rode tools.benchmark com FAST_RESPONSES=false
+e depois com FAST_RESPONSES=true, usando --comparar.
+"""
+import argparse
+import json
+import random
+import time
+from pydantic import TypeAdapter
+import crud
+import fast_json
+import models
+import schemas
+from constants.features import FEATURE_NAMES
+
+
+def _recomendacoes(rnd: random.Random, professores: int) -> list[dict]:
+    return sorted((
+        {
+            "id_professor": i,
+            "nome": f"Prof. {i}",
+            "similaridade": rnd.random(),
+            "estrelas": rnd.random() * 5,
+        }
+        for i in range(1, professores + 1)
+    ), key=lambda r: -r["similaridade"])
+
+
+def _linhas_perfil(rnd: random.Random) -> list[tuple]:
+    return [
+        (1, i, rnd.randint(0, 7), i, coluna.title(), coluna)
+        for i, coluna in enumerate(FEATURE_NAMES, start=1)
+    ]
+
+
+def _perfil_orm(linhas: list[tuple]) -> models.PerfilPreferencias:
+    """O objeto que o caminho antigo entrega ao response_model (from_attributes)."""
+    return models.PerfilPreferencias(
+        id_perfil=linhas[0][0],
+        aluno_id=1,
+        preferencias=[
+            models.PreferenciaAluno(
+                id_preferencia=id_preferencia,
+                peso=peso,
+                opcao=models.OpcaoPreferencia(id_opcao=id_opcao, nome=nome, coluna_mapeada=coluna),
+            )
+            for _, id_preferencia, peso, id_opcao, nome, coluna in linhas
+        ],
+    )
+
+
+def _resposta_pydantic(tipo):
+    """Como o FastAPI trata o retorno de uma rota com response_model (validar, converter, JSONResponse)."""
+    adapter = TypeAdapter(tipo)
+
+    def serializar(dados) -> bytes:
+        validado = adapter.validate_python(dados, from_attributes=True)
+        conteudo = adapter.dump_python(validado, mode="json")
+        return json.dumps(
+            conteudo, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    return serializar
+
+
+def _medir(funcao, repeticoes: int) -> float:
+    """Microssegundos por chamada (melhor de 3 rodadas)."""
+    melhor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor / repeticoes * 1e6
+
+
+def rodar(args) -> dict:
+    rnd = random.Random(args.seed)
+    recomendacoes = _recomendacoes(rnd, args.professores)
+    lote = [
+        {"disciplina_id": d, "professores": _recomendacoes(rnd, args.professores)}
+        for d in range(1, args.disciplinas_lote + 1)
+    ]
+    linhas = _linhas_perfil(rnd)
+    perfil = _perfil_orm(linhas)
+
+    # (atual, rápido) para cada resposta
+    cenarios = {
+        "recomendacoes": (
+            lambda s=_resposta_pydantic(list[schemas.ProfessorComSimilaridade]): s(recomendacoes),
+            lambda: fast_json.dumps(recomendacoes),
+        ),
+        "recomendacoes_lote": (
+            lambda s=_resposta_pydantic(list[schemas.RecomendacoesDisciplina]): s(lote),
+            lambda: fast_json.dumps(lote),
+        ),
+        "perfil": (
+            lambda s=_resposta_pydantic(schemas.PerfilPreferencias): s(perfil),
+            lambda: fast_json.dumps(crud.perfil_resposta(linhas, 1)),
+        ),
+    }
+
+    print(f"serializador rápido: {'orjson' if fast_json.orjson is not None else 'json (orjson ausente)'}")
+    resultados = {}
+    for nome, (atual, rapido) in cenarios.items():
+        if json.loads(atual()) != json.loads(rapido()):
+            raise SystemExit(f"{nome}: os dois caminhos geram JSON diferente")
+        resultados[nome] = {
+            "atual_us": round(_medir(atual, args.repeticoes), 2),
+            "rapido_us": round(_medir(rapido, args.repeticoes), 2),
+        }
+        r = resultados[nome]
+        print(f"{nome:<20} atual={r['atual_us']:.1f}us rápido={r['rapido_us']:.1f}us "
+              f"({r['atual_us'] / r['rapido_us']:.1f}x)")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a serialização das respostas (response_model x fast_json).")
+    parser.add_argument("--professores", type=int, default=30, help="professores por disciplina")
+    parser.add_argument("--disciplinas-lote", type=int, default=6)
+    parser.add_argument("--repeticoes", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="salva os resultados em JSON")
+    args = parser.parse_args()
+
+    resultados = rodar(args)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Roda EXPLAIN ANALYZE nas consultas quentes da recomendação e do login
+e mostra o plano e o tempo de cada uma.
+
+Uso (em backend/, com DATABASE_URL apontando para um banco descartável):
+
+    python -m tools.explain_hot_queries --gerar --alunos 50000
+
+--gerar popula o banco com tools.synthetic_data antes de medir. Em SQLite
+o plano vem de EXPLAIN QUERY PLAN e o tempo é medido no cliente.
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+import crud
+import db_migrations
+import models
+import professor_profiles
+from database import SessionLocal
+from tools import synthetic_data
+
+
+def consultas_quentes(db: Session, disciplina_id: int, matricula: str) -> dict:
+    return {
+        "recomendacao: perfis_professores por disciplina":
+            crud.professores_avg_ratings_query(db, [disciplina_id]).statement,
+        "agregado de avaliacoes por disciplina (join turmas -> avaliacoes)":
+            professor_profiles.agregado_select().where(models.Turma.disciplina_id == disciplina_id),
+        "rebuild completo de perfis_professores":
+            professor_profiles.agregado_select(),
+        "login: aluno por matricula":
+            select(models.Aluno).where(models.Aluno.matricula == matricula),
+    }
+
+
+def _sql(db: Session, stmt) -> str:
+    return str(stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+
+
+def explicar(db: Session, stmt, repeticoes: int) -> tuple[list[str], list[float]]:
+    """(linhas do plano, tempos de execução em ms)"""
+    sql = _sql(db, stmt)
+
+    if db.get_bind().dialect.name == "postgresql":
+        tempos = []
+        plano = []
+        for _ in range(repeticoes):
+            plano = [linha for (linha,) in db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))]
+            for linha in plano:
+                if linha.strip().startswith("Execution Time:"):
+                    tempos.append(float(linha.split(":")[1].split()[0]))
+        return plano, tempos
+
+    plano = [" | ".join(str(c) for c in linha) for linha in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        db.execute(text(sql)).fetchall()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return plano, tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE das consultas quentes.")
+    parser.add_argument("--gerar", action="store_true", help="popula dados sintéticos antes")
+    parser.add_argument("--alunos", type=int, default=50000)
+    parser.add_argument("--avaliacoes-por-aluno", type=int, default=10)
+    parser.add_argument("--disciplina-id", type=int, help="padrão: a disciplina com mais avaliações")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    db_migrations.upgrade()
+    db = SessionLocal()
+    try:
+        if args.gerar:
+            resumo = synthetic_data.gerar(
+                db, alunos=args.alunos, avaliacoes_por_aluno=args.avaliacoes_por_aluno
+            )
+            print(f"Dados sintéticos: {resumo}")
+
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("ANALYZE"))
+            db.commit()
+
+        disciplina_id = args.disciplina_id or db.execute(
+            select(models.PerfilProfessor.disciplina_id)
+            .group_by(models.PerfilProfessor.disciplina_id)
+            .order_by(func.sum(models.PerfilProfessor.total_avaliacoes).desc())
+            .limit(1)
+        ).scalar()
+        matricula = db.execute(select(models.Aluno.matricula).limit(1)).scalar() or ""
+        if disciplina_id is None:
+            print("Sem avaliações no banco. Use --gerar.")
+            return
+
+        for nome, stmt in consultas_quentes(db, disciplina_id, matricula).items():
+            plano, tempos = explicar(db, stmt, args.repeticoes)
+            print(f"\n=== {nome}")
+            print("\n".join(plano))
+            if tempos:
+                print(
+                    f"--> tempo (ms): mediana {statistics.median(tempos):.3f}, "
+                    f"mín {min(tempos):.3f}, máx {max(tempos):.3f} ({len(tempos)} execuções)"
+                )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
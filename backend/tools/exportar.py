@@ -0,0 +1,49 @@
+"""
+Exporta as médias dos professores ou a matriz de similaridade aluno x
+professor em streaming (mesma lógica de GET /admin/export/...).
+
+Uso (em backend/):
+
+    python -m tools.exportar professores --formato csv --saida medias.csv
+    python -m tools.exportar similaridades --curso-id 1 --semestre 2025.1 | gzip > sims.ndjson.gz
+"""
+import argparse
+import sys
+import export
+from database import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta dados para análise.")
+    parser.add_argument("dados", choices=["professores", "similaridades"])
+    parser.add_argument("--formato", choices=export.FORMATOS, default="ndjson")
+    parser.add_argument("--saida", default="-", help="arquivo de saída ou '-' para a saída padrão")
+    parser.add_argument("--semestre")
+    parser.add_argument("--curso-id", type=int)
+    parser.add_argument("--disciplina-id", type=int)
+    args = parser.parse_args()
+
+    filtros = export.Filtros(semestre=args.semestre, curso_id=args.curso_id, disciplina_id=args.disciplina_id)
+    if args.dados == "professores":
+        gerar_blocos, colunas = export.professores, export.COLUNAS_PROFESSORES
+    else:
+        gerar_blocos, colunas = export.similaridades, export.COLUNAS_SIMILARIDADES
+
+    try:
+        export.verificar_formato(args.formato)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    saida = sys.stdout.buffer if args.saida == "-" else open(args.saida, "wb")
+    db = SessionLocal()
+    try:
+        for pedaco in export.serializar(gerar_blocos(db, filtros), colunas, args.formato):
+            saida.write(pedaco)
+    finally:
+        db.close()
+        if saida is not sys.stdout.buffer:
+            saida.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Importa avaliações de um arquivo CSV/NDJSON (ou da entrada padrão).
+
+Uso (em backend/):
+
+    python -m tools.importar_avaliacoes pesquisa_2025_1.csv
+    zcat pesquisa.ndjson.gz | python -m tools.importar_avaliacoes - --formato ndjson
+"""
+import argparse
+import sys
+import time
+import ingestion
+from database import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa avaliações em lote.")
+    parser.add_argument("arquivo", help="caminho do arquivo ou '-' para a entrada padrão")
+    parser.add_argument("--formato", choices=ingestion.FORMATOS, help="padrão: pela extensão do arquivo")
+    parser.add_argument("--lote", type=int, default=ingestion.TAMANHO_LOTE)
+    args = parser.parse_args()
+
+    formato = args.formato or ("ndjson" if args.arquivo.endswith((".ndjson", ".jsonl")) else "csv")
+    entrada = sys.stdin if args.arquivo == "-" else open(args.arquivo, encoding="utf-8", newline="")
+
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        resultado = ingestion.importar(db, entrada, formato, tamanho_lote=args.lote)
+    finally:
+        db.close()
+        if entrada is not sys.stdin:
+            entrada.close()
+
+    print(
+        f"Concluído em {time.perf_counter() - inicio:.1f}s: {resultado.gravadas} gravadas, "
+        f"{resultado.rejeitadas} rejeitadas, {resultado.lotes} lotes."
+    )
+    for erro in resultado.erros:
+        print(f"  {erro}")
+
+
+if __name__ == "__main__":
+    main()
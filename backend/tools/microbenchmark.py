@@ -0,0 +1,209 @@
+"""
+Micro-benchmarks dos caminhos quentes, isolados e em vários tamanhos, com
+uma trava de regressão contra uma execução de referência.
+
+Uso (em backend/; não precisa de Postgres nem de DATABASE_URL):
+
+    python -m tools.microbenchmark --saida microbenchmark_base.json
+    python -m tools.microbenchmark --comparar microbenchmark_base.json --limite 0.2
+
+Casos (os com /N rodam para cada tamanho de --tamanhos, em professores):
+
+- similaridade/N: weighted_euclidean_similarity, um professor por chamada;
+- score_matrix/N: a versão vetorizada usada pelas rotas;
+- jwt_criar, jwt_decodificar: auth.create_access_token e jwt.decode;
+- vetor_preferencias: crud.montar_vetor_preferencias;
+- perfil_salvar, perfil_sem_mudanca: crud.create_or_update_aluno_perfil
+  numa sessão SQLite em memória (pesos alterados a cada chamada / iguais);
+- schema_perfil: validação do PerfilFrontend (corpo de POST /aluno/me/perfil);
+- schema_recomendacoes/N: validar e serializar list[ProfessorComSimilaridade]
+  como o response_model.
+
+Cada caso roda --rodadas vezes, cada rodada com repetições suficientes para
+durar --tempo-minimo segundos; vale a melhor rodada (menos ruído). Com
+--comparar, sai com código 1 se algum caso ficou mais de --limite (fração)
+mais lento que na referência. Compare execuções da mesma máquina.
+"""
+import os
+
+# auth lê a chave no import; o valor não importa para medir
+os.environ.setdefault("SECRET_KEY", "microbenchmark")
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import time
+from datetime import datetime
+import numpy as np
+from jose import jwt
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+import auth
+import crud
+import models
+import schemas
+import scoring
+import seed
+from constants.features import FEATURE_NAMES
+
+
+TAMANHOS = [10, 1_000, 100_000]
+
+
+def _formulario(rnd: random.Random) -> dict:
+    return {
+        "curso": "Engenharia de Software",
+        "periodo": str(rnd.randint(1, 10)),
+        "formaLecionar": rnd.choice(["Teórica", "Prática", "Mista"]),
+        "formaAvaliar": rnd.choice(["Provas", "Trabalhos", "Projetos"]),
+        "ritmoAula": "Moderado",
+        "incentivo": "Sim",
+        "formaLecionarImportancia": rnd.randint(0, 7),
+        "formaAvaliarImportancia": rnd.randint(0, 7),
+        "ritmoAulaImportancia": rnd.randint(0, 7),
+        "incentivoImportancia": rnd.randint(0, 7),
+    }
+
+
+def _sessao_sqlite() -> Session:
+    """Banco SQLite em memória com o esquema de models.py, o catálogo e um aluno."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(engine)
+    db = Session(engine)
+    seed.semear_catalogo(db)
+    db.add(models.Aluno(id_aluno=1, matricula="bench-1", nome="Aluno Benchmark", hashed_password="x"))
+    db.commit()
+    return db
+
+
+def _medir(funcao, rodadas: int, tempo_minimo: float) -> float:
+    """Microssegundos por chamada na melhor rodada."""
+    inicio = time.perf_counter()
+    funcao()
+    uma = max(time.perf_counter() - inicio, 1e-7)
+    repeticoes = max(1, int(tempo_minimo / uma))
+
+    melhor = float("inf")
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor / repeticoes * 1e6
+
+
+def casos(tamanhos: list[int], semente: int) -> dict:
+    """{nome: função sem argumentos} de cada caso."""
+    rnd = random.Random(semente)
+    rng = np.random.default_rng(semente)
+    resultado = {}
+
+    aluno = rng.integers(0, 8, len(FEATURE_NAMES))
+    recomendacoes_adapter = TypeAdapter(list[schemas.ProfessorComSimilaridade])
+    for n in tamanhos:
+        prof_matrix = rng.random((n, len(FEATURE_NAMES))) * scoring.NOTA_MAXIMA
+        professores = list(prof_matrix)
+
+        def similaridade(professores=professores):
+            for prof in professores:
+                scoring.weighted_euclidean_similarity(aluno, prof, aluno)
+
+        similaridades, estrelas, ordem = scoring.score_matrix(aluno, prof_matrix)
+        recomendacoes = [
+            {"id_professor": i, "nome": f"Prof. {i}", "similaridade": float(similaridades[i]), "estrelas": float(estrelas[i])}
+            for i in ordem.tolist()
+        ]
+
+        resultado[f"similaridade/{n}"] = similaridade
+        resultado[f"score_matrix/{n}"] = lambda prof_matrix=prof_matrix: scoring.score_matrix(aluno, prof_matrix)
+        resultado[f"schema_recomendacoes/{n}"] = lambda r=recomendacoes: recomendacoes_adapter.dump_json(
+            recomendacoes_adapter.validate_python(r)
+        )
+
+    dados_token = {"sub": "2110001", "aluno_id": 1, "pwd": "0123456789abcdef"}
+    token = auth.create_access_token(dados_token)
+    resultado["jwt_criar"] = lambda: auth.create_access_token(dados_token)
+    resultado["jwt_decodificar"] = lambda: jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+
+    formulario = _formulario(rnd)
+    perfil = schemas.PerfilFrontend(**formulario)
+    resultado["vetor_preferencias"] = lambda: crud.montar_vetor_preferencias(perfil)
+    resultado["schema_perfil"] = lambda: schemas.PerfilFrontend.model_validate(formulario)
+
+    db = _sessao_sqlite()
+    opcoes_map = crud.get_opcoes_dict(db)
+    # dois formulários com pesos diferentes: alternando, toda chamada grava
+    alternados = [perfil, schemas.PerfilFrontend(**{**formulario, "ritmoAulaImportancia": (perfil.ritmoAulaImportancia + 1) % 8})]
+    contador = itertools.count()
+    resultado["perfil_salvar"] = lambda: crud.create_or_update_aluno_perfil(db, 1, alternados[next(contador) % 2], opcoes_map)
+    resultado["perfil_sem_mudanca"] = lambda: crud.create_or_update_aluno_perfil(db, 1, perfil, opcoes_map)
+    return resultado
+
+
+def rodar(args) -> dict:
+    resultados = {}
+    for nome, funcao in casos(args.tamanhos, args.seed).items():
+        if args.casos and not any(nome.startswith(prefixo) for prefixo in args.casos):
+            continue
+        resultados[nome] = {"us": round(_medir(funcao, args.rodadas, args.tempo_minimo), 3)}
+        print(f"{nome:<30} {resultados[nome]['us']:>14.2f}us")
+    return resultados
+
+
+def comparar(atual: dict, arquivo_anterior: str, limite: float) -> list[str]:
+    """Imprime a diferença de cada caso e retorna os que pioraram mais que 'limite'."""
+    with open(arquivo_anterior) as f:
+        anterior = json.load(f)["casos"]
+    print(f"\nComparação com {arquivo_anterior} (limite +{limite:.0%}):")
+    regressoes = []
+    for nome, r in atual.items():
+        if nome not in anterior:
+            continue
+        a = anterior[nome]["us"]
+        delta = r["us"] / a - 1 if a else 0.0
+        marca = ""
+        if delta > limite:
+            regressoes.append(nome)
+            marca = "  <- REGRESSÃO"
+        print(f"{nome:<30} {a:>12.2f} -> {r['us']:>12.2f}us ({delta:+.0%}){marca}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks dos caminhos quentes, com trava de regressão.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS, help="professores por caso /N")
+    parser.add_argument("--casos", nargs="*", help="só os casos com esses prefixos (ex: similaridade jwt)")
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--tempo-minimo", type=float, default=0.2, help="segundos por rodada")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="salva os resultados (use como referência em --comparar)")
+    parser.add_argument("--comparar", help="JSON de uma execução de referência")
+    parser.add_argument("--limite", type=float, default=float(os.getenv("MICROBENCHMARK_LIMITE", "0.2")),
+                        help="piora tolerada por caso, em fração (padrão 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    resultados = rodar(args)
+
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump({
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "maquina": platform.node(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "casos": resultados,
+            }, f, indent=2)
+        print(f"\nResultados salvos em {args.saida}")
+
+    if args.comparar:
+        regressoes = comparar(resultados, args.comparar, args.limite)
+        if regressoes:
+            raise SystemExit(f"\n{len(regressoes)} caso(s) acima do limite: {', '.join(regressoes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Gerador reprodutível de dados sintéticos para medir o backend em volume.
+
+Uso (em backend/, apontando DATABASE_URL para um banco descartável):
+
+    python -m tools.synthetic_data --alunos 200000 --avaliacoes-por-aluno 10 --semestres 6
+
+Gera cursos, disciplinas, professores, turmas em vários semestres, alunos
+(todos com a senha SENHA_SINTETICA), perfis de preferência e avaliações.
+Tudo entra por carga em massa (COPY no Postgres, ver bulk.py), com ids
+explícitos a partir dos já existentes; as avaliações são geradas e gravadas
+em blocos de alunos, então a memória não cresce com o volume.
+A mesma --seed gera os mesmos dados.
+"""
+import argparse
+import time
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+import bulk
+import crud
+import db_migrations
+import models
+import professor_profiles
+import schemas
+import scoring
+from constants.features import FEATURE_NAMES
+from database import SessionLocal
+
+
+SENHA_SINTETICA = "puc123"
+ALUNOS_POR_BLOCO = 5_000
+
+FORMAS_LECIONAR = ["Teórica", "Prática", "Mista"]
+FORMAS_AVALIAR = ["Provas", "Trabalhos", "Projetos"]
+
+
+def prefixo_matricula(seed: int) -> str:
+    """As matrículas geradas são '<prefixo>-NNNNNNN' (usado pelo benchmark)."""
+    return f"s{seed}"
+
+
+def semestres_ate(ultimo: str, quantidade: int) -> list[str]:
+    """Os 'quantidade' semestres terminando em 'ultimo' (ex: '2025.1'), do mais antigo ao mais novo."""
+    ano, periodo = (int(parte) for parte in ultimo.split("."))
+    ordinal = ano * 2 + (periodo - 1)
+    return [f"{o // 2}.{o % 2 + 1}" for o in range(ordinal - quantidade + 1, ordinal + 1)]
+
+
+def _proximo_id(db: Session, coluna) -> int:
+    return (db.execute(select(func.max(coluna))).scalar() or 0) + 1
+
+
+def _perfis_aleatorios(rng, quantidade: int) -> list[dict[str, int]]:
+    """Vetores de preferência passando pela mesma tradução do formulário."""
+    formas_lecionar = rng.choice(FORMAS_LECIONAR, quantidade)
+    formas_avaliar = rng.choice(FORMAS_AVALIAR, quantidade)
+    importancias = rng.integers(1, 8, (quantidade, 4))
+    return [
+        crud.montar_vetor_preferencias(schemas.PerfilFrontend(
+            curso="", periodo="",
+            formaLecionar=str(formas_lecionar[i]),
+            formaAvaliar=str(formas_avaliar[i]),
+            ritmoAula="", incentivo="",
+            formaLecionarImportancia=int(importancias[i, 0]),
+            formaAvaliarImportancia=int(importancias[i, 1]),
+            ritmoAulaImportancia=int(importancias[i, 2]),
+            incentivoImportancia=int(importancias[i, 3]),
+        ))
+        for i in range(quantidade)
+    ]
+
+
+def gerar(
+    db: Session,
+    cursos: int = 5,
+    disciplinas_por_curso: int = 20,
+    professores: int = 200,
+    turmas_por_disciplina: int = 2,
+    semestres: int = 4,
+    ultimo_semestre: str = "2025.1",
+    alunos: int = 5000,
+    avaliacoes_por_aluno: int = 8,
+    fracao_com_perfil: float = 1.0,
+    seed: int = 42,
+    progresso=print,
+) -> dict:
+    """
+    Gera e grava o conjunto de dados e recalcula perfis_professores no final.
+    Cada professor tem um "estilo" e as avaliações dele variam em torno dele.
+    """
+    rng = np.random.default_rng(seed)
+    prefixo = prefixo_matricula(seed)
+    lista_semestres = semestres_ate(ultimo_semestre, semestres)
+
+    from auth import get_password_hash
+    senha_hash = get_password_hash(SENHA_SINTETICA)  # um bcrypt só para todos os alunos
+
+    id_curso = _proximo_id(db, models.Curso.id_curso)
+    id_disciplina = _proximo_id(db, models.Disciplina.id_disciplina)
+    id_professor = _proximo_id(db, models.Professor.id_professor)
+    id_turma = _proximo_id(db, models.Turma.id_turma)
+    id_aluno = _proximo_id(db, models.Aluno.id_aluno)
+    id_perfil = _proximo_id(db, models.PerfilPreferencias.id_perfil)
+
+    n_disciplinas = cursos * disciplinas_por_curso
+    bulk.copy_rows(db, models.Curso.__table__, ["id_curso", "nome"], (
+        (id_curso + i, f"Curso {prefixo}-{i}") for i in range(cursos)
+    ))
+    bulk.copy_rows(db, models.Disciplina.__table__, ["id_disciplina", "nome", "curso_id"], (
+        (id_disciplina + i, f"Disciplina {prefixo}-{i}", id_curso + i // disciplinas_por_curso)
+        for i in range(n_disciplinas)
+    ))
+    bulk.copy_rows(db, models.Professor.__table__, ["id_professor", "nome"], (
+        (id_professor + i, f"Prof. {prefixo}-{i}") for i in range(professores)
+    ))
+
+    # cada disciplina tem 'turmas_por_disciplina' turmas em cada semestre
+    turmas_por_disc_total = semestres * turmas_por_disciplina
+    n_turmas = n_disciplinas * turmas_por_disc_total
+    professor_da_turma = rng.integers(0, professores, n_turmas)
+    semestre_da_turma = (np.arange(n_turmas) % turmas_por_disc_total) // turmas_por_disciplina
+    bulk.copy_rows(
+        db, models.Turma.__table__,
+        ["id_turma", "nome_turma", "semestre", "professor_id", "disciplina_id"],
+        (
+            (
+                id_turma + i,
+                f"T{i % turmas_por_disciplina}",
+                lista_semestres[semestre_da_turma[i]],
+                id_professor + int(professor_da_turma[i]),
+                id_disciplina + i // turmas_por_disc_total,
+            )
+            for i in range(n_turmas)
+        ),
+    )
+    progresso(f"{cursos} cursos, {n_disciplinas} disciplinas, {professores} professores, {n_turmas} turmas")
+
+    opcoes_map = crud.get_opcoes_dict(db)
+    if not opcoes_map and fracao_com_perfil > 0:
+        progresso("Sem OpcaoPreferencia no banco: alunos serão gerados sem perfil.")
+
+    estilos = rng.uniform(0, 7, (professores, len(FEATURE_NAMES)))
+    por_aluno = min(avaliacoes_por_aluno, n_turmas)
+    total_avaliacoes = 0
+    total_perfis = 0
+
+    # o sorteio de turmas usa uma matriz (bloco x n_turmas): limita o bloco a ~2M células
+    alunos_por_bloco = max(1, min(ALUNOS_POR_BLOCO, 2_000_000 // n_turmas))
+
+    for inicio in range(0, alunos, alunos_por_bloco):
+        fim = min(inicio + alunos_por_bloco, alunos)
+        tamanho = fim - inicio
+
+        bulk.copy_rows(db, models.Aluno.__table__, ["id_aluno", "matricula", "nome", "hashed_password"], (
+            (id_aluno + i, f"{prefixo}-{i:07d}", f"Aluno {prefixo}-{i}", senha_hash)
+            for i in range(inicio, fim)
+        ))
+
+        if opcoes_map:
+            com_perfil = [i for i in range(inicio, fim) if rng.random() < fracao_com_perfil]
+            vetores = _perfis_aleatorios(rng, len(com_perfil))
+            bulk.copy_rows(db, models.PerfilPreferencias.__table__, ["id_perfil", "aluno_id", "vetor_pesos"], (
+                (id_perfil + i, id_aluno + i, scoring.empacotar_vetor(
+                    vetor[feature] if feature in opcoes_map else 0 for feature in FEATURE_NAMES
+                ))
+                for i, vetor in zip(com_perfil, vetores)
+            ))
+            bulk.copy_rows(db, models.PreferenciaAluno.__table__, ["perfil_id", "opcao_id", "peso"], (
+                (id_perfil + i, opcoes_map[nome], peso)
+                for i, vetor in zip(com_perfil, vetores)
+                for nome, peso in vetor.items()
+                if nome in opcoes_map
+            ))
+            total_perfis += len(com_perfil)
+
+        # turmas distintas por aluno: os 'por_aluno' menores de uma linha aleatória
+        turmas = np.argpartition(rng.random((tamanho, n_turmas)), por_aluno - 1, axis=1)[:, :por_aluno]
+        notas = estilos[professor_da_turma[turmas]] + rng.normal(0, 1, (tamanho, por_aluno, len(FEATURE_NAMES)))
+        notas = np.clip(np.rint(notas), 0, 7).astype(int)
+
+        total_avaliacoes += bulk.copy_rows(
+            db, models.Avaliacao.__table__,
+            ["semestre", "turma_id", "aluno_id", *FEATURE_NAMES],
+            (
+                (lista_semestres[semestre_da_turma[turma]], id_turma + turma, id_aluno + inicio + a, *nota)
+                for a, (linha_turmas, linha_notas) in enumerate(zip(turmas.tolist(), notas.tolist()))
+                for turma, nota in zip(linha_turmas, linha_notas)
+            ),
+        )
+        progresso(f"alunos {fim}/{alunos}, avaliações {total_avaliacoes}")
+
+    bulk.sync_sequences(db, [
+        models.Curso.__table__, models.Disciplina.__table__, models.Professor.__table__,
+        models.Turma.__table__, models.Aluno.__table__, models.PerfilPreferencias.__table__,
+        models.PreferenciaAluno.__table__, models.Avaliacao.__table__,
+    ])
+    db.commit()
+
+    # a carga em massa não dispara a manutenção incremental
+    professor_profiles.rebuild(db)
+
+    return {
+        "cursos": cursos,
+        "disciplinas": n_disciplinas,
+        "professores": professores,
+        "turmas": n_turmas,
+        "semestres": lista_semestres,
+        "alunos": alunos,
+        "perfis": total_perfis,
+        "avaliacoes": total_avaliacoes,
+        "primeira_disciplina": id_disciplina,
+        "prefixo_matricula": prefixo,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos no DATABASE_URL.")
+    parser.add_argument("--cursos", type=int, default=5)
+    parser.add_argument("--disciplinas-por-curso", type=int, default=20)
+    parser.add_argument("--professores", type=int, default=200)
+    parser.add_argument("--turmas-por-disciplina", type=int, default=2, help="por semestre")
+    parser.add_argument("--semestres", type=int, default=4)
+    parser.add_argument("--ultimo-semestre", default="2025.1")
+    parser.add_argument("--alunos", type=int, default=5000)
+    parser.add_argument("--avaliacoes-por-aluno", type=int, default=8)
+    parser.add_argument("--fracao-com-perfil", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db_migrations.upgrade()
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        resumo = gerar(
+            db,
+            cursos=args.cursos,
+            disciplinas_por_curso=args.disciplinas_por_curso,
+            professores=args.professores,
+            turmas_por_disciplina=args.turmas_por_disciplina,
+            semestres=args.semestres,
+            ultimo_semestre=args.ultimo_semestre,
+            alunos=args.alunos,
+            avaliacoes_por_aluno=args.avaliacoes_por_aluno,
+            fracao_com_perfil=args.fracao_com_perfil,
+            seed=args.seed,
+        )
+        print(f"Gerado em {time.perf_counter() - inicio:.1f}s: {resumo}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()